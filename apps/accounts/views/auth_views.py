@@ -25,11 +25,10 @@ class LoginView(FormView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Importación tardía para evitar ciclos
-        from apps.core.services.metrics_service import MetricsService
+        from apps.core.services.metrics_collector import MetricsCollector
         
-        # Obtener métricas para mostrar en el login
-        metrics_service = MetricsService()
-        context['metrics'] = metrics_service.get_dashboard_metrics()
+        # Métricas para mostrar en el login: solo lo ya muestreado, sin esperar al NAS
+        context['metrics'] = MetricsCollector.peek()
         
         return context
     
@@ -1,3 +1,24 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from .models import IndexedShare
+from .services.index_service import IndexService
 
-# Register your models here.
+
+@admin.register(IndexedShare)
+class IndexedShareAdmin(admin.ModelAdmin):
+    list_display = ('path', 'enabled', 'status', 'entry_count', 'last_crawl_finished')
+    list_filter = ('enabled', 'status')
+    search_fields = ('path',)
+    readonly_fields = ('status', 'entry_count', 'last_crawl_started', 'last_crawl_finished', 'last_error')
+    actions = ['crawl_now', 'crawl_full']
+
+    @admin.action(description="Actualizar índice (incremental)")
+    def crawl_now(self, request, queryset):
+        for share in queryset.filter(enabled=True):
+            IndexService.schedule_crawl(share.path)
+        messages.info(request, "Indexación encolada en segundo plano.")
+
+    @admin.action(description="Reconstruir índice (completo)")
+    def crawl_full(self, request, queryset):
+        for share in queryset.filter(enabled=True):
+            IndexService.schedule_crawl(share.path, full=True)
+        messages.info(request, "Reindexación completa encolada en segundo plano.")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.archivos.models import IndexedShare
+from apps.archivos.services.file_service import FileService
+from apps.archivos.services.index_service import IndexService
+
+
+class Command(BaseCommand):
+    help = "Actualiza el índice local de nombres de las carpetas compartidas habilitadas (para cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--share', help="Ruta de una sola carpeta compartida (ej. /projects)")
+        parser.add_argument('--full', action='store_true', help="Vuelve a listar todas las carpetas aunque su mtime no cambió")
+
+    def handle(self, *args, **options):
+        shares = IndexedShare.objects.filter(enabled=True)
+        if options['share']:
+            shares = shares.filter(path=options['share'])
+
+        if not shares.exists():
+            self.stdout.write(self.style.WARNING("No hay carpetas indexadas habilitadas."))
+            return
+
+        service = IndexService(FileService())
+        for share in shares:
+            self.stdout.write(f"Indexando {share.path}...")
+            share = service.crawl(share, full=options['full'])
+            if share.status == 'error':
+                self.stdout.write(self.style.ERROR(f"  Error: {share.last_error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"  {share.entry_count} entradas"))
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedShare',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Ruta de la carpeta compartida (ej. /projects)', max_length=1024, unique=True)),
+                ('enabled', models.BooleanField(default=True, help_text='Si está deshabilitada no se indexa ni se consulta')),
+                ('status', models.CharField(choices=[('idle', 'En espera'), ('running', 'Indexando'), ('error', 'Error')], default='idle', max_length=10)),
+                ('last_crawl_started', models.DateTimeField(blank=True, null=True)),
+                ('last_crawl_finished', models.DateTimeField(blank=True, null=True)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Carpeta indexada',
+                'verbose_name_plural': 'Carpetas indexadas',
+                'ordering': ['path'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=2048, unique=True)),
+                ('parent', models.CharField(db_index=True, max_length=2048)),
+                ('name', models.CharField(max_length=512)),
+                ('name_lower', models.CharField(db_index=True, max_length=512)),
+                ('is_dir', models.BooleanField(default=False)),
+                ('size', models.BigIntegerField(default=0)),
+                ('mtime', models.BigIntegerField(default=0)),
+                ('listed_mtime', models.BigIntegerField(blank=True, null=True)),
+                ('share', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='archivos.indexedshare')),
+            ],
+            options={
+                'verbose_name': 'Entrada indexada',
+                'verbose_name_plural': 'Entradas indexadas',
+            },
+        ),
+    ]
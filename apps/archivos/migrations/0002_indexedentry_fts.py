@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from apps.core.services.trigram_index import TrigramIndex
+
+# Índice FTS5 trigram sobre los nombres (búsqueda por subcadena; LIKE si no hay FTS5).
+FTS = TrigramIndex('archivos_indexedentry', 'name_lower')
+
+
+def create_fts(apps, schema_editor):
+    FTS.create(schema_editor)
+
+
+def drop_fts(apps, schema_editor):
+    FTS.drop(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archivos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
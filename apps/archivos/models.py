@@ -0,0 +1,53 @@
+from django.db import models
+
+
+class IndexedShare(models.Model):
+    """
+    Carpeta compartida con índice local de nombres habilitado (opt-in).
+    El crawler en segundo plano la recorre vía SYNO.FileStation.List.
+    """
+    STATUS_CHOICES = [
+        ('idle', 'En espera'),
+        ('running', 'Indexando'),
+        ('error', 'Error'),
+    ]
+
+    path = models.CharField(max_length=1024, unique=True, help_text="Ruta de la carpeta compartida (ej. /projects)")
+    enabled = models.BooleanField(default=True, help_text="Si está deshabilitada no se indexa ni se consulta")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='idle')
+    last_crawl_started = models.DateTimeField(null=True, blank=True)
+    last_crawl_finished = models.DateTimeField(null=True, blank=True)
+    entry_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = "Carpeta indexada"
+        verbose_name_plural = "Carpetas indexadas"
+        ordering = ['path']
+
+    def __str__(self):
+        return self.path
+
+
+class IndexedEntry(models.Model):
+    """
+    Metadata de un archivo o carpeta en el índice local.
+    listed_mtime (solo carpetas) es el mtime con el que se listó por última vez:
+    si no cambió, el crawler no vuelve a listar sus hijos directos.
+    """
+    share = models.ForeignKey(IndexedShare, on_delete=models.CASCADE, related_name='entries')
+    path = models.CharField(max_length=2048, unique=True)
+    parent = models.CharField(max_length=2048, db_index=True)
+    name = models.CharField(max_length=512)
+    name_lower = models.CharField(max_length=512, db_index=True)
+    is_dir = models.BooleanField(default=False)
+    size = models.BigIntegerField(default=0)
+    mtime = models.BigIntegerField(default=0)
+    listed_mtime = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Entrada indexada"
+        verbose_name_plural = "Entradas indexadas"
+
+    def __str__(self):
+        return self.path
@@ -0,0 +1,238 @@
+import io
+import json
+import logging
+import posixpath
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .task_service import TaskService
+
+logger = logging.getLogger(__name__)
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    Destino no-seekable para zipfile: acumula lo escrito hasta que el
+    generador lo drena. zipfile detecta que no es seekable y usa data
+    descriptors, así nunca hace falta el archivo completo en memoria o disco.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ArchiveService:
+    """
+    "Descargar como archivo" para carpetas y selecciones múltiples.
+
+    Modo 'nas': SYNO.FileStation.Compress genera un .zip temporal en el NAS,
+    TaskService sigue la tarea y al terminar se descarga en streaming y se borra.
+
+    Modo 'stream': el proxy arma un ZIP al vuelo (sin compresión, ZIP64) a
+    partir de descargas SYNO.FileStation.Download. Las siguientes descargas se
+    abren en paralelo (DOWNLOAD_CONCURRENCY) mientras se escribe la actual; solo
+    se retiene un trozo en memoria a la vez.
+    """
+
+    DOWNLOAD_CONCURRENCY = 3
+    CHUNK_SIZE = 64 * 1024
+    LIST_PAGE_SIZE = 1000
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.connection = file_service.connection
+
+    # --- Modo NAS (Compress) ---
+    def start_compress(self, paths):
+        """
+        Inicia la compresión en el NAS junto al primer elemento.
+        Retorna la respuesta del NAS con el taskid (seguido por TaskService).
+        """
+        if self.files.offline_mode:
+            return {'success': False, 'error': {'code': 503, 'msg': 'No disponible en modo offline'}}
+
+        dest_folder = posixpath.dirname(paths[0].rstrip('/')) or '/'
+        # Nombre único: dos compresiones simultáneas nunca escriben en el mismo .zip
+        dest_file_path = posixpath.join(dest_folder, f"descarga_{uuid.uuid4().hex[:12]}.zip")
+
+        response = self.connection.request(
+            api='SYNO.FileStation.Compress',
+            method='start',
+            version=3,
+            params={
+                'path': json.dumps(paths),
+                'dest_file_path': dest_file_path,
+                'level': 'fastest',
+                'mode': 'replace',
+                'format': 'zip'
+            }
+        )
+        if response.get('success'):
+            TaskService.register(
+                self.files.user_key, response.get('data', {}).get('taskid'), 'compress',
+                description=f"Comprimir {len(paths)} elemento(s)",
+                invalidate=[dest_folder],
+                # Si falla o se cancela, el .zip parcial se borra; si termina, tras descargarlo
+                extra={'dest_file_path': dest_file_path, 'temporary': True, 'discard': [dest_file_path]}
+            )
+        return response
+
+    def stream_compressed(self, taskid):
+        """
+        Descarga el .zip de una tarea Compress terminada del usuario y lo borra al acabar.
+        Retorna (iterator, filename, error).
+        """
+        task = TaskService.get_task(self.files.user_key, taskid)
+        if task is None or task['kind'] != 'compress':
+            return None, None, 'Tarea no encontrada'
+        if task['status'] != 'finished':
+            return None, None, 'La compresión aún no termina'
+
+        path = task['extra']['dest_file_path']
+        stream_res, error = self.files.get_file_stream(path)
+        if error:
+            return None, None, error
+
+        def _iter():
+            try:
+                for chunk in stream_res.iter_content(chunk_size=self.CHUNK_SIZE):
+                    yield chunk
+            finally:
+                stream_res.close()
+                if task['extra'].get('temporary'):
+                    self.files.delete_item([path])
+
+        return _iter(), posixpath.basename(path), None
+
+    # --- Modo streaming (ZIP en el proxy) ---
+    def stream_zip(self, paths):
+        """Generador de bytes de un ZIP con los archivos (y carpetas, recursivo) indicados."""
+        buffer = _ZipStreamBuffer()
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.DOWNLOAD_CONCURRENCY) as pool:
+            try:
+                with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+                    for entry in self._walk(paths):
+                        future = pool.submit(self.files.get_file_stream, entry['path']) if not entry['is_dir'] else None
+                        pending.append((entry, future))
+                        if len(pending) > self.DOWNLOAD_CONCURRENCY:
+                            yield from self._write_entry(zf, buffer, *pending.popleft())
+                    while pending:
+                        yield from self._write_entry(zf, buffer, *pending.popleft())
+            finally:
+                # Cliente desconectado o error: cerrar descargas ya abiertas
+                for _, future in pending:
+                    if future is not None:
+                        resp, _ = future.result()
+                        if resp is not None:
+                            resp.close()
+
+        # Directorio central escrito al cerrar el ZipFile
+        data = buffer.drain()
+        if data:
+            yield data
+
+    def _write_entry(self, zf, buffer, entry, future):
+        zinfo = zipfile.ZipInfo(entry['arcname'], date_time=self._zip_time(entry['mtime']))
+        zinfo.compress_type = zipfile.ZIP_STORED
+
+        if entry['is_dir']:
+            zinfo.filename = entry['arcname'].rstrip('/') + '/'
+            zf.writestr(zinfo, b'')
+        else:
+            resp, error = future.result()
+            if error:
+                logger.warning(f"[ZIP] Skipping {entry['path']}: {error}")
+                return
+            try:
+                with zf.open(zinfo, 'w', force_zip64=True) as dest:
+                    for chunk in resp.iter_content(chunk_size=self.CHUNK_SIZE):
+                        dest.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            finally:
+                resp.close()
+
+        data = buffer.drain()
+        if data:
+            yield data
+
+    def _walk(self, paths):
+        """
+        Expande la selección en entradas {'path', 'arcname', 'is_dir', 'mtime'}.
+        Los nombres en el ZIP son relativos a la carpeta de cada elemento elegido.
+        """
+        response = self.connection.request(
+            api='SYNO.FileStation.List',
+            method='getinfo',
+            version=2,
+            params={'path': json.dumps(paths), 'additional': json.dumps(["time"])}
+        )
+        if not response.get('success'):
+            return
+
+        for item in response.get('data', {}).get('files', []):
+            if item.get('code'):
+                continue
+            root = item['path']
+            base = posixpath.dirname(root.rstrip('/'))
+            mtime = item.get('additional', {}).get('time', {}).get('mtime', 0)
+            if not item.get('isdir'):
+                yield {'path': root, 'arcname': posixpath.relpath(root, base), 'is_dir': False, 'mtime': mtime}
+                continue
+
+            yield {'path': root, 'arcname': posixpath.relpath(root, base), 'is_dir': True, 'mtime': mtime}
+            queue = deque([root])
+            while queue:
+                folder = queue.popleft()
+                for child in self._list_all(folder):
+                    yield {
+                        'path': child['path'],
+                        'arcname': posixpath.relpath(child['path'], base),
+                        'is_dir': child['is_dir'],
+                        'mtime': child['time'],
+                    }
+                    if child['is_dir']:
+                        queue.append(child['path'])
+
+    def _list_all(self, folder):
+        offset = 0
+        while True:
+            page, ok = self.files._request_files_page(folder, {
+                'offset': offset,
+                'limit': self.LIST_PAGE_SIZE,
+                'sort_by': 'name',
+                'sort_direction': 'asc',
+                'filetype': 'all',
+                'pattern': None,
+                'additional': ["time"],
+            })
+            if not ok:
+                return
+            yield from page['items']
+            offset += len(page['items'])
+            if not page['items'] or offset >= page['total']:
+                return
+
+    @staticmethod
+    def _zip_time(mtime):
+        # ZIP no admite fechas anteriores a 1980
+        t = time.localtime(mtime or time.time())
+        return max(t[:6], (1980, 1, 1, 0, 0, 0))
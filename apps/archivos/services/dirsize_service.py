@@ -0,0 +1,173 @@
+import json
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.services.cache_registry import CacheRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class DirSizeService:
+    """
+    Tamaño de carpetas con tareas SYNO.FileStation.DirSize.
+
+    - Perezoso: solo se calcula lo que el cliente pide (carpetas visibles).
+    - Una tarea por carpeta y como máximo MAX_JOBS en curso en todo el proceso;
+      el resto queda 'queued' hasta que el cliente vuelva a consultar.
+    - Las peticiones concurrentes por la misma carpeta (de cualquier usuario o
+      pestaña) comparten la tarea: el registro vive en la caché global (ACTIVE,
+      un CacheRegistry seguro entre hilos y procesos).
+    - El resultado se cachea con el mtime de la carpeta y se descarta si cambia.
+      Un cambio profundo no altera el mtime de la carpeta: por eso además caduca
+      a los FILE_DIRSIZE_TTL segundos.
+    """
+
+    KEY_PREFIX = 'archivos:dirsize'
+    ACTIVE = CacheRegistry(f'{KEY_PREFIX}:active')
+    MAX_JOBS = 8
+    GETINFO_BATCH = 100
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.connection = file_service.connection
+        self.offline_mode = file_service.offline_mode
+
+    # --- Configuración ---
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'FILE_DIRSIZE_TTL', 3600)
+
+    @staticmethod
+    def job_timeout():
+        """Segundos máximos de una tarea DirSize antes de abandonarla."""
+        return getattr(settings, 'FILE_DIRSIZE_TIMEOUT', 600)
+
+    # --- Claves ---
+    def _result_key(self, path):
+        return f"{self.KEY_PREFIX}:result:{path}"
+
+    def _job_key(self, path):
+        return f"{self.KEY_PREFIX}:job:{path}"
+
+    # --- API pública ---
+    def get_sizes(self, paths):
+        """
+        Tamaño de cada carpeta. Retorna {path: {'status', 'size', 'formatted_size', 'num_file', 'num_dir'}}
+        con status 'ready', 'pending' (tarea en curso), 'queued' o 'error'.
+        """
+        if self.offline_mode:
+            return {p: self._ready({'size': 0, 'num_file': 0, 'num_dir': 0}) for p in paths}
+
+        mtimes = self._get_mtimes(paths)
+        sizes = {}
+        for path in paths:
+            if path not in mtimes:
+                sizes[path] = {'status': 'error', 'size': None, 'num_file': None, 'num_dir': None}
+                continue
+            cached = cache.get(self._result_key(path))
+            if cached is not None and cached['mtime'] == mtimes[path]:
+                sizes[path] = self._ready(cached)
+            else:
+                sizes[path] = self._advance_job(path, mtimes[path])
+        return sizes
+
+    # --- Tareas ---
+    def _advance_job(self, path, mtime):
+        """Inicia o consulta la tarea de la carpeta. Guarda el resultado al terminar."""
+        pending = {'status': 'pending', 'size': None, 'num_file': None, 'num_dir': None}
+        job = cache.get(self._job_key(path))
+
+        if job is None:
+            if len(self._active_jobs()) >= self.MAX_JOBS:
+                return {**pending, 'status': 'queued'}
+            # add() es atómico: solo una petición arranca la tarea
+            if not cache.add(self._job_key(path), {'taskid': None, 'started_at': time.time()}, timeout=self.job_timeout()):
+                return pending
+            response = self.connection.request(
+                api='SYNO.FileStation.DirSize',
+                method='start',
+                version=2,
+                params={'path': json.dumps([path])}
+            )
+            if not response.get('success'):
+                cache.delete(self._job_key(path))
+                return {**pending, 'status': 'error'}
+            job = {'taskid': response.get('data', {}).get('taskid'), 'started_at': time.time()}
+            cache.set(self._job_key(path), job, timeout=self.job_timeout())
+            self.ACTIVE.add(path, job['taskid'])
+            return pending
+
+        if job['taskid'] is None:
+            return pending
+
+        response = self.connection.request(
+            api='SYNO.FileStation.DirSize',
+            method='status',
+            version=2,
+            params={'taskid': job['taskid']}
+        )
+        data = response.get('data', {}) if response.get('success') else {}
+        if response.get('success') and not data.get('finished'):
+            if time.time() - job['started_at'] <= self.job_timeout():
+                return pending
+
+        self._stop(job['taskid'])
+        cache.delete(self._job_key(path))
+        self.ACTIVE.remove(path)
+        if not data.get('finished'):
+            return {**pending, 'status': 'error'}
+
+        result = {
+            'mtime': mtime,
+            'size': int(data.get('total_size') or 0),
+            'num_file': int(data.get('num_file') or 0),
+            'num_dir': int(data.get('num_dir') or 0),
+        }
+        cache.set(self._result_key(path), result, timeout=self.ttl())
+        return self._ready(result)
+
+    def _ready(self, result):
+        return {
+            'status': 'ready',
+            'size': result['size'],
+            'formatted_size': self.files._format_size(result['size']),
+            'num_file': result['num_file'],
+            'num_dir': result['num_dir'],
+        }
+
+    def _stop(self, taskid):
+        # DirSize no se limpia solo: stop libera la tarea en el NAS
+        try:
+            self.connection.request(api='SYNO.FileStation.DirSize', method='stop', version=2, params={'taskid': taskid})
+        except Exception:
+            logger.exception(f"Error stopping DirSize task {taskid}")
+
+    def _active_jobs(self):
+        """Carpetas con tarea en curso; las que expiraron sin consultarse se detienen en el NAS."""
+        alive = set()
+        for path, taskid in self.ACTIVE.items().items():
+            if cache.get(self._job_key(path)) is not None:
+                alive.add(path)
+            elif self.ACTIVE.remove(path) is not None and taskid:
+                self._stop(taskid)
+        return alive
+
+    def _get_mtimes(self, paths):
+        mtimes = {}
+        for i in range(0, len(paths), self.GETINFO_BATCH):
+            chunk = paths[i:i + self.GETINFO_BATCH]
+            response = self.connection.request(
+                api='SYNO.FileStation.List',
+                method='getinfo',
+                version=2,
+                params={'path': json.dumps(chunk), 'additional': json.dumps(["time"])}
+            )
+            if not response.get('success'):
+                continue
+            for f in response.get('data', {}).get('files', []):
+                if f.get('code') or not f.get('isdir'):
+                    continue
+                mtimes[f.get('path')] = f.get('additional', {}).get('time', {}).get('mtime')
+        return mtimes
@@ -1,9 +1,15 @@
 import logging
 import json
 import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from apps.settings.services.connection_service import ConnectionService
 from apps.settings.models import NASConfig
+from apps.core.services.background_service import BackgroundService
 from django.conf import settings
+from .listing_cache import ListingCache
+from .task_service import TaskService
+from .upload_service import UploadService
 
 logger = logging.getLogger(__name__)
 
@@ -13,16 +19,46 @@ class FileService:
     Encapsula lógica de listado, operaciones de archivos y manejo de permisos.
     """
 
-    def __init__(self):
+    # Campos de orden y tipos aceptados por SYNO.FileStation.List
+    SORT_FIELDS = ('name', 'size', 'user', 'group', 'mtime', 'atime', 'ctime', 'crtime', 'posix', 'type')
+    FILETYPES = ('all', 'file', 'dir')
+
+    # Perfiles de vista -> campos 'additional' mínimos que consume _process_items.
+    # real_path, volume_status y type (extensión) no se usan y son caros en DSM.
+    ADDITIONAL_PROFILES = {
+        'picker': [],                                # selector de carpetas: solo nombres
+        'grid': ["perm", "size"],                    # iconos: menú contextual y vista previa
+        'details': ["perm", "size", "owner", "time"],  # lista con columnas
+    }
+    DEFAULT_PROFILE = 'details'
+    # Sin perfil ni campos explícitos: todo, con normalización completa
+    FULL_ADDITIONAL = ["perm", "real_path", "size", "owner", "time", "type"]
+    FULL_SHARE_ADDITIONAL = ["perm", "real_path", "size", "owner", "time", "volume_status"]
+
+    # Operaciones por lotes
+    BATCH_ACTIONS = ('delete', 'copy', 'move', 'rename', 'create_folder')
+    BATCH_CONCURRENCY = 4
+    BATCH_PATH_CHUNK = 1000     # rutas por llamada multi-ruta
+    BATCH_SYNC_DELETE_MAX = 20  # más que esto se borra como tarea de fondo
+
+    def __init__(self, user=None, connection=None):
         self.config = NASConfig.get_active_config()
-        self.connection = ConnectionService(self.config)
+        # Usuario de la app (para aislar cachés por usuario)
+        self.user = user
+        self.user_key = user.pk if user is not None and getattr(user, 'is_authenticated', False) else 'anon'
         # Check offline mode
         self.offline_mode = getattr(settings, 'NAS_OFFLINE_MODE', False)
-        
+
+        if connection is not None:
+            # Conexión ya autenticada (ej. hilos de fondo): no repetir login
+            self.connection = connection
+            return
+
+        self.connection = ConnectionService(self.config)
         if not self.offline_mode:
             self.connection.authenticate()
 
-    def list_shares(self, additional=None):
+    def list_shares(self, additional=None, profile=None):
         """
         Lista las carpetas compartidas raíz (Shared Folders).
         API: SYNO.FileStation.List method=list_share
@@ -30,8 +66,8 @@ class FileService:
         if self.offline_mode:
             return self._get_mock_shares()
 
-        if additional is None:
-            additional = ["perm", "real_path", "size", "owner", "time", "volume_status"]
+        if additional is None and profile is not None:
+            additional = self.additional_for(profile)
             
         try:
             response = self.connection.request(
@@ -39,14 +75,14 @@ class FileService:
                 method='list_share',
                 version=2,
                 params={
-                    'additional': json.dumps(additional),
+                    'additional': json.dumps(self.FULL_SHARE_ADDITIONAL if additional is None else additional),
                     'check_dir': True
                 }
             )
             
             if response.get('success'):
                 shares = response.get('data', {}).get('shares', [])
-                return self._process_items(shares)
+                return self._process_items(shares, additional)
             else:
                 logger.error(f"Error listing shares: {response}")
                 return []
@@ -59,34 +95,176 @@ class FileService:
         Lista contenido de una carpeta específica.
         API: SYNO.FileStation.List method=list
         """
+        return self.list_files_page(folder_path, additional=additional)['items']
+
+    def list_files_page(self, folder_path, additional=None, offset=0, limit=0,
+                        sort_by='name', sort_direction='asc', filetype='all', pattern=None,
+                        force_refresh=False, profile=None):
+        """
+        Lista una página del contenido de una carpeta.
+        El NAS aplica offset/limit, orden, filtro de tipo y patrón de nombre,
+        así una carpeta de 100k entradas cuesta lo mismo que una pequeña.
+        limit=0 significa "todos" (comportamiento de DSM).
+
+        Los resultados pasan por ListingCache (por usuario y carpeta):
+        fresco -> se sirve directo; viejo -> se sirve y se revalida por mtime
+        en segundo plano. force_refresh ignora la caché y la reescribe.
+        profile elige los campos additional (ver ADDITIONAL_PROFILES) si no se
+        pasan explícitamente; los ítems solo traen lo que se pidió. Sin ninguno
+        de los dos se piden todos (FULL_ADDITIONAL) con la normalización completa.
+
+        Retorna: {'items': [...], 'total': int, 'offset': int}
+        """
+        if sort_by not in self.SORT_FIELDS:
+            sort_by = 'name'
+        if sort_direction not in ('asc', 'desc'):
+            sort_direction = 'asc'
+        if filetype not in self.FILETYPES:
+            filetype = 'all'
+
         if self.offline_mode:
-            return self._get_mock_files(folder_path)
+            return self._paginate_mock(
+                self._get_mock_files(folder_path), offset, limit,
+                sort_by, sort_direction, filetype, pattern
+            )
+
+        if additional is None and profile is not None:
+            additional = self.additional_for(profile)
+
+        options = {
+            'offset': offset,
+            'limit': limit,
+            'sort_by': sort_by,
+            'sort_direction': sort_direction,
+            'filetype': filetype,
+            'pattern': pattern,
+            'additional': additional,
+        }
+        key = ListingCache.make_key(self.user_key, folder_path, options)
+
+        if not force_refresh:
+            entry, is_fresh = ListingCache.get(key)
+            if entry is not None:
+                if not is_fresh:
+                    self._schedule_revalidation(key, folder_path, options, entry.get('mtime'))
+                return entry['page']
+
+        # mtime ANTES de listar: si cambia entre medio, la próxima revalidación lo detecta
+        mtime = self._get_folder_mtime(folder_path)
+        page, ok = self._request_files_page(folder_path, options)
+        if ok:
+            ListingCache.set(key, page, mtime)
+        return page
+
+    def list_tree(self, paths):
+        """
+        Subcarpetas de varias rutas a la vez para el árbol lateral del explorador.
+        Solo pide directorios (filetype=dir) y sin campos additional, así que un
+        nodo pesa unos pocos KB aunque la carpeta tenga miles de archivos. Cada
+        nodo pasa por ListingCache (revalidación por mtime de la carpeta).
+        '' o '/' devuelve las carpetas compartidas.
 
-        if additional is None:
-            # Metadata clave para el frontend
-            additional = ["perm", "real_path", "size", "owner", "time", "type"]
+        Retorna: {path: [{'name', 'path'}]}
+        """
+        def _children(path):
+            if path in ('', '/'):
+                items = self.list_shares(profile='picker')
+            else:
+                worker = self if self.offline_mode or len(paths) == 1 else \
+                    FileService(user=self.user, connection=self.connection.fork())
+                items = worker.list_files_page(path, filetype='dir', profile='picker')['items']
+            return [{'name': i['name'], 'path': i['path']} for i in items if i['is_dir']]
+
+        if len(paths) == 1:
+            return {paths[0]: _children(paths[0])}
+        with ThreadPoolExecutor(max_workers=self.BATCH_CONCURRENCY) as pool:
+            return dict(zip(paths, pool.map(_children, paths)))
+
+    def _request_files_page(self, folder_path, options):
+        """
+        Llamada real a SYNO.FileStation.List list.
+        Retorna (page, success) para no cachear errores.
+        """
+        offset = options['offset']
+        params = {
+            'folder_path': folder_path,
+            'offset': offset,
+            'limit': options['limit'],
+            'sort_by': options['sort_by'],
+            'sort_direction': options['sort_direction'],
+            'filetype': options['filetype'],
+            'additional': json.dumps(self.FULL_ADDITIONAL if options['additional'] is None else options['additional']),
+            'check_dir': True
+        }
+        if options.get('pattern'):
+            params['pattern'] = options['pattern']
 
         try:
             response = self.connection.request(
                 api='SYNO.FileStation.List',
                 method='list',
                 version=2,
-                params={
-                    'folder_path': folder_path,
-                    'additional': json.dumps(additional),
-                    'check_dir': True
-                }
+                params=params
             )
             
             if response.get('success'):
-                files = response.get('data', {}).get('files', [])
-                return self._process_items(files)
+                data = response.get('data', {})
+                files = data.get('files', [])
+                return {
+                    'items': self._process_items(files, options['additional']),
+                    'total': data.get('total', len(files)),
+                    'offset': data.get('offset', offset)
+                }, True
             else:
                  logger.error(f"Error listing files in {folder_path}: {response}")
-                 return []
+                 return {'items': [], 'total': 0, 'offset': offset}, False
         except Exception as e:
             logger.exception(f"Exception listing files in {folder_path}")
-            return []
+            return {'items': [], 'total': 0, 'offset': offset}, False
+
+    def _get_folder_mtime(self, folder_path):
+        """
+        mtime de una carpeta vía getinfo (llamada barata, sin listar hijos).
+        Retorna None si no se pudo obtener.
+        """
+        try:
+            response = self.connection.request(
+                api='SYNO.FileStation.List',
+                method='getinfo',
+                version=2,
+                params={
+                    'path': folder_path,
+                    'additional': json.dumps(["time"])
+                }
+            )
+            if response.get('success'):
+                files = response.get('data', {}).get('files', [])
+                if files:
+                    return files[0].get('additional', {}).get('time', {}).get('mtime')
+        except Exception:
+            logger.exception(f"Exception getting mtime of {folder_path}")
+        return None
+
+    def _schedule_revalidation(self, key, folder_path, options, cached_mtime):
+        """Revalida una entrada vieja en segundo plano con una conexión propia."""
+        worker = FileService(user=self.user, connection=self.connection.fork())
+        BackgroundService.submit(
+            f"archivos:revalidate:{key}",
+            worker._revalidate_listing, key, folder_path, options, cached_mtime
+        )
+
+    def _revalidate_listing(self, key, folder_path, options, cached_mtime):
+        """Si el mtime no cambió solo renueva la entrada; si cambió, vuelve a listar."""
+        mtime = self._get_folder_mtime(folder_path)
+        entry, _ = ListingCache.get(key)
+        if entry is None:
+            return
+        if mtime is not None and mtime == cached_mtime:
+            ListingCache.touch(key, entry)
+            return
+        page, ok = self._request_files_page(folder_path, options)
+        if ok:
+            ListingCache.set(key, page, mtime)
 
     def create_folder(self, folder_path, name, force_parent=False):
         """
@@ -108,6 +286,8 @@ class FileService:
                     'force_parent': str(force_parent).lower()
                 }
             )
+            if response.get('success'):
+                ListingCache.invalidate(folder_path)
             return response
         except Exception as e:
             return {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
@@ -130,14 +310,18 @@ class FileService:
                     'name': name
                 }
             )
+            if response.get('success'):
+                ListingCache.invalidate_items(path)
             return response
         except Exception as e:
              return {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
 
-    def delete_item(self, paths):
+    def delete_item(self, paths, background=False):
         """
-        Elimina archivo(s) o carpeta(s) (sincrónico).
-        API: SYNO.FileStation.Delete method=delete
+        Elimina archivo(s) o carpeta(s).
+        API: SYNO.FileStation.Delete method=delete (sincrónico)
+             SYNO.FileStation.Delete method=start (background=True, no bloqueante:
+             la tarea queda registrada en TaskService y se sigue por polling)
         """
         if self.offline_mode:
              return {'success': True}
@@ -146,6 +330,27 @@ class FileService:
             # paths puede ser una lista o un string separado por comas
             if isinstance(paths, list):
                 paths = ','.join(paths)
+
+            if background:
+                response = self.connection.request(
+                    api='SYNO.FileStation.Delete',
+                    method='start',
+                    version=2,
+                    params={
+                        'path': paths,
+                        'recursive': 'true',
+                        'accurate_progress': 'true'
+                    }
+                )
+                if response.get('success'):
+                    taskid = response.get('data', {}).get('taskid')
+                    items = paths.split(',')
+                    TaskService.register(
+                        self.user_key, taskid, 'delete',
+                        description=f"Eliminar {len(items)} elemento(s)",
+                        invalidate_items=items
+                    )
+                return response
                 
             response = self.connection.request(
                 api='SYNO.FileStation.Delete',
@@ -156,6 +361,8 @@ class FileService:
                     'recursive': 'true' 
                 }
             )
+            if response.get('success'):
+                ListingCache.invalidate_items(*paths.split(','))
             return response
         except Exception as e:
             return {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
@@ -268,12 +475,16 @@ class FileService:
                         continue
 
                     if result.get('success'):
+                        ListingCache.invalidate(folder_path)
                         logger.info(f"  ✓ SUCCESS with Strategy {idx} ({strategy['description']})")
                         logger.debug(f"    Response data: {result.get('data',  {})}")
                         return result
                     else:
                         error_info = result.get('error', {})
                         logger.warning(f"  ✗ Strategy {idx} failed: code={error_info.get('code')}, error={error_info}")
+                        if error_info.get('code') in UploadService.FATAL_ERRORS:
+                            # Permiso/cuota/espacio: otra estrategia fallaría igual
+                            return result
                         
                 except requests.exceptions.Timeout:
                     logger.warning(f"  ✗ Strategy {idx} failed: Timeout after 300s")
@@ -293,6 +504,53 @@ class FileService:
             logger.exception("[UPLOAD] Exception during upload")
             return {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
 
+    def upload_and_extract(self, folder_path, archive_obj):
+        """
+        Carga masiva de carpetas: sube un único archivo .zip (empaquetado por el
+        cliente) y lo descomprime en el NAS con SYNO.FileStation.Extract.
+        La carpeta destino se crea con create_parents; el .zip temporal se
+        borra cuando TaskService detecta que la extracción terminó.
+        """
+        if self.offline_mode:
+            return {'success': True, 'data': {'taskid': None}}
+
+        archive_name = f".upload_{uuid.uuid4().hex}.zip"
+        archive_path = f"{folder_path.rstrip('/')}/{archive_name}"
+        archive_obj.name = archive_name
+
+        upload_res = self.upload_file(folder_path, archive_obj, create_parents=True, overwrite=True)
+        if not upload_res.get('success'):
+            return upload_res
+
+        try:
+            response = self.connection.request(
+                api='SYNO.FileStation.Extract',
+                method='start',
+                version=2,
+                params={
+                    'file_path': archive_path,
+                    'dest_folder_path': folder_path,
+                    'overwrite': 'true',
+                    'keep_dir': 'true',
+                    'create_subfolder': 'false'
+                }
+            )
+        except Exception as e:
+            response = {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
+
+        if not response.get('success'):
+            # No dejar el .zip huérfano en la carpeta del usuario
+            self.delete_item([archive_path])
+            return response
+
+        TaskService.register(
+            self.user_key, response.get('data', {}).get('taskid'), 'extract',
+            description=f"Extraer carpeta en {folder_path}",
+            invalidate=[folder_path],
+            extra={'cleanup': [archive_path]}
+        )
+        return response
+
     def copy_move_item(self, path, dest_folder, is_move=False):
         """
         Inicia tarea de Copiado o Movimiento.
@@ -322,83 +580,96 @@ class FileService:
                 }
             )
             
-            # La respuesta incluye un taskid para polling.
-            # Para esta iteración, asumiremos que "start" exitoso es suficiente feedback
-            # o podríamos implementar un polling loop simple en el frontend si el taskid se retorna.
+            if response.get('success'):
+                # La tarea es asíncrona en el NAS: invalidamos ya y de nuevo cuando
+                # TaskService detecte que terminó.
+                sources = path.split(',')
+                ListingCache.invalidate(dest_folder)
+                if is_move:
+                    ListingCache.invalidate_items(*sources)
+                TaskService.register(
+                    self.user_key, response.get('data', {}).get('taskid'), action_name,
+                    description=f"{'Mover' if is_move else 'Copiar'} {len(sources)} elemento(s) a {dest_folder}",
+                    invalidate=[dest_folder],
+                    invalidate_items=sources if is_move else []
+                )
+
+            # La respuesta incluye un taskid: el explorador lo sigue vía api/tasks/
             return response
             
         except Exception as e:
              return {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
 
-    def search_files(self, folder_path, pattern):
+    def batch(self, operations):
         """
-        Busca archivos que coincidan con el patrón.
-        API: SYNO.FileStation.Search method=start -> list
-        Nota: Search también es asíncrono (start -> list task).
-        Para búsquedas rápidas, intentaremos listar y filtrar si el API de search es complejo de implementar en una fase.
-        
-        Sin embargo, SYNO.FileStation.List tiene filtros básicos? No, List es directo.
-        Vamos a usar SYNO.FileStation.Search correctamente.
-        1. start
-        2. list (con taskid)
-        
-        Simplificación para UX inmedita:
-        Si el usuario busca en una carpeta con pocos archivos, filtrado en cliente es mejor.
-        Si busca recursivo, necesitamos API.
-        
-        Implementaremos la API real.
-        """
-        if self.offline_mode:
-             # Retornar mocks filtrados es complejo sin estado real, devolvemos mocks estáticos
-             return self._get_mock_files(folder_path) # Return standard files as "results"
+        Ejecuta una lista de operaciones en una sola petición.
+        operations: [{'action': 'delete'|'copy'|'move'|'rename'|'create_folder', 'path', 'name', 'dest'}]
 
-        try:
-            # 1. Start Search Task
-            start_res = self.connection.request(
-                api='SYNO.FileStation.Search',
-                method='start',
-                version=2,
-                params={
-                    'folder_path': folder_path,
-                    'pattern': pattern,
-                    'recursive': 'true'
-                }
-            )
-            
-            if not start_res.get('success'):
-                return start_res
-                
-            task_id = start_res.get('data', {}).get('taskid')
-            
-            # 2. List Results (Synchronous wait logic simplified)
-            # En una app real, el frontend haría polling. Aquí haremos un wait corto y retornaremos lo que haya.
-            import time
-            time.sleep(0.5) # Esperar un poco a que indexe algo
-            
-            list_res = self.connection.request(
-                api='SYNO.FileStation.Search',
-                method='list',
-                version=2,
-                params={
-                    'taskid': task_id,
-                    'limit': 100,
-                    'additional': json.dumps(["size", "owner", "time", "type"])
-                }
-            )
-            
-            if list_res.get('success'):
-                files = list_res.get('data', {}).get('files', [])
-                return self._process_items(files)
+        - delete: todas se fusionan en una llamada SYNO.FileStation.Delete con rutas
+          separadas por coma (en segundo plano si son muchas).
+        - copy/move: se agrupan por (acción, destino) en una llamada CopyMove cada grupo.
+        - rename/create_folder: no tienen forma multi-ruta; se ejecutan con
+          concurrencia acotada (BATCH_CONCURRENCY), cada una con su propia conexión.
+
+        Retorna una lista de resultados en el mismo orden que operations.
+        """
+        results = [None] * len(operations)
+        deletes = []
+        transfers = {}
+        singles = []
+
+        for idx, op in enumerate(operations):
+            action = op.get('action') if isinstance(op, dict) else None
+            path = op.get('path') if isinstance(op, dict) else None
+            if action not in self.BATCH_ACTIONS or not path:
+                results[idx] = {'success': False, 'error': {'code': 400, 'msg': 'Invalid operation'}}
+            elif action == 'delete':
+                deletes.append((idx, path))
+            elif action in ('copy', 'move'):
+                if not op.get('dest'):
+                    results[idx] = {'success': False, 'error': {'code': 400, 'msg': 'Missing dest'}}
+                    continue
+                transfers.setdefault((action, op['dest']), []).append((idx, path))
             else:
-                 return []
-                 
-        except Exception as e:
-            return {'success': False, 'error': {'code': 9999, 'msg': str(e)}}
-            
-    def get_file_stream(self, path):
+                if not op.get('name'):
+                    results[idx] = {'success': False, 'error': {'code': 400, 'msg': 'Missing name'}}
+                    continue
+                singles.append((idx, op))
+
+        # Operaciones multi-ruta: una llamada por grupo (en trozos si es enorme)
+        for chunk in self._chunks(deletes):
+            res = self.delete_item([p for _, p in chunk], background=len(chunk) > self.BATCH_SYNC_DELETE_MAX)
+            for idx, _ in chunk:
+                results[idx] = res
+        for (action, dest), items in transfers.items():
+            for chunk in self._chunks(items):
+                res = self.copy_move_item(','.join(p for _, p in chunk), dest, is_move=(action == 'move'))
+                for idx, _ in chunk:
+                    results[idx] = res
+
+        if singles:
+            def _run(op):
+                worker = self if self.offline_mode else FileService(user=self.user, connection=self.connection.fork())
+                if op['action'] == 'rename':
+                    return worker.rename_item(op['path'], op['name'])
+                return worker.create_folder(op['path'], op['name'])
+
+            with ThreadPoolExecutor(max_workers=self.BATCH_CONCURRENCY) as pool:
+                for (idx, _), res in zip(singles, pool.map(_run, [op for _, op in singles])):
+                    results[idx] = res
+
+        return results
+
+    def _chunks(self, items):
+        for i in range(0, len(items), self.BATCH_PATH_CHUNK):
+            yield items[i:i + self.BATCH_PATH_CHUNK]
+
+    def get_file_stream(self, path, byte_range=None):
         """
         Obtiene stream de archivo para descarga o visualización.
         API: SYNO.FileStation.Download method=download
+        byte_range: valor de cabecera Range (ej. 'bytes=0-65535') para pedir
+        solo una parte; el NAS responde 206 si lo soporta.
         """
         if self.offline_mode:
              return None, "Offline mode"
@@ -417,8 +688,9 @@ class FileService:
                 '_sid': sid
             }
             
-            response = requests.get(url, params=params, stream=True, verify=False, timeout=300)
-            if response.status_code == 200:
+            headers = {'Range': byte_range} if byte_range else None
+            response = requests.get(url, params=params, headers=headers, stream=True, verify=False, timeout=300)
+            if response.status_code in (200, 206):
                 return response, None
             else:
                 return None, f"HTTP Error {response.status_code}"
@@ -434,10 +706,18 @@ class FileService:
         """
         return {'success': True, 'path': path}
 
-    def _process_items(self, items):
+    @classmethod
+    def additional_for(cls, profile):
+        return cls.ADDITIONAL_PROFILES.get(profile, cls.ADDITIONAL_PROFILES[cls.DEFAULT_PROFILE])
+
+    def _process_items(self, items, additional=None):
         """
         Procesa la lista cruda de ítems para normalizar datos y permisos para el frontend.
+        Con additional solo se normalizan los campos pedidos (None = todos).
         """
+        if additional is not None:
+            return [self._project_item(item, additional) for item in items]
+
         normalized = []
         for item in items:
             perm = item.get('perm', {})
@@ -476,6 +756,35 @@ class FileService:
             })
         return normalized
 
+    def _project_item(self, item, additional):
+        """Normalización parcial: omite lo que el NAS no envió."""
+        is_dir = item.get('isdir', False)
+        extra = item.get('additional', {})
+        out = {
+            'name': item.get('name'),
+            'path': item.get('path'),
+            'is_dir': is_dir,
+            'type': 'folder' if is_dir else self._guess_type(item.get('name')),
+        }
+        if 'size' in additional:
+            out['size'] = extra.get('size', 0)
+            out['formatted_size'] = self._format_size(out['size'])
+        if 'time' in additional:
+            out['time'] = extra.get('time', {}).get('mtime', 0)
+        if 'owner' in additional:
+            out['owner'] = extra.get('owner', {}).get('user', '')
+        if 'perm' in additional:
+            acl = extra.get('perm', item.get('perm', {})).get('acl', {})
+            out['permissions'] = {
+                'can_view': True,
+                'can_download': acl.get('read', True),
+                'can_write': acl.get('write', False),
+                'can_upload': acl.get('write', False) and is_dir,
+                'can_delete': acl.get('del', False),
+                'can_rename': acl.get('write', False)
+            }
+        return out
+
     def _format_size(self, size):
         # Convert bytes to human readable
         if not size: return '0 B'
@@ -495,6 +804,28 @@ class FileService:
         return 'file'
 
     # --- Mocks ---
+    def _paginate_mock(self, items, offset, limit, sort_by, sort_direction, filetype, pattern):
+        """Replica en local el paginado/orden/filtro que haría el NAS (modo offline)."""
+        import fnmatch
+        if filetype == 'dir':
+            items = [i for i in items if i['is_dir']]
+        elif filetype == 'file':
+            items = [i for i in items if not i['is_dir']]
+        if pattern:
+            items = [i for i in items if fnmatch.fnmatch(i['name'].lower(), f"*{pattern.lower()}*")]
+
+        sort_keys = {'size': 'size', 'mtime': 'time', 'type': 'type', 'user': 'owner'}
+        key = sort_keys.get(sort_by, 'name')
+        if key in ('size', 'time'):
+            sort_fn = lambda i: i.get(key) or 0
+        else:
+            sort_fn = lambda i: str(i.get(key) or '').lower()
+        items = sorted(items, key=sort_fn, reverse=(sort_direction == 'desc'))
+
+        total = len(items)
+        page = items[offset:offset + limit] if limit else items[offset:]
+        return {'items': page, 'total': total, 'offset': offset}
+
     def _get_mock_shares(self):
         """Simula carpetas raíz"""
         import time
@@ -0,0 +1,267 @@
+import json
+import logging
+import posixpath
+from collections import deque
+from django.db import transaction
+from django.utils import timezone
+
+from apps.archivos.models import IndexedShare, IndexedEntry
+from apps.core.services.background_service import BackgroundService
+from apps.core.services.trigram_index import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+
+class IndexService:
+    """
+    Índice local (SQLite) de nombres de archivo por carpeta compartida.
+
+    - Opt-in: solo se indexan las IndexedShare habilitadas.
+    - El crawler recorre la share con SYNO.FileStation.List. En pasadas
+      incrementales solo vuelve a listar carpetas cuyo mtime cambió; para las
+      que no cambiaron pide el mtime de sus subcarpetas en lote (getinfo).
+    - Las consultas resuelven prefijo (rango sobre name_lower indexado) y
+      subcadena (FTS5 trigram, o LIKE si no está disponible).
+    - Los resultados pueden estar desfasados: stat() verifica contra el NAS
+      al abrirlos y purga lo que ya no existe.
+
+    Nota: modificar un archivo existente no cambia el mtime de su carpeta;
+    tamaños/fechas de archivos se corrigen en la próxima pasada completa (full).
+    """
+
+    PAGE_SIZE = 1000
+    GETINFO_BATCH = 100
+    WRITE_BATCH = 500
+    FTS = TrigramIndex('archivos_indexedentry', 'name_lower')
+    LIST_ADDITIONAL = ["size", "time"]
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.connection = file_service.connection
+
+    # --- Programación ---
+    @staticmethod
+    def share_for(path):
+        """IndexedShare habilitada que contiene path (o None)."""
+        if not path:
+            return None
+        for share in IndexedShare.objects.filter(enabled=True):
+            root = share.path.rstrip('/')
+            if path == root or path.startswith(root + '/'):
+                return share
+        return None
+
+    @classmethod
+    def schedule_crawl(cls, share_path, full=False):
+        """Encola un crawl en segundo plano (uno por share a la vez)."""
+        return BackgroundService.submit(f"archivos:index:{share_path}", cls._crawl_in_background, share_path, full)
+
+    @classmethod
+    def _crawl_in_background(cls, share_path, full):
+        from .file_service import FileService
+        share = IndexedShare.objects.filter(path=share_path, enabled=True).first()
+        if share:
+            cls(FileService()).crawl(share, full=full)
+
+    # --- Crawler ---
+    def crawl(self, share, full=False):
+        """
+        Recorre la share en anchura sincronizando el índice.
+        full=True vuelve a listar todas las carpetas aunque su mtime no cambió.
+        """
+        share.status = 'running'
+        share.last_crawl_started = timezone.now()
+        share.last_error = ''
+        share.save(update_fields=['status', 'last_crawl_started', 'last_error'])
+
+        try:
+            root = share.path.rstrip('/') or '/'
+            IndexedEntry.objects.get_or_create(
+                path=root,
+                defaults={
+                    'share': share, 'parent': posixpath.dirname(root),
+                    'name': posixpath.basename(root), 'name_lower': posixpath.basename(root).lower(),
+                    'is_dir': True,
+                }
+            )
+            queue = deque([(root, self.files._get_folder_mtime(root))])
+            listed = 0
+
+            while queue:
+                folder, mtime = queue.popleft()
+                stored = IndexedEntry.objects.filter(path=folder).values_list('listed_mtime', flat=True).first()
+
+                if not full and mtime is not None and stored == mtime:
+                    # Hijos directos sin cambios: solo bajar a subcarpetas
+                    subdirs = list(IndexedEntry.objects.filter(parent=folder, is_dir=True).values_list('path', flat=True))
+                    mtimes = self._get_mtimes(subdirs)
+                    queue.extend((sub, mtimes.get(sub)) for sub in subdirs if sub in mtimes)
+                    continue
+
+                children = self._list_all(folder)
+                if children is None:
+                    continue
+                listed += 1
+                self._sync_children(share, folder, children)
+                IndexedEntry.objects.filter(path=folder).update(listed_mtime=mtime)
+                queue.extend((c['path'], c['time'] or None) for c in children if c['is_dir'])
+
+            share.status = 'idle'
+            share.entry_count = share.entries.count()
+            logger.info(f"[INDEX] Crawl of {share.path} finished: {listed} folders listed, {share.entry_count} entries")
+        except Exception as e:
+            logger.exception(f"[INDEX] Crawl of {share.path} failed")
+            share.status = 'error'
+            share.last_error = str(e)
+
+        share.last_crawl_finished = timezone.now()
+        share.save(update_fields=['status', 'entry_count', 'last_error', 'last_crawl_finished'])
+        return share
+
+    def _list_all(self, folder):
+        """Lista todos los hijos paginando. None si el NAS falla."""
+        children = []
+        offset = 0
+        while True:
+            page, ok = self.files._request_files_page(folder, {
+                'offset': offset,
+                'limit': self.PAGE_SIZE,
+                'sort_by': 'name',
+                'sort_direction': 'asc',
+                'filetype': 'all',
+                'pattern': None,
+                'additional': self.LIST_ADDITIONAL,
+            })
+            if not ok:
+                return None
+            children.extend(page['items'])
+            offset += len(page['items'])
+            if not page['items'] or offset >= page['total']:
+                return children
+
+    def _get_mtimes(self, paths):
+        """mtime de varias rutas con getinfo en lotes. Omite las que ya no existen."""
+        mtimes = {}
+        for i in range(0, len(paths), self.GETINFO_BATCH):
+            chunk = paths[i:i + self.GETINFO_BATCH]
+            try:
+                response = self.connection.request(
+                    api='SYNO.FileStation.List',
+                    method='getinfo',
+                    version=2,
+                    params={
+                        # Arreglo JSON: admite nombres con comas
+                        'path': json.dumps(chunk),
+                        'additional': json.dumps(["time"])
+                    }
+                )
+            except Exception:
+                logger.exception("[INDEX] getinfo batch failed")
+                continue
+            if not response.get('success'):
+                continue
+            for f in response.get('data', {}).get('files', []):
+                if f.get('code'):
+                    continue
+                mtimes[f.get('path')] = f.get('additional', {}).get('time', {}).get('mtime')
+        return mtimes
+
+    @transaction.atomic
+    def _sync_children(self, share, folder, children):
+        existing = {e.path: e for e in IndexedEntry.objects.filter(parent=folder)}
+        to_create, to_update = [], []
+
+        for child in children:
+            path = child['path']
+            fields = {
+                'name': child['name'],
+                'name_lower': (child['name'] or '').lower(),
+                'is_dir': child['is_dir'],
+                'size': int(child['size'] or 0),
+                'mtime': int(child['time'] or 0),
+            }
+            entry = existing.pop(path, None)
+            if entry is None:
+                to_create.append(IndexedEntry(share=share, path=path, parent=folder, **fields))
+            elif any(getattr(entry, k) != v for k, v in fields.items()):
+                for k, v in fields.items():
+                    setattr(entry, k, v)
+                to_update.append(entry)
+
+        IndexedEntry.objects.bulk_create(to_create, batch_size=self.WRITE_BATCH)
+        IndexedEntry.objects.bulk_update(to_update, ['name', 'name_lower', 'is_dir', 'size', 'mtime'], batch_size=self.WRITE_BATCH)
+
+        # Lo que quedó en existing ya no está en el NAS
+        for path in existing:
+            self._purge(path)
+
+    @staticmethod
+    def _purge(path):
+        IndexedEntry.objects.filter(path=path).delete()
+        IndexedEntry.objects.filter(path__startswith=path.rstrip('/') + '/').delete()
+
+    # --- Consultas ---
+    @classmethod
+    def fts_available(cls):
+        return cls.FTS.available()
+
+    def search(self, query, folder_path=None, limit=200):
+        """
+        Busca por nombre en el índice. Primero coincidencias por prefijo,
+        luego por subcadena (trigram). Retorna ítems normalizados como un listado.
+        """
+        q = (query or '').strip().lower()
+        if not q:
+            return []
+
+        base = IndexedEntry.objects.filter(share__enabled=True)
+        if folder_path:
+            base = base.filter(path__startswith=folder_path.rstrip('/') + '/')
+
+        # Prefijo como rango: aprovecha el índice de name_lower
+        results = list(base.filter(name_lower__gte=q, name_lower__lt=q + '\uffff').order_by('name_lower')[:limit])
+
+        if len(results) < limit:
+            seen = {e.pk for e in results}
+            remaining = limit - len(results)
+            if len(q) >= 3 and self.fts_available():
+                # Subconsulta sin LIMIT propio: el tope se aplica tras filtrar por carpeta
+                substring = base.filter(pk__in=self.FTS.match(q)).exclude(pk__in=seen)[:remaining]
+            else:
+                substring = base.filter(name_lower__contains=q).exclude(pk__in=seen)[:remaining]
+            results.extend(substring)
+
+        return self.files._process_items([self._to_raw(e) for e in results])
+
+    @staticmethod
+    def _to_raw(entry):
+        """Entrada del índice con la forma cruda de SYNO.FileStation.List."""
+        return {
+            'name': entry.name,
+            'path': entry.path,
+            'isdir': entry.is_dir,
+            'additional': {'size': entry.size, 'time': {'mtime': entry.mtime}},
+        }
+
+    def stat(self, path):
+        """
+        Verifica un resultado contra el NAS. Si ya no existe lo purga del índice.
+        Retorna el ítem normalizado o None.
+        """
+        if self.files.offline_mode:
+            return None
+        response = self.connection.request(
+            api='SYNO.FileStation.List',
+            method='getinfo',
+            version=2,
+            params={
+                'path': json.dumps([path]),
+                'additional': json.dumps(["perm", "size", "owner", "time", "type"])
+            }
+        )
+        files = response.get('data', {}).get('files', []) if response.get('success') else []
+        if not files or files[0].get('code'):
+            if response.get('success'):
+                self._purge(path)
+            return None
+        return self.files._process_items(files)[0]
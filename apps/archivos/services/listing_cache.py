@@ -0,0 +1,111 @@
+import hashlib
+import json
+import logging
+import posixpath
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class ListingCache:
+    """
+    Caché de listados de carpetas por usuario y por carpeta.
+
+    - Cada entrada guarda la página normalizada y el mtime de la carpeta.
+    - Mientras la entrada es "fresca" (LISTING_CACHE_TTL) se sirve sin tocar el NAS.
+    - Pasado ese tiempo se sirve igualmente (stale) y se revalida en segundo
+      plano comparando el mtime de la carpeta (una llamada getinfo barata).
+    - Las escrituras hechas desde la app (crear, renombrar, borrar, subir,
+      copiar/mover) invalidan la carpeta afectada incrementando su versión,
+      lo que deja huérfanas todas sus entradas (de todos los usuarios).
+
+    Nota: el mtime de un directorio cambia al crear/borrar/renombrar hijos
+    directos, no al modificar el contenido de un archivo existente.
+    """
+
+    KEY_PREFIX = 'archivos:list'
+
+    @staticmethod
+    def fresh_ttl():
+        return getattr(settings, 'FILE_LISTING_CACHE_TTL', 15)
+
+    @staticmethod
+    def max_age():
+        return getattr(settings, 'FILE_LISTING_CACHE_MAX_AGE', 600)
+
+    @staticmethod
+    def _hash(value):
+        return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _normalize(cls, folder_path):
+        folder_path = (folder_path or '/').rstrip('/')
+        return folder_path or '/'
+
+    @classmethod
+    def _version_key(cls, folder_path):
+        return f"{cls.KEY_PREFIX}:ver:{cls._hash(cls._normalize(folder_path))}"
+
+    @classmethod
+    def _get_version(cls, folder_path):
+        key = cls._version_key(folder_path)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, 1, timeout=None)
+            version = cache.get(key, 1)
+        return version
+
+    @classmethod
+    def make_key(cls, user_key, folder_path, options):
+        """Clave de entrada: versión de carpeta + usuario + carpeta + opciones de listado."""
+        folder = cls._normalize(folder_path)
+        opts = cls._hash(json.dumps(options, sort_keys=True, default=str))
+        return f"{cls.KEY_PREFIX}:{cls._get_version(folder)}:{user_key}:{cls._hash(folder)}:{opts}"
+
+    @classmethod
+    def get(cls, key):
+        """
+        Retorna (entry, is_fresh). entry es None si no existe.
+        entry = {'page': {...}, 'mtime': int|None, 'fetched_at': float}
+        """
+        entry = cache.get(key)
+        if entry is None:
+            return None, False
+        return entry, (time.time() - entry.get('fetched_at', 0)) < cls.fresh_ttl()
+
+    @classmethod
+    def set(cls, key, page, mtime):
+        cache.set(key, {'page': page, 'mtime': mtime, 'fetched_at': time.time()}, timeout=cls.max_age())
+
+    @classmethod
+    def touch(cls, key, entry):
+        """Marca una entrada como revalidada (el mtime no cambió)."""
+        entry['fetched_at'] = time.time()
+        cache.set(key, entry, timeout=cls.max_age())
+
+    @classmethod
+    def invalidate(cls, *folder_paths):
+        """Invalida todas las entradas (de cualquier usuario) de las carpetas dadas."""
+        for folder_path in folder_paths:
+            if not folder_path:
+                continue
+            key = cls._version_key(folder_path)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # No existía versión: crear una distinta de la inicial
+                cache.set(key, 2, timeout=None)
+
+    @classmethod
+    def invalidate_items(cls, *paths):
+        """Invalida la carpeta padre de cada ítem y el ítem mismo (por si es carpeta)."""
+        folders = set()
+        for path in paths:
+            if not path:
+                continue
+            path = cls._normalize(path)
+            folders.add(path)
+            folders.add(posixpath.dirname(path) or '/')
+        cls.invalidate(*folders)
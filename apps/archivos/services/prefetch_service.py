@@ -0,0 +1,97 @@
+import logging
+import posixpath
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.services.background_service import BackgroundService
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchService:
+    """
+    Precarga especulativa de listados para que la próxima navegación sea instantánea.
+
+    Tras listar una carpeta se calientan en ListingCache sus primeras
+    FILE_PREFETCH_COUNT subcarpetas y la carpeta padre, con las mismas opciones
+    de listado (orden, tamaño de página, perfil) que usará el cliente.
+
+    - Carril 'low' de BackgroundService: nunca compite con el trabajo normal.
+    - Presupuesto por usuario: FILE_PREFETCH_PER_MINUTE listados por minuto.
+    - Al navegar a otra carpeta, lo encolado para la anterior se descarta
+      antes de ejecutarse (marca de "carpeta actual" por usuario).
+    - Usa la conexión del usuario (fork), así la caché queda bajo su clave.
+    """
+
+    KEY_PREFIX = 'archivos:prefetch'
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.user_key = file_service.user_key
+
+    # --- Configuración ---
+    @staticmethod
+    def count():
+        return getattr(settings, 'FILE_PREFETCH_COUNT', 5)
+
+    @staticmethod
+    def per_minute():
+        return getattr(settings, 'FILE_PREFETCH_PER_MINUTE', 30)
+
+    # --- Claves ---
+    def _current_key(self):
+        return f"{self.KEY_PREFIX}:current:{self.user_key}"
+
+    def _budget_key(self):
+        return f"{self.KEY_PREFIX}:budget:{self.user_key}"
+
+    # --- API pública ---
+    def schedule(self, folder_path, items, options):
+        """
+        Encola la precarga de los vecinos de folder_path.
+        items: página recién listada; options: kwargs de list_files_page usados.
+        Retorna la lista de rutas encoladas.
+        """
+        # Cada navegación cancela lo pendiente de la anterior
+        cache.set(self._current_key(), folder_path, timeout=300)
+        if self.files.offline_mode or self.count() <= 0:
+            return []
+
+        targets = [i['path'] for i in items if i.get('is_dir')][:self.count()]
+        parent = posixpath.dirname(folder_path.rstrip('/'))
+        if parent and parent != '/':
+            targets.append(parent)
+
+        from .file_service import FileService
+        options = {k: v for k, v in options.items() if k not in ('offset', 'pattern', 'force_refresh')}
+        scheduled = []
+        for path in targets:
+            if not self._take_budget():
+                break
+            worker = FileService(user=self.files.user, connection=self.files.connection.fork())
+            BackgroundService.submit(
+                f"archivos:prefetch:{self.user_key}:{path}",
+                self._warm, worker, folder_path, path, options,
+                lane='low'
+            )
+            scheduled.append(path)
+        return scheduled
+
+    # --- Internos ---
+    def _take_budget(self):
+        key = self._budget_key()
+        cache.add(key, 0, timeout=60)
+        try:
+            used = cache.incr(key)
+        except ValueError:
+            # La ventana expiró entre add e incr
+            cache.set(key, 1, timeout=60)
+            used = 1
+        return used <= self.per_minute()
+
+    def _warm(self, worker, origin, path, options):
+        if cache.get(self._current_key()) != origin:
+            return False
+        # Pasa por ListingCache: si ya está fresco no toca el NAS
+        worker.list_files_page(path, **options)
+        return True
@@ -0,0 +1,193 @@
+import codecs
+import json
+import logging
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewService:
+    """
+    Vista previa parcial de archivos grandes (logs, texto, PDF).
+
+    Solo se piden al NAS los bytes de la ventana solicitada (cabecera Range en
+    SYNO.FileStation.Download) y nunca se leen más de esos bytes aunque el NAS
+    ignore el Range. El fragmento se cachea por ruta + mtime + ventana.
+
+    - Texto: se detecta la codificación (BOM, UTF-8, charset-normalizer) y se
+      devuelve decodificado. Las páginas son ventanas de bytes consecutivas;
+      next_offset indica dónde empieza la siguiente (sin cortar caracteres).
+    - PDF: solo se inspecciona la cabecera; el navegador lo abre por
+      FileDownloadView, que reenvía Range para que el visor pida lo que necesite.
+    """
+
+    KEY_PREFIX = 'archivos:preview'
+    BINARY_THRESHOLD = 0.10  # proporción de bytes de control => binario
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.connection = file_service.connection
+        self.offline_mode = file_service.offline_mode
+
+    # --- Configuración ---
+    @staticmethod
+    def default_bytes():
+        return getattr(settings, 'FILE_PREVIEW_BYTES', 64 * 1024)
+
+    @staticmethod
+    def max_bytes():
+        return getattr(settings, 'FILE_PREVIEW_MAX_BYTES', 1024 * 1024)
+
+    @staticmethod
+    def cache_ttl():
+        return getattr(settings, 'FILE_PREVIEW_CACHE_TTL', 600)
+
+    # --- API pública ---
+    def preview(self, path, offset=0, length=None, tail=False, encoding=None):
+        """
+        Fragmento de path desde offset (o los últimos length bytes con tail).
+        encoding: el detectado en la primera página, para las siguientes
+        (ej. UTF-16 solo se reconoce por el BOM del inicio).
+        Retorna {'success', 'type', 'encoding', 'content', 'offset', 'next_offset', 'size', 'eof'}.
+        """
+        if self.offline_mode:
+            return {'success': False, 'message': 'Vista previa no disponible en modo offline'}
+
+        length = min(int(length or self.default_bytes()), self.max_bytes())
+        info = self._stat(path)
+        if info is None:
+            return {'success': False, 'message': 'Archivo no encontrado'}
+        if tail:
+            offset = max(0, info['size'] - length)
+        offset = max(0, min(int(offset), info['size']))
+
+        if encoding:
+            try:
+                encoding = codecs.lookup(encoding).name
+            except LookupError:
+                encoding = None
+
+        key = f"{self.KEY_PREFIX}:{path}:{info['mtime']}:{offset}:{length}:{encoding}"
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        data, error = self._read_range(path, offset, length)
+        if error:
+            return {'success': False, 'message': error}
+
+        result = self._describe(data, offset, info['size'], encoding)
+        cache.set(key, result, timeout=self.cache_ttl())
+        return result
+
+    # --- Internos ---
+    def _stat(self, path):
+        response = self.connection.request(
+            api='SYNO.FileStation.List',
+            method='getinfo',
+            version=2,
+            params={'path': json.dumps([path]), 'additional': json.dumps(["size", "time"])}
+        )
+        files = response.get('data', {}).get('files', []) if response.get('success') else []
+        if not files or files[0].get('code') or files[0].get('isdir'):
+            return None
+        additional = files[0].get('additional', {})
+        return {'size': int(additional.get('size') or 0), 'mtime': additional.get('time', {}).get('mtime')}
+
+    def _read_range(self, path, offset, length):
+        """Lee como máximo length bytes desde offset. Retorna (bytes, error)."""
+        stream_res, error = self.files.get_file_stream(path, byte_range=f"bytes={offset}-{offset + length - 1}")
+        if error:
+            return None, error
+        try:
+            if stream_res.status_code != 206 and offset:
+                # El NAS ignoró el Range: descartar hasta llegar al offset
+                logger.warning(f"[PREVIEW] Range not honoured for {path}, skipping {offset} bytes")
+                skipped = 0
+                for chunk in stream_res.iter_content(chunk_size=64 * 1024):
+                    skipped += len(chunk)
+                    if skipped > offset:
+                        buf = bytearray(chunk[len(chunk) - (skipped - offset):])
+                        break
+                else:
+                    return b'', None
+            else:
+                buf = bytearray()
+            for chunk in stream_res.iter_content(chunk_size=16 * 1024):
+                buf.extend(chunk)
+                if len(buf) >= length:
+                    break
+            return bytes(buf[:length]), None
+        finally:
+            # Cerrar corta la descarga: no se transfiere el resto del archivo
+            stream_res.close()
+
+    def _describe(self, data, offset, size, encoding=None):
+        result = {
+            'success': True,
+            'type': 'binary',
+            'encoding': None,
+            'content': None,
+            'offset': offset,
+            'next_offset': offset + len(data),
+            'size': size,
+            'eof': offset + len(data) >= size,
+        }
+        if offset == 0 and data.startswith(b'%PDF-'):
+            result['type'] = 'pdf'
+            result['linearized'] = b'/Linearized' in data[:2048]
+            return result
+
+        encoding = encoding or self._detect_encoding(data, offset)
+        if encoding is None:
+            return result
+
+        # Decodificador incremental: un carácter multibyte cortado al final
+        # queda fuera y la siguiente página empieza en él
+        start = self._skip_partial_char(data, encoding) if offset else 0
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        text = decoder.decode(data[start:], final=result['eof'])
+        pending = len(decoder.getstate()[0])
+        result.update({
+            'type': 'text',
+            'encoding': encoding,
+            'content': text,
+            'next_offset': offset + len(data) - pending,
+        })
+        return result
+
+    def _detect_encoding(self, data, offset):
+        """Codificación del fragmento o None si parece binario."""
+        if offset == 0:
+            for bom, encoding in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')):
+                if data.startswith(bom):
+                    return encoding
+        if not data:
+            return 'utf-8'
+
+        control = sum(1 for b in data[:4096] if b < 9 or 13 < b < 32)
+        if b'\x00' in data[:4096] or control / min(len(data), 4096) > self.BINARY_THRESHOLD:
+            return None
+
+        try:
+            # Tolerar un carácter cortado en cualquiera de los bordes de la ventana
+            start = self._skip_partial_char(data, 'utf-8')
+            codecs.getincrementaldecoder('utf-8')().decode(data[start:], final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+
+        from charset_normalizer import from_bytes
+        best = from_bytes(data[:64 * 1024]).best()
+        return best.encoding if best else 'latin-1'
+
+    @staticmethod
+    def _skip_partial_char(data, encoding):
+        """En UTF-8, salta bytes de continuación al inicio de una página intermedia."""
+        if encoding.replace('-', '').replace('_', '').lower() not in ('utf8', 'utf8sig'):
+            return 0
+        start = 0
+        while start < min(len(data), 3) and 0x80 <= data[start] <= 0xBF:
+            start += 1
+        return start
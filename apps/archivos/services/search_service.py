@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.services.cache_registry import CacheRegistry
+
+from .task_service import TaskService
+
+logger = logging.getLogger(__name__)
+
+
+class SearchService:
+    """
+    Búsqueda asíncrona sobre SYNO.FileStation.Search.
+
+    Flujo:
+    1. start(): inicia la tarea en el NAS (o reutiliza una búsqueda idéntica
+       reciente del mismo usuario) y devuelve un search_id propio.
+    2. poll(): el frontend pide resultados incrementales con offset hasta
+       que la tarea reporta finished. Al terminar (o al expirar) se guardan
+       los resultados en caché y la tarea se limpia en el NAS (stop + clean).
+    3. cancel(): detiene y limpia la tarea bajo demanda.
+
+    Las tareas en curso de todos los usuarios se registran en ACTIVE (un
+    CacheRegistry: seguro entre hilos y procesos). Las
+    que superan el timeout sin terminar (el navegador se cerró) se detienen y
+    limpian en el NAS desde start()/poll()/cancel() de cualquier usuario y
+    desde el poller compartido de TaskService, que sigue vivo mientras haya
+    búsquedas en curso: no quedan huérfanas aunque nadie vuelva a buscar.
+    """
+
+    KEY_PREFIX = 'archivos:search'
+    ACTIVE = CacheRegistry(f'{KEY_PREFIX}:active')
+    ADDITIONAL = ["size", "owner", "time", "type"]
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.connection = file_service.connection
+        self.user_key = file_service.user_key
+        self.offline_mode = file_service.offline_mode
+
+    # --- Configuración ---
+    @staticmethod
+    def timeout():
+        """Segundos máximos que una tarea puede correr en el NAS."""
+        return getattr(settings, 'FILE_SEARCH_TIMEOUT', 120)
+
+    @staticmethod
+    def result_ttl():
+        """Segundos que se reutilizan los resultados de una búsqueda terminada."""
+        return getattr(settings, 'FILE_SEARCH_RESULT_TTL', 120)
+
+    @staticmethod
+    def max_results():
+        return getattr(settings, 'FILE_SEARCH_MAX_RESULTS', 5000)
+
+    # --- Claves ---
+    def _entry_key(self, search_id):
+        return f"{self.KEY_PREFIX}:{search_id}"
+
+    def _query_key(self, folder_path, pattern):
+        digest = hashlib.md5(json.dumps([folder_path, pattern]).encode('utf-8')).hexdigest()
+        return f"{self.KEY_PREFIX}:q:{self.user_key}:{digest}"
+
+    def _entry_ttl(self):
+        return self.timeout() + self.result_ttl()
+
+    # --- API pública ---
+    def start(self, folder_path, pattern):
+        """
+        Inicia (o reutiliza) una búsqueda recursiva.
+        Retorna {'success', 'search_id', 'reused'} o el error del NAS.
+        """
+        self._reap_expired()
+
+        query_key = self._query_key(folder_path, pattern)
+        search_id = cache.get(query_key)
+        if search_id and self._get_entry(search_id) is not None:
+            return {'success': True, 'search_id': search_id, 'reused': True}
+
+        search_id = uuid.uuid4().hex
+        entry = {
+            'user_key': self.user_key,
+            'folder_path': folder_path,
+            'pattern': pattern,
+            'taskid': None,
+            'started_at': time.time(),
+            'finished': False,
+            'timed_out': False,
+            'items': [],
+        }
+
+        if self.offline_mode:
+            entry['finished'] = True
+            entry['items'] = self.files._get_mock_files(folder_path)
+        else:
+            start_res = self.connection.request(
+                api='SYNO.FileStation.Search',
+                method='start',
+                version=2,
+                params={
+                    'folder_path': folder_path,
+                    'pattern': pattern,
+                    'recursive': 'true'
+                }
+            )
+            if not start_res.get('success'):
+                return start_res
+            entry['taskid'] = start_res.get('data', {}).get('taskid')
+            self._register_active(search_id, entry['started_at'], entry['taskid'])
+            # El poller compartido barre esta tarea si nadie vuelve a consultarla
+            TaskService.ensure_poller()
+
+        cache.set(self._entry_key(search_id), entry, timeout=self._entry_ttl())
+        cache.set(query_key, search_id, timeout=self._entry_ttl())
+        return {'success': True, 'search_id': search_id, 'reused': False}
+
+    def poll(self, search_id, offset=0, limit=100):
+        """
+        Resultados desde offset. Retorna:
+        {'success', 'items', 'offset', 'total', 'finished', 'timed_out'}
+        """
+        self._reap_expired()
+        entry = self._get_entry(search_id)
+        if entry is None:
+            return {'success': False, 'message': 'Búsqueda no encontrada o expirada'}
+
+        if not entry['finished']:
+            expired = time.time() - entry['started_at'] > self.timeout()
+            res = self._list_task(entry['taskid'], offset, limit)
+            if not res.get('success'):
+                return res
+            data = res.get('data', {})
+            if data.get('finished') or expired:
+                self._finish(search_id, entry, timed_out=not data.get('finished'))
+            else:
+                return {
+                    'success': True,
+                    'items': self.files._process_items(data.get('files', [])),
+                    'offset': offset,
+                    'total': data.get('total', 0),
+                    'finished': False,
+                    'timed_out': False,
+                }
+
+        items = entry['items']
+        return {
+            'success': True,
+            'items': items[offset:offset + limit] if limit else items[offset:],
+            'offset': offset,
+            'total': len(items),
+            'finished': True,
+            'timed_out': entry['timed_out'],
+        }
+
+    def cancel(self, search_id):
+        """Detiene y limpia la tarea en el NAS y olvida la búsqueda."""
+        self._reap_expired()
+        entry = self._get_entry(search_id)
+        if entry is None:
+            return {'success': True}
+        if not entry['finished']:
+            self._cleanup_task(entry['taskid'])
+            self._unregister_active(search_id)
+        cache.delete(self._entry_key(search_id))
+        cache.delete(self._query_key(entry['folder_path'], entry['pattern']))
+        return {'success': True}
+
+    # --- Internos ---
+    def _get_entry(self, search_id):
+        entry = cache.get(self._entry_key(search_id))
+        if entry is None or entry.get('user_key') != self.user_key:
+            return None
+        return entry
+
+    def _list_task(self, taskid, offset, limit):
+        return self.connection.request(
+            api='SYNO.FileStation.Search',
+            method='list',
+            version=2,
+            params={
+                'taskid': taskid,
+                'offset': offset,
+                'limit': limit,
+                'additional': json.dumps(self.ADDITIONAL)
+            }
+        )
+
+    def _finish(self, search_id, entry, timed_out=False):
+        """Recoge todos los resultados, los cachea y libera la tarea del NAS."""
+        res = self._list_task(entry['taskid'], 0, self.max_results())
+        files = res.get('data', {}).get('files', []) if res.get('success') else []
+        entry['items'] = self.files._process_items(files)
+        entry['finished'] = True
+        entry['timed_out'] = timed_out
+        self._cleanup_task(entry['taskid'])
+        self._unregister_active(search_id)
+        cache.set(self._entry_key(search_id), entry, timeout=self.result_ttl())
+        cache.set(self._query_key(entry['folder_path'], entry['pattern']), search_id, timeout=self.result_ttl())
+
+    def _cleanup_task(self, taskid):
+        if self.offline_mode:
+            return
+        self._cleanup(self.connection, taskid)
+
+    @staticmethod
+    def _cleanup(connection, taskid):
+        if not taskid:
+            return
+        for method in ('stop', 'clean'):
+            try:
+                connection.request(
+                    api='SYNO.FileStation.Search',
+                    method=method,
+                    version=2,
+                    params={'taskid': taskid}
+                )
+            except Exception:
+                logger.exception(f"Error on Search {method} for task {taskid}")
+
+    def _register_active(self, search_id, started_at, taskid):
+        self.ACTIVE.add(search_id, (started_at, taskid))
+
+    def _unregister_active(self, search_id):
+        self.ACTIVE.remove(search_id)
+
+    def _reap_expired(self):
+        if not self.offline_mode:
+            self.reap_expired(self.connection)
+
+    @classmethod
+    def has_active(cls):
+        return bool(cls.ACTIVE)
+
+    @classmethod
+    def reap_expired(cls, connection):
+        """Limpia en el NAS las tareas (de cualquier usuario) que superaron el timeout sin terminar."""
+        now = time.time()
+        expired = 0
+        for search_id, (started_at, _) in cls.ACTIVE.items().items():
+            if now - started_at <= cls.timeout():
+                continue
+            # Solo quien retira la entrada la limpia: el poller y otros procesos no la repiten
+            claimed = cls.ACTIVE.remove(search_id)
+            if claimed is None:
+                continue
+            # El taskid vive en el registro: se limpia aunque la entrada ya expiró
+            cls._cleanup(connection, claimed[1])
+            cache.delete(f"{cls.KEY_PREFIX}:{search_id}")
+            expired += 1
+        return expired
@@ -0,0 +1,285 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .listing_cache import ListingCache
+
+logger = logging.getLogger(__name__)
+
+
+class TaskService:
+    """
+    Centro de tareas de fondo de File Station (CopyMove, Delete, Compress, Extract).
+
+    - register() guarda el taskid devuelto por el NAS asociado al usuario.
+    - Un único hilo poller por proceso consulta SYNO.FileStation.BackgroundTask
+      list (una llamada por ciclo para TODAS las tareas activas) y solo cae a
+      '<API> status' para las que no aparezcan, con un tope por ciclo.
+    - Las vistas leen el estado desde caché: N pestañas abiertas no generan
+      llamadas extra al NAS, el ritmo lo fija POLL_INTERVAL.
+    - Al terminar una tarea se invalidan los listados de las carpetas afectadas.
+    - El poller también barre las búsquedas de SearchService que expiran sin
+      que nadie las consulte, y sigue vivo mientras haya alguna en curso.
+    - La sesión del poller se renueva si el NAS la da por caducada
+      (SESSION_ERRORS) y, en todo caso, tras SESSION_MAX_AGE segundos.
+    """
+
+    KEY_PREFIX = 'archivos:tasks'
+    ACTIVE_KEY = f'{KEY_PREFIX}:active'
+    MAX_STATUS_FALLBACK = 10
+    MAX_TASKS_PER_USER = 50
+    SESSION_MAX_AGE = 15 * 60
+    # Sesión caducada, cerrada por otro login o SID desconocido
+    SESSION_ERRORS = (106, 107, 119)
+
+    # Alias cortos -> API de File Station
+    APIS = {
+        'copy': 'SYNO.FileStation.CopyMove',
+        'move': 'SYNO.FileStation.CopyMove',
+        'delete': 'SYNO.FileStation.Delete',
+        'compress': 'SYNO.FileStation.Compress',
+        'extract': 'SYNO.FileStation.Extract',
+    }
+
+    _lock = threading.RLock()
+    _poller = None
+
+    # --- Configuración ---
+    @staticmethod
+    def poll_interval():
+        return getattr(settings, 'FILE_TASK_POLL_INTERVAL', 2)
+
+    @staticmethod
+    def retention():
+        """Segundos que se conservan las tareas terminadas para consultarlas."""
+        return getattr(settings, 'FILE_TASK_RETENTION', 3600)
+
+    @classmethod
+    def _user_key(cls, user_key):
+        return f"{cls.KEY_PREFIX}:user:{user_key}"
+
+    # --- Registro ---
+    @classmethod
+    def register(cls, user_key, taskid, kind, description='', invalidate=None, invalidate_items=None, extra=None):
+        """
+        Empieza a seguir una tarea del NAS.
+        invalidate / invalidate_items: carpetas / ítems cuyo listado se invalida al terminar.
+        extra['cleanup'] / extra['discard']: rutas que se borran al terminar / solo si no termina bien.
+        """
+        if not taskid:
+            return None
+        now = time.time()
+        task = {
+            'taskid': taskid,
+            'kind': kind,
+            'api': cls.APIS[kind],
+            'description': description,
+            'status': 'running',
+            'progress': 0.0,
+            'created_at': now,
+            'updated_at': now,
+            'invalidate': list(invalidate or []),
+            'invalidate_items': list(invalidate_items or []),
+            'extra': extra or {},
+            'error': None,
+        }
+        with cls._lock:
+            tasks = cache.get(cls._user_key(user_key)) or {}
+            tasks[taskid] = task
+            # Acotar historial: descartar las terminadas más viejas
+            if len(tasks) > cls.MAX_TASKS_PER_USER:
+                done = sorted((t for t in tasks.values() if t['status'] != 'running'), key=lambda t: t['updated_at'])
+                for old in done[:len(tasks) - cls.MAX_TASKS_PER_USER]:
+                    tasks.pop(old['taskid'], None)
+            cache.set(cls._user_key(user_key), tasks, timeout=cls.retention())
+
+            active = cache.get(cls.ACTIVE_KEY) or {}
+            active[taskid] = user_key
+            cache.set(cls.ACTIVE_KEY, active, timeout=None)
+
+        cls.ensure_poller()
+        return task
+
+    @classmethod
+    def list_tasks(cls, user_key, active_only=False):
+        tasks = list((cache.get(cls._user_key(user_key)) or {}).values())
+        if active_only:
+            tasks = [t for t in tasks if t['status'] == 'running']
+        tasks.sort(key=lambda t: t['created_at'], reverse=True)
+        # Las listas de invalidación son internas
+        return [{k: v for k, v in t.items() if not k.startswith('invalidate')} for t in tasks]
+
+    @classmethod
+    def get_task(cls, user_key, taskid):
+        return (cache.get(cls._user_key(user_key)) or {}).get(taskid)
+
+    @classmethod
+    def clear_finished(cls, user_key):
+        with cls._lock:
+            tasks = cache.get(cls._user_key(user_key)) or {}
+            tasks = {tid: t for tid, t in tasks.items() if t['status'] == 'running'}
+            cache.set(cls._user_key(user_key), tasks, timeout=cls.retention())
+
+    @classmethod
+    def cancel(cls, connection, user_key, taskid):
+        """Detiene una tarea propia en el NAS y la marca como cancelada."""
+        task = cls.get_task(user_key, taskid)
+        if task is None:
+            return {'success': False, 'message': 'Tarea no encontrada'}
+        if task['status'] == 'running':
+            response = connection.request(api=task['api'], method='stop', version=1, params={'taskid': taskid})
+            if not response.get('success'):
+                return {'success': False, 'message': 'No se pudo detener la tarea'}
+            task = cls._update(user_key, taskid, {'status': 'cancelled'})
+            if task is not None:
+                cls._cleanup(connection, task)
+        return {'success': True}
+
+    @classmethod
+    def _update(cls, user_key, taskid, changes):
+        with cls._lock:
+            tasks = cache.get(cls._user_key(user_key)) or {}
+            task = tasks.get(taskid)
+            if task is None:
+                finished = True
+            else:
+                task.update(changes)
+                task['updated_at'] = time.time()
+                cache.set(cls._user_key(user_key), tasks, timeout=cls.retention())
+                finished = task['status'] != 'running'
+
+            if finished:
+                active = cache.get(cls.ACTIVE_KEY) or {}
+                if active.pop(taskid, None) is not None:
+                    cache.set(cls.ACTIVE_KEY, active, timeout=None)
+            return task
+
+    # --- Poller ---
+    @classmethod
+    def ensure_poller(cls):
+        """Arranca el hilo poller si no está corriendo (uno por proceso)."""
+        if getattr(settings, 'NAS_OFFLINE_MODE', False):
+            return
+        with cls._lock:
+            if cls._poller is not None and cls._poller.is_alive():
+                return
+            cls._poller = threading.Thread(target=cls._poll_loop, name='nas-task-poller', daemon=True)
+            cls._poller.start()
+
+    @classmethod
+    def _poll_loop(cls):
+        from .file_service import FileService
+        from .search_service import SearchService
+        service, created_at = None, 0
+        try:
+            while True:
+                with cls._lock:
+                    active = dict(cache.get(cls.ACTIVE_KEY) or {})
+                    searching = SearchService.has_active()
+                    if not active and not searching:
+                        # Nada que seguir: el hilo termina y se relanza en el próximo register()
+                        cls._poller = None
+                        return
+                if service is None or time.time() - created_at > cls.SESSION_MAX_AGE:
+                    service, created_at = FileService(), time.time()
+                if searching:
+                    SearchService.reap_expired(service.connection)
+                if active and cls.poll_once(service.connection, active) is None:
+                    logger.info("[TASKS] NAS session expired, logging in again")
+                    service = None
+                time.sleep(cls.poll_interval())
+        except Exception:
+            logger.exception("Task poller crashed")
+            with cls._lock:
+                cls._poller = None
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def poll_once(cls, connection, active):
+        """
+        Un ciclo de sondeo para todas las tareas activas {taskid: user_key}.
+        Retorna el número de llamadas al NAS realizadas, o None si la sesión
+        caducó (no se marca ninguna tarea; hay que volver a autenticar).
+        """
+        calls = 1
+        seen = {}
+        response = connection.request(
+            api='SYNO.FileStation.BackgroundTask',
+            method='list',
+            version=3,
+            params={'offset': 0, 'limit': 500}
+        )
+        if cls._session_expired(response):
+            return None
+        if response.get('success'):
+            for t in response.get('data', {}).get('tasks', []):
+                seen[t.get('taskid')] = t
+
+        pending = [tid for tid in active if tid not in seen]
+        for taskid in pending[:cls.MAX_STATUS_FALLBACK]:
+            task = cls.get_task(active[taskid], taskid)
+            if task is None:
+                cls._update(active[taskid], taskid, {})
+                continue
+            calls += 1
+            res = connection.request(api=task['api'], method='status', version=1, params={'taskid': taskid})
+            if cls._session_expired(res):
+                return None
+            if res.get('success'):
+                seen[taskid] = res.get('data', {})
+            elif res.get('error'):
+                cls._finish(active[taskid], taskid, 'error', error=res.get('error'), connection=connection)
+
+        for taskid, data in seen.items():
+            if taskid not in active:
+                continue
+            if data.get('finished'):
+                status = 'error' if data.get('errors') or data.get('error') else 'finished'
+                cls._finish(active[taskid], taskid, status, progress=1.0,
+                            error=data.get('errors') or data.get('error'), data=data, connection=connection)
+            else:
+                cls._update(active[taskid], taskid, {'progress': float(data.get('progress') or 0)})
+        return calls
+
+    @classmethod
+    def _session_expired(cls, response):
+        error = response.get('error')
+        return not response.get('success') and isinstance(error, dict) and error.get('code') in cls.SESSION_ERRORS
+
+    @classmethod
+    def _finish(cls, user_key, taskid, status, progress=None, error=None, data=None, connection=None):
+        changes = {'status': status, 'error': error}
+        if progress is not None:
+            changes['progress'] = progress
+        if data:
+            # Datos útiles del resultado (ej. dest_file_path de Compress)
+            changes['result'] = {k: v for k, v in data.items() if k in ('dest_file_path', 'dest_folder_path', 'path')}
+        task = cls._update(user_key, taskid, changes)
+        if task is None:
+            return
+        cls._cleanup(connection, task)
+
+    @classmethod
+    def _cleanup(cls, connection, task):
+        """Borra los temporales de una tarea que ya no corre e invalida sus listados."""
+        # Archivos temporales de la tarea (ej. el .zip de una carga masiva) y, si
+        # no terminó bien, su resultado parcial (ej. el .zip de Compress)
+        cleanup = list(task['extra'].get('cleanup') or [])
+        if task['status'] != 'finished':
+            cleanup += task['extra'].get('discard') or []
+        if cleanup and connection is not None:
+            try:
+                connection.request(
+                    api='SYNO.FileStation.Delete',
+                    method='delete',
+                    version=2,
+                    params={'path': ','.join(cleanup), 'recursive': 'true'}
+                )
+            except Exception:
+                logger.exception(f"Error cleaning up temporary files of task {task['taskid']}")
+        ListingCache.invalidate(*task['invalidate'])
+        ListingCache.invalidate_items(*task['invalidate_items'])
@@ -0,0 +1,322 @@
+import hashlib
+import json
+import logging
+import posixpath
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class UploadService:
+    """
+    Chequeos previos a una subida para no transferir bytes innecesarios.
+
+    Pre-flight (antes de mover bytes): permiso de escritura en la carpeta
+    (SYNO.FileStation.CheckPermission), espacio libre del volumen de la share
+    (volume_status de list_share) y cuota restante de la cuenta del NAS
+    (SYNO.Core.Quota). Espacio y cuota se cachean STATUS_TTL segundos. Solo
+    se rechaza ante un "no" definitivo: si el NAS no responde a un chequeo,
+    la subida sigue su curso.
+
+    Deduplicación por contenido:
+    1. El cliente envía nombre y tamaño. Si el destino no existe o su tamaño
+       difiere, hay que subir (una sola llamada getinfo).
+    2. Si coincide el tamaño se necesita el MD5: el del NAS se toma de la caché
+       local (clave NAS + ruta + mtime + tamaño) o se calcula con
+       SYNO.FileStation.MD5.
+       La tarea MD5 es asíncrona: mientras corre se responde 'pending' y el
+       cliente vuelve a consultar, igual que la búsqueda.
+    3. Con MD5 igual la subida se omite ('exists').
+
+    Tras una subida, remember() guarda el hash del archivo recién escrito,
+    calculado en el servidor sobre los bytes que se reenviaron al NAS (nunca
+    el que declara el cliente): la siguiente subida idéntica se resuelve sin
+    tocar el NAS más allá del getinfo. Si el NAS no responde a getinfo o MD5,
+    check() responde 'upload'.
+    """
+
+    KEY_PREFIX = 'archivos:md5'
+    STATUS_KEY_PREFIX = 'archivos:upload:status'
+    STATUS_TTL = 30
+    # Errores de File Station sin sentido reintentar: permiso, solo lectura,
+    # cuota excedida, sin espacio, nombre ilegal, no se puede sobrescribir
+    FATAL_ERRORS = {105, 407, 411, 415, 416, 418, 419, 1805}
+
+    def __init__(self, file_service):
+        self.files = file_service
+        self.connection = file_service.connection
+        self.offline_mode = file_service.offline_mode
+
+    # --- Configuración ---
+    @staticmethod
+    def hash_ttl():
+        """Segundos que se conserva un MD5 conocido (se invalida solo por mtime)."""
+        return getattr(settings, 'FILE_UPLOAD_HASH_TTL', 7 * 24 * 3600)
+
+    @staticmethod
+    def md5_timeout():
+        """Segundos máximos de una tarea MD5 en el NAS antes de rendirse y subir."""
+        return getattr(settings, 'FILE_UPLOAD_MD5_TIMEOUT', 300)
+
+    # --- Claves ---
+    def _nas_key(self):
+        return getattr(self.files.config, 'pk', None)
+
+    def _hash_key(self, path, mtime, size):
+        return f"{self.KEY_PREFIX}:{self._nas_key()}:{path}:{mtime}:{size}"
+
+    def _task_key(self, path, mtime, size):
+        return f"{self.KEY_PREFIX}:task:{self._nas_key()}:{path}:{mtime}:{size}"
+
+    # --- API pública ---
+    def preflight(self, folder_path, size, name=None):
+        """
+        Verifica que una subida de size bytes a folder_path puede funcionar.
+        Retorna None si puede, o un error {'code', 'msg'} si está condenada.
+        """
+        if self.offline_mode:
+            return None
+        size = int(size)
+
+        error = self._check_permission(folder_path, name)
+        if error:
+            return error
+
+        share = '/' + folder_path.strip('/').split('/')[0]
+        volume = self._share_volume(share)
+        if volume is None:
+            return None
+
+        if volume['readonly']:
+            return {'code': 411, 'msg': f"El volumen de {share} es de solo lectura"}
+        if volume['free'] is not None and size > volume['free']:
+            return {
+                'code': 416,
+                'msg': f"Espacio insuficiente en {volume['path']}: se necesitan {size} bytes y quedan {volume['free']}"
+            }
+
+        remaining = self._quota_remaining(volume['path'])
+        if remaining is not None and size > remaining:
+            return {
+                'code': 415,
+                'msg': f"Cuota excedida en {volume['path']}: se necesitan {size} bytes y quedan {remaining}"
+            }
+        return None
+
+    def check(self, folder_path, name, size, md5=None):
+        """
+        Pre-flight y decide si hace falta subir folder_path/name (sin name,
+        solo pre-flight). Retorna el error del pre-flight o {'success', 'status', 'path'} con status:
+        - 'upload': no existe o el contenido difiere.
+        - 'need_hash': mismo tamaño; el cliente debe reenviar con md5.
+        - 'pending': el NAS aún calcula su MD5; reintentar.
+        - 'exists': contenido idéntico, la subida se omite.
+        """
+        error = self.preflight(folder_path, size, name)
+        if error:
+            return {'success': False, 'error': error}
+
+        path = posixpath.join(folder_path, name or '')
+        result = {'success': True, 'status': 'upload', 'path': path}
+        if self.offline_mode or not name:
+            return result
+
+        info = self._stat(path)
+        if info is None or info['is_dir'] or info['size'] != int(size):
+            return result
+
+        if not md5:
+            result['status'] = 'need_hash'
+            return result
+
+        # Sin MD5 disponible (error o timeout) queda 'upload': subir es lo seguro
+        remote_md5 = self._remote_md5(path, info['mtime'], info['size'])
+        if remote_md5 is None:
+            result['status'] = 'pending'
+        elif remote_md5 and remote_md5 == md5.lower():
+            result['status'] = 'exists'
+        return result
+
+    def remember(self, path, file_obj):
+        """Asocia al archivo recién subido el MD5 de los bytes que se le enviaron."""
+        if self.offline_mode:
+            return
+        digest = hashlib.md5()
+        for chunk in file_obj.chunks():
+            digest.update(chunk)
+        info = self._stat(path)
+        # Solo si el NAS guardó exactamente lo que se envió
+        if info is not None and not info['is_dir'] and info['size'] == file_obj.size:
+            cache.set(self._hash_key(path, info['mtime'], info['size']), digest.hexdigest(), timeout=self.hash_ttl())
+
+    # --- Internos: pre-flight ---
+    def _check_permission(self, folder_path, name):
+        params = {'path': folder_path, 'overwrite': 'true', 'create_only': 'false'}
+        if name:
+            params['filename'] = name
+        try:
+            response = self.connection.request(
+                api='SYNO.FileStation.CheckPermission',
+                method='write',
+                version=3,
+                params=params
+            )
+        except Exception:
+            logger.exception("[UPLOAD] CheckPermission failed")
+            return None
+        code = response.get('error', {}).get('code') if not response.get('success') else None
+        if code in self.FATAL_ERRORS:
+            return {'code': code, 'msg': f"Sin permiso de escritura en {folder_path}"}
+        return None
+
+    def _share_volume(self, share):
+        """{'path', 'free', 'readonly'} del volumen que aloja la share (cacheado)."""
+        key = f"{self.STATUS_KEY_PREFIX}:shares"
+        volumes = cache.get(key)
+        if volumes is None:
+            try:
+                response = self.connection.request(
+                    api='SYNO.FileStation.List',
+                    method='list_share',
+                    version=2,
+                    params={'additional': json.dumps(["real_path", "volume_status"])}
+                )
+            except Exception:
+                logger.exception("[UPLOAD] list_share failed")
+                return None
+            if not response.get('success'):
+                return None
+            volumes = {}
+            for s in response.get('data', {}).get('shares', []):
+                additional = s.get('additional', {})
+                status = additional.get('volume_status', {})
+                real_path = additional.get('real_path', '')
+                volumes[s.get('path')] = {
+                    # real_path: /volume1/share -> volumen /volume1
+                    'path': '/' + real_path.strip('/').split('/')[0] if real_path else None,
+                    'free': int(status['freespace']) if 'freespace' in status else None,
+                    'readonly': bool(status.get('readonly')),
+                }
+            cache.set(key, volumes, timeout=self.STATUS_TTL)
+        return volumes.get(share)
+
+    def _quota_remaining(self, volume_path):
+        """Bytes de cuota restantes de la cuenta del NAS en el volumen. None si no hay cuota."""
+        if not volume_path:
+            return None
+        key = f"{self.STATUS_KEY_PREFIX}:quota:{volume_path}"
+        cached = cache.get(key)
+        if cached is not None:
+            return cached['remaining']
+
+        remaining = None
+        username = getattr(getattr(self.connection, 'config', None), 'admin_username', None)
+        try:
+            response = self.connection.request(
+                api='SYNO.Core.Quota',
+                method='get',
+                version=1,
+                params={'type': 'user', 'name': username}
+            )
+        except Exception:
+            logger.exception("[UPLOAD] Quota lookup failed")
+            response = {}
+
+        data = response.get('data', {}) if response.get('success') else {}
+        entries = data if isinstance(data, list) else data.get('user_quota') or data.get('quota') or []
+        for q in entries if isinstance(entries, list) else []:
+            if (q.get('volume_path') or q.get('volume')) != volume_path:
+                continue
+            # DSM reporta cuota y uso en MB
+            limit_mb = q.get('quota', q.get('size_limit', 0)) or 0
+            if limit_mb:
+                remaining = max(int((float(limit_mb) - float(q.get('used', 0) or 0)) * 1024 * 1024), 0)
+        cache.set(key, {'remaining': remaining}, timeout=self.STATUS_TTL)
+        return remaining
+
+    # --- Internos: deduplicación ---
+    def _stat(self, path):
+        try:
+            response = self.connection.request(
+                api='SYNO.FileStation.List',
+                method='getinfo',
+                version=2,
+                params={'path': json.dumps([path]), 'additional': json.dumps(["size", "time"])}
+            )
+        except Exception:
+            logger.exception("[UPLOAD] getinfo failed")
+            return None
+        files = response.get('data', {}).get('files', []) if response.get('success') else []
+        if not files or files[0].get('code'):
+            return None
+        additional = files[0].get('additional', {})
+        return {
+            'is_dir': files[0].get('isdir', False),
+            'size': int(additional.get('size') or 0),
+            'mtime': additional.get('time', {}).get('mtime'),
+        }
+
+    def _remote_md5(self, path, mtime, size):
+        """
+        MD5 del archivo en el NAS. None si la tarea sigue en curso,
+        '' si no se pudo obtener.
+        """
+        hash_key = self._hash_key(path, mtime, size)
+        cached = cache.get(hash_key)
+        if cached:
+            return cached
+
+        task_key = self._task_key(path, mtime, size)
+        task = cache.get(task_key)
+        if task is None:
+            try:
+                response = self.connection.request(
+                    api='SYNO.FileStation.MD5',
+                    method='start',
+                    version=2,
+                    params={'file_path': path}
+                )
+            except Exception:
+                logger.exception("[UPLOAD] MD5 start failed")
+                return ''
+            if not response.get('success'):
+                return ''
+            task = (response.get('data', {}).get('taskid'), time.time())
+            cache.set(task_key, task, timeout=self.md5_timeout() * 2)
+            return None
+
+        taskid, started_at = task
+        if time.time() - started_at > self.md5_timeout():
+            self._stop(taskid)
+            cache.delete(task_key)
+            return ''
+
+        try:
+            response = self.connection.request(
+                api='SYNO.FileStation.MD5',
+                method='status',
+                version=2,
+                params={'taskid': taskid}
+            )
+        except Exception:
+            logger.exception("[UPLOAD] MD5 status failed")
+            return ''
+        data = response.get('data', {}) if response.get('success') else {}
+        if response.get('success') and not data.get('finished'):
+            return None
+
+        cache.delete(task_key)
+        md5 = (data.get('md5') or '').lower()
+        if md5:
+            cache.set(hash_key, md5, timeout=self.hash_ttl())
+        else:
+            logger.warning(f"[UPLOAD] MD5 task for {path} failed: {response.get('error')}")
+        return md5
+
+    def _stop(self, taskid):
+        try:
+            self.connection.request(api='SYNO.FileStation.MD5', method='stop', version=2, params={'taskid': taskid})
+        except Exception:
+            logger.exception(f"Error stopping MD5 task {taskid}")
@@ -1,3 +1,782 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import threading
+import time
+import zipfile
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from unittest.mock import patch, MagicMock
+from apps.archivos.services.file_service import FileService
+from apps.archivos.services.listing_cache import ListingCache
+from apps.archivos.services.search_service import SearchService
+from apps.archivos.services.index_service import IndexService
+from apps.archivos.services.task_service import TaskService
+from apps.archivos.services.archive_service import ArchiveService
+from apps.archivos.services.upload_service import UploadService
+from apps.archivos.services.dirsize_service import DirSizeService
+from apps.archivos.services.prefetch_service import PrefetchService
+from apps.archivos.services.preview_service import PreviewService
+from apps.core.services.background_service import BackgroundService
+from apps.archivos.models import IndexedShare, IndexedEntry
+from apps.archivos.views import FileAPIView
 
-# Create your tests here.
+
+class FileServiceListingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(NAS_OFFLINE_MODE=True)
+    def test_list_files_page_offline(self):
+        service = FileService()
+        page = service.list_files_page('/projects', offset=1, limit=3, filetype='dir')
+        self.assertEqual(page['total'], 3)
+        self.assertEqual(page['offset'], 1)
+        self.assertEqual([i['name'] for i in page['items']], ['Carpeta_2', 'Carpeta_3'])
+
+    @override_settings(NAS_OFFLINE_MODE=False)
+    @patch('apps.archivos.services.file_service.ConnectionService')
+    def test_list_files_page_online_passes_params(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.return_value = {
+            'success': True,
+            'data': {'files': [{'name': 'a.txt', 'path': '/s/a.txt', 'isdir': False}], 'total': 100000, 'offset': 200}
+        }
+
+        service = FileService()
+        page = service.list_files_page('/s', offset=200, limit=100, sort_by='mtime',
+                                       sort_direction='desc', pattern='*.txt')
+
+        self.assertEqual(page['total'], 100000)
+        self.assertEqual(len(page['items']), 1)
+        params = mock_instance.request.call_args.kwargs['params']
+        self.assertEqual(params['offset'], 200)
+        self.assertEqual(params['limit'], 100)
+        self.assertEqual(params['sort_by'], 'mtime')
+        self.assertEqual(params['sort_direction'], 'desc')
+        self.assertEqual(params['pattern'], '*.txt')
+
+    @override_settings(NAS_OFFLINE_MODE=False)
+    @patch('apps.archivos.services.file_service.ConnectionService')
+    def test_list_files_page_rejects_unknown_sort(self, MockConn):
+        MockConn.return_value.request.return_value = {'success': True, 'data': {'files': []}}
+
+        service = FileService()
+        service.list_files_page('/s', sort_by='DROP', sort_direction='sideways')
+
+        params = MockConn.return_value.request.call_args.kwargs['params']
+        self.assertEqual(params['sort_by'], 'name')
+        self.assertEqual(params['sort_direction'], 'asc')
+
+    @override_settings(NAS_OFFLINE_MODE=False)
+    @patch('apps.archivos.services.file_service.ConnectionService')
+    def test_profile_limits_additional_and_normalization(self, MockConn):
+        MockConn.return_value.request.return_value = {'success': True, 'data': {'files': [
+            {'name': 'a.txt', 'path': '/s/a.txt', 'isdir': False, 'additional': {'size': 2048}}
+        ]}}
+
+        picker = FileService().list_files_page('/s', profile='picker')['items'][0]
+        params = MockConn.return_value.request.call_args.kwargs['params']
+        self.assertEqual(params['additional'], '[]')
+        self.assertEqual(set(picker), {'name', 'path', 'is_dir', 'type'})
+
+        grid = FileService().list_files_page('/s', profile='grid')['items'][0]
+        self.assertEqual(json.loads(MockConn.return_value.request.call_args.kwargs['params']['additional']), ["perm", "size"])
+        self.assertEqual(grid['formatted_size'], '2.00 KB')
+        self.assertIn('permissions', grid)
+        self.assertNotIn('owner', grid)
+
+        # Sin perfil ni campos explícitos (list_files, búsqueda): todo
+        full = FileService().list_files('/s')[0]
+        self.assertEqual(json.loads(MockConn.return_value.request.call_args.kwargs['params']['additional']), FileService.FULL_ADDITIONAL)
+        self.assertEqual(full['owner'], '')
+        self.assertIn('time', full)
+
+    @override_settings(NAS_OFFLINE_MODE=False)
+    @patch('apps.archivos.services.file_service.ConnectionService')
+    def test_list_tree_requests_only_directories(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.fork.return_value = mock_instance
+
+        def _request(api, method, version=1, params=None):
+            if method == 'getinfo':
+                return {'success': True, 'data': {'files': [{'additional': {'time': {'mtime': 1}}}]}}
+            folder = params['folder_path']
+            return {'success': True, 'data': {'files': [{'name': 'sub', 'path': f'{folder}/sub', 'isdir': True}]}}
+        mock_instance.request.side_effect = _request
+
+        nodes = FileService().list_tree(['/s/a', '/s/b'])
+
+        self.assertEqual(nodes, {'/s/a': [{'name': 'sub', 'path': '/s/a/sub'}], '/s/b': [{'name': 'sub', 'path': '/s/b/sub'}]})
+        lists = [c.kwargs['params'] for c in mock_instance.request.call_args_list if c.kwargs['method'] == 'list']
+        self.assertTrue(all(p['filetype'] == 'dir' and p['additional'] == '[]' for p in lists))
+
+        # Segunda expansión: servida por ListingCache
+        mock_instance.request.reset_mock()
+        FileService().list_tree(['/s/a', '/s/b'])
+        self.assertEqual(mock_instance.request.call_count, 0)
+
+    def test_api_page_size_is_always_capped(self):
+        factory = RequestFactory()
+        view = FileAPIView()
+
+        def limit(query, **kwargs):
+            return view._get_list_options(factory.get('/archivos/api/', query), **kwargs)['limit']
+
+        # Sin limit o limit=0 (= "todo" en DSM) se aplica el tope
+        self.assertEqual(limit({}), FileAPIView.MAX_PAGE_SIZE)
+        self.assertEqual(limit({'limit': '0'}), FileAPIView.MAX_PAGE_SIZE)
+        self.assertEqual(limit({'limit': '50000'}), FileAPIView.MAX_PAGE_SIZE)
+        self.assertEqual(limit({'limit': '100'}), 100)
+        self.assertEqual(limit({}, default_limit=FileAPIView.SEARCH_PAGE_SIZE), FileAPIView.SEARCH_PAGE_SIZE)
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class ListingCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _list_response(self, names, mtime=100):
+        def _request(api, method, version=1, params=None):
+            if method == 'getinfo':
+                return {'success': True, 'data': {'files': [{'additional': {'time': {'mtime': mtime}}}]}}
+            if method == 'list':
+                return {'success': True, 'data': {'files': [{'name': n, 'path': f'/s/{n}'} for n in names]}}
+            return {'success': True}
+        return _request
+
+    def test_second_visit_served_from_cache(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.side_effect = self._list_response(['a.txt'])
+
+        service = FileService()
+        service.list_files('/s')
+        calls = mock_instance.request.call_count
+        items = service.list_files('/s')
+
+        self.assertEqual(mock_instance.request.call_count, calls)
+        self.assertEqual(items[0]['name'], 'a.txt')
+
+    def test_write_invalidates_folder(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.side_effect = self._list_response(['a.txt'])
+
+        service = FileService()
+        service.list_files('/s')
+        service.create_folder('/s', 'nueva')
+        mock_instance.request.side_effect = self._list_response(['a.txt', 'nueva'])
+
+        self.assertEqual(len(service.list_files('/s')), 2)
+
+    def test_revalidation_keeps_entry_when_mtime_unchanged(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.side_effect = self._list_response(['a.txt'], mtime=100)
+
+        service = FileService()
+        options = {'offset': 0, 'limit': 0}
+        key = ListingCache.make_key(service.user_key, '/s', options)
+        ListingCache.set(key, {'items': [], 'total': 0, 'offset': 0}, 100)
+
+        service._revalidate_listing(key, '/s', options, 100)
+
+        methods = [c.kwargs.get('method') for c in mock_instance.request.call_args_list]
+        self.assertEqual(methods, ['getinfo'])
+        entry, is_fresh = ListingCache.get(key)
+        self.assertTrue(is_fresh)
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class SearchServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        poller = patch.object(TaskService, 'ensure_poller')
+        self.ensure_poller = poller.start()
+        self.addCleanup(poller.stop)
+
+    def _nas(self, finished):
+        def _request(api, method, version=1, params=None):
+            if method == 'start':
+                return {'success': True, 'data': {'taskid': 'T1'}}
+            if method == 'list':
+                return {'success': True, 'data': {
+                    'finished': finished['value'], 'total': 1,
+                    'files': [{'name': 'hit.txt', 'path': '/s/hit.txt'}]
+                }}
+            return {'success': True}
+        return _request
+
+    def test_poll_until_finished_cleans_task(self, MockConn):
+        finished = {'value': False}
+        mock_instance = MockConn.return_value
+        mock_instance.request.side_effect = self._nas(finished)
+
+        search = SearchService(FileService())
+        search_id = search.start('/s', 'hit')['search_id']
+
+        partial = search.poll(search_id)
+        self.assertFalse(partial['finished'])
+
+        finished['value'] = True
+        done = search.poll(search_id)
+        self.assertTrue(done['finished'])
+        self.assertEqual(done['items'][0]['name'], 'hit.txt')
+
+        methods = [c.kwargs.get('method') for c in mock_instance.request.call_args_list]
+        self.assertIn('stop', methods)
+        self.assertIn('clean', methods)
+
+    def test_identical_search_is_reused(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.side_effect = self._nas({'value': True})
+
+        search = SearchService(FileService())
+        first = search.start('/s', 'hit')
+        second = search.start('/s', 'hit')
+
+        self.assertEqual(first['search_id'], second['search_id'])
+        self.assertTrue(second['reused'])
+        methods = [c.kwargs.get('method') for c in mock_instance.request.call_args_list]
+        self.assertEqual(methods.count('start'), 1)
+
+    @override_settings(FILE_SEARCH_TIMEOUT=0, FILE_TASK_POLL_INTERVAL=0)
+    @patch('apps.archivos.services.file_service.FileService')
+    def test_abandoned_search_is_reaped_by_poller(self, MockFileService, MockConn):
+        MockConn.return_value.request.side_effect = self._nas({'value': False})
+        search_id = SearchService(FileService()).start('/s', 'hit')['search_id']
+        self.assertTrue(self.ensure_poller.called)
+        self.assertTrue(SearchService.has_active())
+
+        # Nadie vuelve a consultar: el poller compartido la limpia y termina
+        poller = MagicMock()
+        MockFileService.return_value = poller
+        time.sleep(0.01)
+        TaskService._poll_loop()
+
+        methods = [c.kwargs.get('method') for c in poller.connection.request.call_args_list]
+        self.assertEqual(methods, ['stop', 'clean'])
+        self.assertFalse(SearchService.has_active())
+        self.assertIsNone(cache.get(f"{SearchService.KEY_PREFIX}:{search_id}"))
+
+    def test_interleaved_registrations_are_not_lost(self, MockConn):
+        search = SearchService(FileService())
+        registry = type(SearchService.ACTIVE)
+        read_index = registry._index
+        other = threading.Thread(target=search._register_active, args=('B', time.time(), 'TB'))
+
+        def _interleaved(self):
+            index = read_index(self)
+            if not other.is_alive() and other.ident is None:
+                # Otro hilo/proceso registra su búsqueda mientras esta lee el índice
+                other.start()
+                other.join(0.05)
+            return index
+
+        with patch.object(registry, '_index', _interleaved):
+            search._register_active('A', time.time(), 'TA')
+        other.join()
+
+        self.assertEqual(set(SearchService.ACTIVE.items()), {'A', 'B'})
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class IndexServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.share = IndexedShare.objects.create(path='/projects')
+        self.tree = {
+            '/projects': [('docs', True, 10), ('readme.md', False, 5)],
+            '/projects/docs': [('informe_final.pdf', False, 7)],
+        }
+
+    def _nas(self, tree, calls):
+        def _request(api, method, version=1, params=None):
+            calls.append((method, params.get('folder_path') or params.get('path')))
+            if method == 'getinfo':
+                paths = params['path']
+                paths = json.loads(paths) if paths.startswith('[') else [paths]
+                mtimes = {'/projects': 1, '/projects/docs': 10}
+                return {'success': True, 'data': {'files': [
+                    {'path': p, 'additional': {'time': {'mtime': mtimes.get(p, 0)}}} for p in paths
+                ]}}
+            folder = params['folder_path']
+            files = [{'name': n, 'path': f'{folder}/{n}', 'isdir': d,
+                      'additional': {'size': 1, 'time': {'mtime': m}}} for n, d, m in tree.get(folder, [])]
+            return {'success': True, 'data': {'files': files, 'total': len(files)}}
+        return _request
+
+    def test_crawl_then_incremental_skips_unchanged_folders(self, MockConn):
+        calls = []
+        MockConn.return_value.request.side_effect = self._nas(self.tree, calls)
+        service = IndexService(FileService())
+
+        service.crawl(self.share)
+        self.assertEqual(IndexedEntry.objects.filter(share=self.share).count(), 4)
+
+        calls.clear()
+        service.crawl(self.share)
+        self.assertEqual([c for c in calls if c[0] == 'list'], [])
+
+    def test_search_prefix_and_substring(self, MockConn):
+        MockConn.return_value.request.side_effect = self._nas(self.tree, [])
+        service = IndexService(FileService())
+        service.crawl(self.share)
+
+        self.assertTrue(IndexService.fts_available())
+        self.assertEqual([i['name'] for i in service.search('inf', '/projects')], ['informe_final.pdf'])
+        self.assertEqual([i['name'] for i in service.search('final', '/projects')], ['informe_final.pdf'])
+
+    def test_scoped_substring_search_is_not_crowded_out(self, MockConn):
+        other = IndexedShare.objects.create(path='/archive')
+        IndexedEntry.objects.bulk_create([
+            IndexedEntry(share=other, path=f'/archive/old_final_{i}.pdf', parent='/archive',
+                         name=f'old_final_{i}.pdf', name_lower=f'old_final_{i}.pdf')
+            for i in range(50)
+        ])
+        IndexedEntry.objects.create(share=self.share, path='/projects/docs/informe_final.pdf', parent='/projects/docs',
+                                    name='informe_final.pdf', name_lower='informe_final.pdf')
+
+        # Las coincidencias de otra share no agotan el tope antes de filtrar por carpeta
+        items = IndexService(FileService()).search('final', '/projects', limit=2)
+        self.assertEqual([i['name'] for i in items], ['informe_final.pdf'])
+
+
+class TaskServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @patch.object(TaskService, 'ensure_poller')
+    def test_poll_once_multiplexes_all_tasks(self, mock_poller):
+        for i in range(5):
+            TaskService.register(1, f'T{i}', 'copy', invalidate=['/dest'])
+
+        connection = MagicMock()
+        connection.request.return_value = {'success': True, 'data': {'tasks': [
+            {'taskid': f'T{i}', 'finished': i < 2, 'progress': 0.5} for i in range(5)
+        ]}}
+        calls = TaskService.poll_once(connection, cache.get(TaskService.ACTIVE_KEY))
+
+        self.assertEqual(calls, 1)
+        statuses = {t['taskid']: t['status'] for t in TaskService.list_tasks(1)}
+        self.assertEqual(statuses['T0'], 'finished')
+        self.assertEqual(statuses['T4'], 'running')
+        self.assertEqual(len(TaskService.list_tasks(1, active_only=True)), 3)
+
+    @patch.object(TaskService, 'ensure_poller')
+    def test_missing_task_falls_back_to_status(self, mock_poller):
+        TaskService.register(1, 'D1', 'delete')
+
+        connection = MagicMock()
+        connection.request.side_effect = [
+            {'success': True, 'data': {'tasks': []}},
+            {'success': True, 'data': {'finished': True}},
+        ]
+        calls = TaskService.poll_once(connection, cache.get(TaskService.ACTIVE_KEY))
+
+        self.assertEqual(calls, 2)
+        self.assertEqual(connection.request.call_args.kwargs['api'], 'SYNO.FileStation.Delete')
+        self.assertEqual(TaskService.get_task(1, 'D1')['status'], 'finished')
+
+    @override_settings(FILE_TASK_POLL_INTERVAL=0)
+    @patch('apps.archivos.services.file_service.FileService')
+    @patch.object(TaskService, 'ensure_poller')
+    def test_poller_logs_in_again_when_session_expires(self, mock_poller, MockFileService):
+        TaskService.register(1, 'C1', 'copy')
+        expired, fresh = MagicMock(), MagicMock()
+        expired.connection.request.return_value = {'success': False, 'error': {'code': 119}}
+        fresh.connection.request.return_value = {'success': True, 'data': {'tasks': [{'taskid': 'C1', 'finished': True}]}}
+        MockFileService.side_effect = [expired, fresh]
+
+        self.assertIsNone(TaskService.poll_once(expired.connection, cache.get(TaskService.ACTIVE_KEY)))
+        self.assertEqual(TaskService.get_task(1, 'C1')['status'], 'running')
+
+        TaskService._poll_loop()
+        self.assertEqual(MockFileService.call_count, 2)
+        self.assertEqual(TaskService.get_task(1, 'C1')['status'], 'finished')
+
+    @patch.object(TaskService, 'ensure_poller')
+    def test_cancel_cleans_temporary_files(self, mock_poller):
+        TaskService.register(1, 'X1', 'extract', invalidate=['/s/p'], extra={'cleanup': ['/s/p/carga.zip']})
+        connection = MagicMock()
+        connection.request.return_value = {'success': True}
+
+        self.assertTrue(TaskService.cancel(connection, 1, 'X1')['success'])
+
+        self.assertEqual(TaskService.get_task(1, 'X1')['status'], 'cancelled')
+        self.assertEqual([c.kwargs['method'] for c in connection.request.call_args_list], ['stop', 'delete'])
+        self.assertEqual(connection.request.call_args.kwargs['params']['path'], '/s/p/carga.zip')
+        self.assertEqual(cache.get(TaskService.ACTIVE_KEY), {})
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class BatchOperationsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @patch.object(TaskService, 'ensure_poller')
+    def test_batch_merges_multi_path_operations(self, mock_poller, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.fork.return_value = mock_instance
+        mock_instance.request.return_value = {'success': True, 'data': {'taskid': 'T'}}
+
+        operations = [{'action': 'delete', 'path': f'/s/f{i}.txt'} for i in range(500)]
+        operations += [
+            {'action': 'move', 'path': '/s/a', 'dest': '/d'},
+            {'action': 'move', 'path': '/s/b', 'dest': '/d'},
+            {'action': 'rename', 'path': '/s/c', 'name': 'c2'},
+            {'action': 'explode', 'path': '/s/x'},
+        ]
+        results = FileService().batch(operations)
+
+        self.assertEqual(len(results), len(operations))
+        self.assertFalse(results[-1]['success'])
+        calls = [(c.kwargs['api'], c.kwargs['method']) for c in mock_instance.request.call_args_list]
+        self.assertEqual(calls.count(('SYNO.FileStation.Delete', 'start')), 1)
+        self.assertEqual(calls.count(('SYNO.FileStation.CopyMove', 'start')), 1)
+        self.assertEqual(calls.count(('SYNO.FileStation.Rename', 'rename')), 1)
+        move_params = next(c.kwargs['params'] for c in mock_instance.request.call_args_list
+                           if c.kwargs['api'] == 'SYNO.FileStation.CopyMove')
+        self.assertEqual(move_params['path'], '/s/a,/s/b')
+
+    @patch.object(TaskService, 'ensure_poller')
+    @patch.object(FileService, 'upload_file', return_value={'success': True})
+    def test_upload_and_extract_cleans_archive_when_done(self, mock_upload, mock_poller, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.return_value = {'success': True, 'data': {'taskid': 'X1'}}
+
+        archive = MagicMock()
+        res = FileService().upload_and_extract('/s/proyecto', archive)
+
+        self.assertTrue(res['success'])
+        self.assertTrue(mock_upload.call_args.kwargs['create_parents'])
+        extract = mock_instance.request.call_args.kwargs
+        self.assertEqual(extract['api'], 'SYNO.FileStation.Extract')
+        archive_path = extract['params']['file_path']
+        self.assertEqual(archive_path, f"/s/proyecto/{archive.name}")
+        self.assertEqual(extract['params']['dest_folder_path'], '/s/proyecto')
+
+        connection = MagicMock()
+        connection.request.return_value = {'success': True, 'data': {'tasks': [{'taskid': 'X1', 'finished': True}]}}
+        TaskService.poll_once(connection, cache.get(TaskService.ACTIVE_KEY))
+
+        cleanup = connection.request.call_args.kwargs
+        self.assertEqual(cleanup['api'], 'SYNO.FileStation.Delete')
+        self.assertEqual(cleanup['params']['path'], archive_path)
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class ArchiveServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stream_zip_expands_folders(self, MockConn):
+        def _request(api, method, version=1, params=None):
+            if method == 'getinfo':
+                return {'success': True, 'data': {'files': [
+                    {'path': '/s/docs', 'isdir': True, 'additional': {'time': {'mtime': 1700000000}}},
+                ]}}
+            files = {'/s/docs': [{'name': 'a.txt', 'path': '/s/docs/a.txt', 'isdir': False},
+                                 {'name': 'sub', 'path': '/s/docs/sub', 'isdir': True}],
+                     '/s/docs/sub': [{'name': 'b.txt', 'path': '/s/docs/sub/b.txt', 'isdir': False}]}
+            found = files.get(params['folder_path'], [])
+            return {'success': True, 'data': {'files': found, 'total': len(found)}}
+        MockConn.return_value.request.side_effect = _request
+
+        def _stream(path):
+            resp = MagicMock()
+            resp.iter_content.return_value = [path.encode(), b'-data']
+            return resp, None
+
+        service = FileService()
+        with patch.object(service, 'get_file_stream', side_effect=_stream):
+            payload = b''.join(ArchiveService(service).stream_zip(['/s/docs']))
+
+        with zipfile.ZipFile(io.BytesIO(payload)) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['docs/', 'docs/a.txt', 'docs/sub/', 'docs/sub/b.txt'])
+            self.assertEqual(zf.read('docs/sub/b.txt'), b'/s/docs/sub/b.txt-data')
+
+    @patch.object(TaskService, 'ensure_poller')
+    def test_compress_uses_unique_archive_removed_on_failure(self, mock_poller, MockConn):
+        MockConn.return_value.request.return_value = {'success': True, 'data': {'taskid': 'Z1'}}
+        service = ArchiveService(FileService())
+        service.start_compress(['/s/docs'])
+        service.start_compress(['/s/docs'])
+
+        starts = [c.kwargs['params'] for c in MockConn.return_value.request.call_args_list]
+        self.assertEqual({p['mode'] for p in starts}, {'replace'})
+        self.assertNotEqual(starts[0]['dest_file_path'], starts[1]['dest_file_path'])
+
+        connection = MagicMock()
+        connection.request.return_value = {'success': True, 'data': {'tasks': [
+            {'taskid': 'Z1', 'finished': True, 'errors': [{'code': 1100}]}
+        ]}}
+        TaskService.poll_once(connection, cache.get(TaskService.ACTIVE_KEY))
+
+        cleanup = connection.request.call_args.kwargs
+        self.assertEqual(cleanup['api'], 'SYNO.FileStation.Delete')
+        self.assertEqual(cleanup['params']['path'], starts[1]['dest_file_path'])
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class UploadServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _getinfo(self, size, mtime=100):
+        return {'success': True, 'data': {'files': [
+            {'path': '/s/big.iso', 'isdir': False, 'additional': {'size': size, 'time': {'mtime': mtime}}}
+        ]}}
+
+    @patch.object(UploadService, 'preflight', return_value=None)
+    def test_different_size_needs_upload(self, mock_preflight, MockConn):
+        MockConn.return_value.request.return_value = self._getinfo(10)
+        res = UploadService(FileService()).check('/s', 'big.iso', 20)
+        self.assertEqual(res['status'], 'upload')
+
+    @patch.object(UploadService, 'preflight', return_value=None)
+    def test_same_content_skipped_after_md5_task(self, mock_preflight, MockConn):
+        mock_instance = MockConn.return_value
+        service = UploadService(FileService())
+        mock_instance.request.return_value = self._getinfo(20)
+        self.assertEqual(service.check('/s', 'big.iso', 20)['status'], 'need_hash')
+
+        mock_instance.request.side_effect = [
+            self._getinfo(20), {'success': True, 'data': {'taskid': 'M1'}},
+            self._getinfo(20), {'success': True, 'data': {'finished': True, 'md5': 'ABC'}},
+        ]
+        self.assertEqual(service.check('/s', 'big.iso', 20, 'abc')['status'], 'pending')
+        self.assertEqual(service.check('/s', 'big.iso', 20, 'abc')['status'], 'exists')
+
+        # Hash en caché: solo getinfo, sin tarea MD5
+        mock_instance.request.side_effect = None
+        mock_instance.request.reset_mock()
+        mock_instance.request.return_value = self._getinfo(20)
+        self.assertEqual(service.check('/s', 'big.iso', 20, 'abc')['status'], 'exists')
+        self.assertEqual(mock_instance.request.call_count, 1)
+
+        # Archivo modificado (otro mtime): el hash guardado ya no aplica
+        mock_instance.request.side_effect = [self._getinfo(20, mtime=200), {'success': False, 'error': {'code': 408}}]
+        self.assertEqual(service.check('/s', 'big.iso', 20, 'abc')['status'], 'upload')
+
+    @patch.object(UploadService, 'preflight', return_value=None)
+    def test_remembered_hash_is_computed_on_the_server(self, mock_preflight, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.return_value = self._getinfo(7)
+        service = UploadService(FileService())
+
+        service.remember('/s/big.iso', SimpleUploadedFile('big.iso', b'content'))
+
+        real = hashlib.md5(b'content').hexdigest()
+        self.assertEqual(service.check('/s', 'big.iso', 7, real)['status'], 'exists')
+        # Un MD5 distinto (o falsificado) no omite la subida
+        mock_instance.request.side_effect = [self._getinfo(7)]
+        self.assertEqual(service._remote_md5('/s/big.iso', 100, 7), real)
+        self.assertEqual(service.check('/s', 'big.iso', 7, 'f' * 32)['status'], 'upload')
+
+    @patch.object(UploadService, 'preflight', return_value=None)
+    def test_check_falls_back_to_upload_on_transport_errors(self, mock_preflight, MockConn):
+        mock_instance = MockConn.return_value
+        service = UploadService(FileService())
+
+        mock_instance.request.side_effect = ConnectionError('reset')
+        self.assertEqual(service.check('/s', 'big.iso', 20, 'abc')['status'], 'upload')
+
+        mock_instance.request.side_effect = [self._getinfo(20), ConnectionError('reset')]
+        self.assertEqual(service.check('/s', 'big.iso', 20, 'abc')['status'], 'upload')
+
+    def _preflight_responses(self, permission, freespace, quota_mb=0, used_mb=0):
+        return [
+            permission,
+            {'success': True, 'data': {'shares': [{'path': '/s', 'additional': {
+                'real_path': '/volume1/s', 'volume_status': {'freespace': freespace, 'readonly': False}
+            }}]}},
+            {'success': True, 'data': {'user_quota': [{'volume_path': '/volume1', 'quota': quota_mb, 'used': used_mb}]}},
+        ]
+
+    def test_preflight_rejects_before_any_transfer(self, MockConn):
+        mock_instance = MockConn.return_value
+        service = UploadService(FileService())
+
+        mock_instance.request.side_effect = [{'success': False, 'error': {'code': 105}}]
+        self.assertEqual(service.preflight('/s/docs', 10, 'a.bin')['code'], 105)
+
+        mock_instance.request.side_effect = self._preflight_responses({'success': True}, freespace=100)
+        self.assertEqual(service.preflight('/s/docs', 500, 'a.bin')['code'], 416)
+
+        # Espacio y cuota cacheados: solo se repite CheckPermission
+        cache.delete(f"{UploadService.STATUS_KEY_PREFIX}:quota:/volume1")
+        mock_instance.request.side_effect = [
+            {'success': True},
+            {'success': True, 'data': {'user_quota': [{'volume_path': '/volume1', 'quota': 1, 'used': 1}]}},
+        ]
+        self.assertEqual(service.preflight('/s/docs', 50, 'a.bin')['code'], 415)
+
+    def test_preflight_passes_when_nas_cannot_answer(self, MockConn):
+        MockConn.return_value.request.side_effect = [
+            {'success': True}, {'success': False, 'error': {'code': 119}},
+        ]
+        self.assertIsNone(UploadService(FileService()).preflight('/s/docs', 10 ** 12, 'a.bin'))
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class DirSizeServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _getinfo(self, mtime=100):
+        return {'success': True, 'data': {'files': [
+            {'path': '/s/a', 'isdir': True, 'additional': {'time': {'mtime': mtime}}}
+        ]}}
+
+    def test_job_shared_then_cached_until_mtime_changes(self, MockConn):
+        mock_instance = MockConn.return_value
+        mock_instance.request.side_effect = [
+            self._getinfo(), {'success': True, 'data': {'taskid': 'D1'}},
+            # Segunda petición concurrente: reutiliza la tarea D1
+            self._getinfo(), {'success': True, 'data': {'finished': False}},
+            self._getinfo(), {'success': True, 'data': {'finished': True, 'total_size': 2048, 'num_file': 3, 'num_dir': 1}},
+            {'success': True},  # stop
+            self._getinfo(),
+            self._getinfo(mtime=200), {'success': True, 'data': {'taskid': 'D2'}},
+        ]
+        sizes = [DirSizeService(FileService()).get_sizes(['/s/a'])['/s/a'] for _ in range(5)]
+
+        self.assertEqual([s['status'] for s in sizes], ['pending', 'pending', 'ready', 'ready', 'pending'])
+        self.assertEqual(sizes[3]['size'], 2048)
+        starts = [c for c in mock_instance.request.call_args_list
+                  if c.kwargs['api'] == 'SYNO.FileStation.DirSize' and c.kwargs['method'] == 'start']
+        self.assertEqual(len(starts), 2)
+
+    def test_interleaved_job_starts_are_all_counted(self, MockConn):
+        MockConn.return_value.request.return_value = {'success': True, 'data': {'taskid': 'D1'}}
+        service = DirSizeService(FileService())
+        registry = type(DirSizeService.ACTIVE)
+        read_index = registry._index
+        other = threading.Thread(target=service._advance_job, args=('/s/b', 100))
+
+        def _interleaved(self):
+            index = read_index(self)
+            if other.ident is None:
+                # Otra petición arranca su tarea mientras esta lee el índice
+                other.start()
+                other.join(0.05)
+            return index
+
+        with patch.object(registry, '_index', _interleaved):
+            service._advance_job('/s/a', 100)
+        other.join()
+
+        self.assertEqual(service._active_jobs(), {'/s/a', '/s/b'})
+
+    def test_expired_job_is_stopped_on_the_nas(self, MockConn):
+        service = DirSizeService(FileService())
+        DirSizeService.ACTIVE.add('/s/a', 'D9')  # Su clave de tarea ya caducó
+
+        self.assertEqual(service._active_jobs(), set())
+        MockConn.return_value.request.assert_called_once_with(
+            api='SYNO.FileStation.DirSize', method='stop', version=2, params={'taskid': 'D9'}
+        )
+        self.assertFalse(DirSizeService.ACTIVE)
+
+
+@override_settings(NAS_OFFLINE_MODE=False, FILE_PREFETCH_COUNT=5, FILE_PREFETCH_PER_MINUTE=4)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class PrefetchServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @patch.object(BackgroundService, 'submit')
+    def test_schedules_low_priority_within_budget(self, mock_submit, MockConn):
+        items = [{'path': f'/s/p/d{i}', 'is_dir': True} for i in range(7)] + [{'path': '/s/p/f.txt', 'is_dir': False}]
+        service = PrefetchService(FileService())
+
+        scheduled = service.schedule('/s/p', items, {'offset': 0, 'limit': 200, 'profile': 'grid', 'pattern': None})
+
+        self.assertEqual(scheduled, ['/s/p/d0', '/s/p/d1', '/s/p/d2', '/s/p/d3'])
+        self.assertTrue(all(c.kwargs['lane'] == 'low' for c in mock_submit.call_args_list))
+        # Presupuesto agotado para este minuto
+        self.assertEqual(service.schedule('/s/p/d0', items, {'offset': 0}), [])
+
+    def test_navigation_away_drops_pending_work(self, MockConn):
+        service = PrefetchService(FileService())
+        worker = MagicMock()
+        with patch.object(BackgroundService, 'submit'):
+            service.schedule('/s/a', [], {})
+            service.schedule('/s/b', [], {})
+
+        self.assertFalse(service._warm(worker, '/s/a', '/s/a/x', {}))
+        self.assertTrue(service._warm(worker, '/s/b', '/s/b/x', {'limit': 200}))
+        worker.list_files_page.assert_called_once_with('/s/b/x', limit=200)
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.archivos.services.file_service.ConnectionService')
+class PreviewServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _service(self, MockConn, size, mtime=100):
+        MockConn.return_value.request.return_value = {
+            'success': True,
+            'data': {'files': [{'path': '/s/log.txt', 'isdir': False, 'additional': {'size': size, 'time': {'mtime': mtime}}}]}
+        }
+        return PreviewService(FileService())
+
+    def _stream(self, data, status_code=206):
+        stream = MagicMock(status_code=status_code)
+        stream.iter_content.return_value = iter([data])
+        return stream
+
+    def test_text_window_does_not_split_characters(self, MockConn):
+        service = self._service(MockConn, size=1000)
+        data = 'línea ñ'.encode('utf-8')[:-1]  # 'ñ' cortada al final de la ventana
+
+        with patch.object(FileService, 'get_file_stream', return_value=(self._stream(data), None)) as mock_stream:
+            result = service.preview('/s/log.txt', length=len(data))
+
+        mock_stream.assert_called_once_with('/s/log.txt', byte_range=f'bytes=0-{len(data) - 1}')
+        self.assertEqual(result['type'], 'text')
+        self.assertEqual(result['encoding'], 'utf-8')
+        self.assertEqual(result['content'], 'línea ')
+        self.assertEqual(result['next_offset'], len(data) - 1)
+        self.assertFalse(result['eof'])
+
+    def test_pdf_and_cache_by_mtime(self, MockConn):
+        service = self._service(MockConn, size=50000)
+        data = b'%PDF-1.7\n1 0 obj <</Linearized 1>>'
+
+        with patch.object(FileService, 'get_file_stream', return_value=(self._stream(data), None)) as mock_stream:
+            result = service.preview('/s/log.txt')
+            self.assertEqual(service.preview('/s/log.txt'), result)
+
+        self.assertEqual(mock_stream.call_count, 1)
+        self.assertEqual(result['type'], 'pdf')
+        self.assertTrue(result['linearized'])
+
+    def test_tail_reads_last_window(self, MockConn):
+        service = self._service(MockConn, size=1000)
+
+        with patch.object(FileService, 'get_file_stream', return_value=(self._stream(b'x' * 100), None)) as mock_stream:
+            result = service.preview('/s/log.txt', length=100, tail=True)
+
+        mock_stream.assert_called_once_with('/s/log.txt', byte_range='bytes=900-999')
+        self.assertEqual(result['offset'], 900)
+        self.assertTrue(result['eof'])
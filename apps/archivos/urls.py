@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ExplorerView, FileAPIView, FileUploadView, FileDownloadView
+from .views import ExplorerView, FileAPIView, FileUploadView, FileUploadCheckView, FileDownloadView, FilePreviewView, FileTaskView, FileArchiveView
 
 app_name = 'archivos'
 
@@ -7,5 +7,9 @@ urlpatterns = [
     path('', ExplorerView.as_view(), name='index'),
     path('api/files/', FileAPIView.as_view(), name='api_files'),
     path('api/upload/', FileUploadView.as_view(), name='api_upload'),
+    path('api/upload/check/', FileUploadCheckView.as_view(), name='api_upload_check'),
     path('api/download/', FileDownloadView.as_view(), name='api_download'),
+    path('api/preview/', FilePreviewView.as_view(), name='api_preview'),
+    path('api/tasks/', FileTaskView.as_view(), name='api_tasks'),
+    path('api/archive/', FileArchiveView.as_view(), name='api_archive'),
 ]
@@ -7,6 +7,14 @@ import json
 import logging
 
 from .services.file_service import FileService
+from .services.search_service import SearchService
+from .services.index_service import IndexService
+from .services.task_service import TaskService
+from .services.archive_service import ArchiveService
+from .services.upload_service import UploadService
+from .services.dirsize_service import DirSizeService
+from .services.prefetch_service import PrefetchService
+from .services.preview_service import PreviewService
 
 logger = logging.getLogger(__name__)
 
@@ -25,27 +33,82 @@ class FileAPIView(LoginRequiredMixin, View):
     """
     API Unificada para operaciones del file explorer.
     GET: Listar contenido (Root o Carpeta Específica)
-    POST: Crear carpeta, Renombrar, Eliminar
+    POST: Crear carpeta, Renombrar, Eliminar, Copiar/Mover, Búsqueda, Lotes (batch)
     """
+    # Tope de página para evitar respuestas gigantes (limit ausente o 0 => el tope,
+    # nunca "todo" como en DSM)
+    MAX_PAGE_SIZE = 1000
+    SEARCH_PAGE_SIZE = 200
+    MAX_BATCH_SIZE = 5000
+    MAX_DIRSIZE_PATHS = 200
+    MAX_TREE_NODES = 50
 
     def get(self, request):
-        service = FileService()
+        service = FileService(user=request.user)
         action = request.GET.get('action', 'list')
         path = request.GET.get('path', '')
 
         try:
             if action == 'list_shares':
-                data = service.list_shares()
+                data = service.list_shares(profile=request.GET.get('view'))
                 return JsonResponse({'success': True, 'items': data, 'is_root': True})
             
             elif action == 'list':
                 if not path:
                      # Si no hay path, asumimos shares list
-                     data = service.list_shares()
+                     data = service.list_shares(profile=request.GET.get('view'))
                      return JsonResponse({'success': True, 'items': data, 'is_root': True})
                 
-                data = service.list_files(path)
-                return JsonResponse({'success': True, 'items': data, 'is_root': False})
+                opts = self._get_list_options(request)
+                page = service.list_files_page(path, **opts)
+                if opts['offset'] == 0 and not opts['pattern']:
+                    # Calentar en segundo plano subcarpetas y padre (próximo clic probable)
+                    PrefetchService(service).schedule(path, page['items'], opts)
+                return JsonResponse({
+                    'success': True,
+                    'items': page['items'],
+                    'total': page['total'],
+                    'offset': page['offset'],
+                    'is_root': False
+                })
+
+            elif action == 'quick_search':
+                # Búsqueda instantánea en el índice local (si la share está indexada)
+                query = request.GET.get('q', '')
+                if not IndexService.share_for(path):
+                    return JsonResponse({'success': True, 'indexed': False, 'items': []})
+                items = IndexService(service).search(query, folder_path=path)
+                for item in items:
+                    item['from_index'] = True
+                return JsonResponse({'success': True, 'indexed': True, 'items': items})
+
+            elif action == 'stat':
+                # Verifica contra el NAS un resultado del índice antes de abrirlo
+                if not path:
+                    return JsonResponse({'success': False, 'message': 'Path is required'}, status=400)
+                item = IndexService(service).stat(path)
+                if item is None:
+                    return JsonResponse({'success': False, 'message': 'El elemento ya no existe'}, status=404)
+                return JsonResponse({'success': True, 'item': item})
+
+            elif action == 'search_results':
+                # Polling incremental: el cliente pide desde el último offset recibido
+                search_id = request.GET.get('search_id')
+                if not search_id:
+                    return JsonResponse({'success': False, 'message': 'Missing search_id'}, status=400)
+                opts = self._get_list_options(request, default_limit=self.SEARCH_PAGE_SIZE)
+                res = SearchService(service).poll(search_id, opts['offset'], opts['limit'])
+                return JsonResponse(res, status=200 if res.get('success') else 404)
+
+            elif action == 'tree':
+                # Nodos del árbol lateral: varias carpetas por petición (?path=...&path=...)
+                paths = request.GET.getlist('path')[:self.MAX_TREE_NODES]
+                return JsonResponse({'success': True, 'nodes': service.list_tree(paths)})
+
+            elif action == 'dir_sizes':
+                # Tamaños de carpetas visibles (?path=...&path=...); 'pending' => reconsultar
+                paths = request.GET.getlist('path')[:self.MAX_DIRSIZE_PATHS]
+                return JsonResponse({'success': True, 'sizes': DirSizeService(service).get_sizes(paths)})
                 
             return JsonResponse({'success': False, 'message': 'Invalid action'}, status=400)
             
@@ -53,8 +116,31 @@ class FileAPIView(LoginRequiredMixin, View):
             logger.exception("FileAPI Error")
             return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
+    def _get_list_options(self, request, default_limit=MAX_PAGE_SIZE):
+        """
+        Extrae parámetros de paginado/orden/filtro del querystring.
+        Los valores inválidos se normalizan en FileService.
+        """
+        def _int(name, default):
+            try:
+                return max(0, int(request.GET.get(name, default)))
+            except (TypeError, ValueError):
+                return default
+
+        return {
+            'offset': _int('offset', 0),
+            'limit': min(_int('limit', 0) or default_limit, self.MAX_PAGE_SIZE),
+            'sort_by': request.GET.get('sort_by', 'name'),
+            'sort_direction': request.GET.get('sort_direction', 'asc'),
+            'filetype': request.GET.get('filetype', 'all'),
+            'pattern': request.GET.get('pattern') or None,
+            'force_refresh': request.GET.get('refresh') == '1',
+            # Perfil de vista (picker | grid | details): campos additional mínimos
+            'profile': request.GET.get('view'),
+        }
+
     def post(self, request):
-        service = FileService()
+        service = FileService(user=request.user)
         try:
             # Detectar si es JSON body o Form Data (Uploads)
             if request.content_type == 'application/json':
@@ -75,7 +161,8 @@ class FileAPIView(LoginRequiredMixin, View):
                     
                 elif action == 'delete':
                     path = data.get('path')
-                    res = service.delete_item(path)
+                    # background: carpetas o selecciones grandes no bloquean la petición
+                    res = service.delete_item(path, background=bool(data.get('background')))
                     return JsonResponse(res)
 
                 elif action == 'copy' or action == 'move':
@@ -87,13 +174,37 @@ class FileAPIView(LoginRequiredMixin, View):
                     res = service.copy_move_item(path, dest, is_move)
                     return JsonResponse(res)
 
+                elif action == 'batch':
+                    operations = data.get('operations')
+                    if not isinstance(operations, list) or not operations:
+                        return JsonResponse({'success': False, 'message': 'Missing operations'}, status=400)
+                    if len(operations) > self.MAX_BATCH_SIZE:
+                        return JsonResponse({'success': False, 'message': f'Too many operations (max {self.MAX_BATCH_SIZE})'}, status=400)
+                    results = service.batch(operations)
+                    return JsonResponse({
+                        'success': all(r.get('success') for r in results),
+                        'results': results
+                    })
+
                 elif action == 'search':
                     path = data.get('path')
                     pattern = data.get('pattern')
                     if not path or not pattern:
                          return JsonResponse({'success': False, 'message': 'Missing path or pattern'}, status=400)
-                    items = service.search_files(path, pattern)
-                    return JsonResponse({'success': True, 'items': items})
+                    search = SearchService(service)
+                    started = search.start(path, pattern)
+                    if not started.get('success'):
+                        return JsonResponse(started, status=400)
+                    # Primera tanda de resultados en la misma respuesta
+                    res = search.poll(started['search_id'], 0, self.SEARCH_PAGE_SIZE)
+                    res.update({'search_id': started['search_id'], 'reused': started['reused']})
+                    return JsonResponse(res)
+
+                elif action == 'search_cancel':
+                    search_id = data.get('search_id')
+                    if not search_id:
+                        return JsonResponse({'success': False, 'message': 'Missing search_id'}, status=400)
+                    return JsonResponse(SearchService(service).cancel(search_id))
 
             return JsonResponse({'success': False, 'message': 'Action not supported via POST'}, status=400)
 
@@ -107,7 +218,7 @@ class FileUploadView(LoginRequiredMixin, View):
     """
     def post(self, request):
         try:
-            service = FileService()
+            service = FileService(user=request.user)
             path = request.POST.get('path')
             
             if not path:
@@ -116,10 +227,19 @@ class FileUploadView(LoginRequiredMixin, View):
             if 'file' not in request.FILES:
                 return JsonResponse({'success': False, 'message': 'File is required (key: file)'}, status=400)
                 
+            # El pre-flight lo hace el cliente con FileUploadCheckView antes de
+            # enviar el cuerpo; aquí ya llegó entero y el NAS reporta el error
             uploaded_file = request.FILES['file']
             
-            # Streaming passthrough a la API de Synology
-            res = service.upload_file(path, uploaded_file)
+            if request.POST.get('extract') == '1':
+                # Carpeta empaquetada por el cliente: una subida + Extract en el NAS
+                res = service.upload_and_extract(path, uploaded_file)
+            else:
+                # Streaming passthrough a la API de Synology
+                res = service.upload_file(path, uploaded_file)
+                if res.get('success') and request.POST.get('md5'):
+                    # El cliente usa deduplicación: se guarda el MD5 calculado aquí, no el suyo
+                    UploadService(service).remember(f"{path.rstrip('/')}/{uploaded_file.name}", uploaded_file)
             
             if res.get('success'):
                 return JsonResponse({'success': True, 'data': res.get('data')})
@@ -130,6 +250,28 @@ class FileUploadView(LoginRequiredMixin, View):
             logger.exception("Upload Error")
             return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
+class FileUploadCheckView(LoginRequiredMixin, View):
+    """
+    Chequeo previo a una subida (JSON: path, size, name y md5 opcionales).
+    Rechaza de entrada subidas sin permiso, cuota o espacio, y permite omitir
+    la transferencia si el NAS ya tiene el mismo contenido. Sin name solo
+    hace el pre-flight (ej. carga de carpetas).
+    """
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            path = data.get('path')
+            name = data.get('name')
+            if not path or data.get('size') is None:
+                return JsonResponse({'success': False, 'message': 'path and size are required'}, status=400)
+
+            service = FileService(user=request.user)
+            return JsonResponse(UploadService(service).check(path, name, data['size'], data.get('md5')))
+
+        except Exception as e:
+            logger.exception("Upload check Error")
+            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
 class FileDownloadView(LoginRequiredMixin, View):
     """
     Proxy para descargar o visualizar archivos desde el NAS.
@@ -140,8 +282,9 @@ class FileDownloadView(LoginRequiredMixin, View):
             return JsonResponse({'success': False, 'message': 'Path is required'}, status=400)
         
         try:
-            service = FileService()
-            stream_res, error = service.get_file_stream(path)
+            service = FileService(user=request.user)
+            # Range se reenvía al NAS: visores de PDF/vídeo piden solo lo que muestran
+            stream_res, error = service.get_file_stream(path, byte_range=request.headers.get('Range'))
             
             if error:
                 return JsonResponse({'success': False, 'message': error}, status=400)
@@ -150,8 +293,12 @@ class FileDownloadView(LoginRequiredMixin, View):
             filename = path.split('/')[-1]
             response = StreamingHttpResponse(
                 stream_res.iter_content(chunk_size=8192),
-                content_type=stream_res.headers.get('Content-Type')
+                content_type=stream_res.headers.get('Content-Type'),
+                status=stream_res.status_code
             )
+            for header in ('Content-Length', 'Content-Range', 'Accept-Ranges'):
+                if header in stream_res.headers:
+                    response[header] = stream_res.headers[header]
             
             # Si el usuario quiere forzar descarga, o para tipos no visualizables
             if 'download' in request.GET:
@@ -164,3 +311,113 @@ class FileDownloadView(LoginRequiredMixin, View):
         except Exception as e:
             logger.exception("Download Proxy Error")
             return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+class FilePreviewView(LoginRequiredMixin, View):
+    """
+    Vista previa parcial: solo los primeros (o últimos, tail=1) N KB de un archivo.
+    GET: path, offset, length, tail, encoding (de la página anterior).
+    """
+    def get(self, request):
+        path = request.GET.get('path')
+        if not path:
+            return JsonResponse({'success': False, 'message': 'Path is required'}, status=400)
+
+        try:
+            offset = max(0, int(request.GET.get('offset', 0)))
+            length = max(0, int(request.GET.get('length', 0))) or None
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'message': 'Invalid offset/length'}, status=400)
+
+        try:
+            service = FileService(user=request.user)
+            res = PreviewService(service).preview(
+                path, offset=offset, length=length,
+                tail=request.GET.get('tail') == '1',
+                encoding=request.GET.get('encoding') or None
+            )
+            return JsonResponse(res, status=200 if res.get('success') else 400)
+
+        except Exception as e:
+            logger.exception("Preview Error")
+            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+class FileArchiveView(LoginRequiredMixin, View):
+    """
+    Descarga de carpetas / selecciones múltiples como un solo archivo.
+    POST (form, mode=stream): ZIP armado al vuelo en el proxy. Campo 'paths' repetido.
+    POST (JSON, mode=nas): inicia SYNO.FileStation.Compress; retorna taskid (ver api/tasks/).
+    GET ?taskid=: descarga el .zip de una compresión terminada y lo elimina del NAS.
+    """
+    def get(self, request):
+        taskid = request.GET.get('taskid')
+        if not taskid:
+            return JsonResponse({'success': False, 'message': 'taskid is required'}, status=400)
+        try:
+            service = FileService(user=request.user)
+            iterator, filename, error = ArchiveService(service).stream_compressed(taskid)
+            if error:
+                return JsonResponse({'success': False, 'message': error}, status=400)
+            response = StreamingHttpResponse(iterator, content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        except Exception as e:
+            logger.exception("Archive Download Error")
+            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+    def post(self, request):
+        try:
+            if request.content_type == 'application/json':
+                data = json.loads(request.body)
+                paths, mode = data.get('paths'), data.get('mode', 'nas')
+            else:
+                paths, mode = request.POST.getlist('paths'), request.POST.get('mode', 'stream')
+
+            if not paths or not isinstance(paths, list):
+                return JsonResponse({'success': False, 'message': 'paths is required'}, status=400)
+
+            service = FileService(user=request.user)
+            archive = ArchiveService(service)
+
+            if mode == 'nas':
+                res = archive.start_compress(paths)
+                return JsonResponse(res, status=200 if res.get('success') else 400)
+
+            if service.offline_mode:
+                return JsonResponse({'success': False, 'message': 'Offline mode'}, status=400)
+
+            name = paths[0].rstrip('/').split('/')[-1] if len(paths) == 1 else 'descarga'
+            response = StreamingHttpResponse(archive.stream_zip(paths), content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="{name}.zip"'
+            return response
+        except Exception as e:
+            logger.exception("Archive Error")
+            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+
+class FileTaskView(LoginRequiredMixin, View):
+    """
+    Estado de las tareas de fondo del usuario (copiar, mover, eliminar, comprimir, extraer).
+    Solo lee la caché que mantiene el poller compartido: no llama al NAS.
+    GET: lista (active=1 para solo las activas)
+    POST: cancel (taskid) | clear (descarta terminadas)
+    """
+    def get(self, request):
+        user_key = request.user.pk
+        TaskService.ensure_poller()
+        tasks = TaskService.list_tasks(user_key, active_only=request.GET.get('active') == '1')
+        return JsonResponse({'success': True, 'tasks': tasks})
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Cuerpo JSON inválido'}, status=400)
+
+        action = data.get('action')
+        if action == 'cancel':
+            service = FileService(user=request.user)
+            return JsonResponse(TaskService.cancel(service.connection, service.user_key, data.get('taskid')))
+        elif action == 'clear':
+            TaskService.clear_finished(request.user.pk)
+            return JsonResponse({'success': True})
+        return JsonResponse({'success': False, 'message': 'Invalid action'}, status=400)
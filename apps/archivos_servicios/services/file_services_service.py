@@ -16,8 +16,8 @@ class FileServicesService:
     Interactúa con las APIs correspondientes.
     """
     
-    def __init__(self, session='FileStation'):
-        self.config = NASConfig.get_active_config()
+    def __init__(self, session='FileStation', config=None):
+        self.config = config or NASConfig.get_active_config()
         self.offline_mode = getattr(settings, 'NAS_OFFLINE_MODE', False)
         if not self.offline_mode and self.config:
             self.connection = ConnectionService(self.config)
@@ -7,6 +7,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 import json
 from .services.file_services_service import FileServicesService
+from apps.settings.models import NASConfig
 
 
 def is_admin(user):
@@ -24,7 +25,7 @@ def index(request):
     Vista principal de servicios de archivos.
     Muestra el panel con todas las pestañas.
     """
-    service = FileServicesService()
+    service = FileServicesService(config=NASConfig.for_request(request))
     configs = service.get_all_configs()
     
     context = {
@@ -46,7 +47,7 @@ def api_get_configs(request):
     """
     API: Obtiene todas las configuraciones de servicios.
     """
-    service = FileServicesService()
+    service = FileServicesService(config=NASConfig.for_request(request))
     configs = service.get_all_configs()
     return JsonResponse(configs, safe=False)
 
@@ -58,9 +59,10 @@ def api_update_smb(request):
     """
     API: Actualiza configuración SMB.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_smb_config(data)
         return JsonResponse(result)
     except Exception as e:
@@ -74,9 +76,10 @@ def api_update_afp(request):
     """
     API: Actualiza configuración AFP.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_afp_config(data)
         return JsonResponse(result)
     except Exception as e:
@@ -90,9 +93,10 @@ def api_update_nfs(request):
     """
     API: Actualiza configuración NFS.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_nfs_config(data)
         return JsonResponse(result)
     except Exception as e:
@@ -106,9 +110,10 @@ def api_update_ftp(request):
     """
     API: Actualiza configuración FTP/FTPS/SFTP.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_ftp_config(data)
         return JsonResponse(result)
     except Exception as e:
@@ -122,9 +127,10 @@ def api_update_rsync(request):
     """
     API: Actualiza configuración rsync.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_rsync_config(data)
         return JsonResponse(result)
     except Exception as e:
@@ -138,9 +144,10 @@ def api_update_advanced(request):
     """
     API: Actualiza configuraciones avanzadas.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_advanced_config(data)
         return JsonResponse(result)
     except Exception as e:
@@ -154,7 +161,7 @@ def api_get_rsync_account(request):
     """
     API: Obtiene la cuenta rsync.
     """
-    service = FileServicesService()
+    service = FileServicesService(config=NASConfig.for_request(request))
     result = service.get_rsync_account()
     return JsonResponse(result)
 
@@ -166,9 +173,10 @@ def api_update_rsync_account(request):
     """
     API: Actualiza la cuenta rsync.
     """
+    config = NASConfig.for_request(request)
     try:
         data = json.loads(request.body)
-        service = FileServicesService()
+        service = FileServicesService(config=config)
         result = service.set_rsync_account(data)
         return JsonResponse(result)
     except Exception as e:
@@ -13,8 +13,8 @@ class ShareService:
     Soporta modo offline y sesiones administrativas DSM.
     """
     
-    def __init__(self, session_alias='FileStation'):
-        self.config = NASConfig.get_active_config()
+    def __init__(self, session_alias='FileStation', config=None):
+        self.config = config or NASConfig.get_active_config()
         self.connection = ConnectionService(self.config)
         if not getattr(settings, 'NAS_OFFLINE_MODE', False):
             self.connection.authenticate(session_alias=session_alias)
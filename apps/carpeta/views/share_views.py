@@ -5,6 +5,7 @@ import json
 import logging
 
 from ..services.share_service import ShareService
+from apps.settings.models import NASConfig
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,7 @@ class ShareListView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        service = ShareService()
+        service = ShareService(config=NASConfig.for_request(self.request))
         
         # Breadcrumbs
         context['breadcrumbs'] = [
@@ -46,7 +47,7 @@ class ShareWizardDataView(LoginRequiredMixin, View):
     """
     
     def get(self, request):
-        service = ShareService()
+        service = ShareService(config=NASConfig.for_request(request))
         # Carga datos para edición si se implementa en futuro
         name = request.GET.get('name')
         if name:
@@ -59,10 +60,11 @@ class ShareWizardDataView(LoginRequiredMixin, View):
         return JsonResponse({'success': True, 'data': options})
 
     def post(self, request):
+        config = NASConfig.for_request(request)
         try:
             data = json.loads(request.body)
             mode = data.get('mode', 'create')
-            service = ShareService()
+            service = ShareService(config=config)
             
             if mode == 'edit':
                  share_name = data.get('info', {}).get('name') or data.get('name')
@@ -95,7 +97,7 @@ class ShareDeleteView(LoginRequiredMixin, View):
     Soporta eliminación masiva si name == 'batch'.
     """
     def post(self, request, name):
-        service = ShareService()
+        service = ShareService(config=NASConfig.for_request(request))
         
         # Determinar si es masivo
         names_to_delete = [name]
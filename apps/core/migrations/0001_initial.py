@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(help_text='Nombre de la serie (ej. cpu, net_rx, volume:Volume 1)', max_length=128)),
+                ('resolution', models.PositiveIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Agregado de métrica',
+                'verbose_name_plural': 'Agregados de métricas',
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='core_rollup_res_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('series', 'resolution', 'bucket'), name='core_metricrollup_unique_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('settings', '0002_nasconfig_fleet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NASLogCursor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('log_type', models.CharField(default='system', max_length=32)),
+                ('newest_at', models.DateTimeField(blank=True, null=True)),
+                ('backfill_offset', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('nas', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='log_cursors', to='settings.nasconfig')),
+            ],
+            options={
+                'verbose_name': 'Cursor de logs',
+                'verbose_name_plural': 'Cursores de logs',
+                'constraints': [models.UniqueConstraint(fields=('nas', 'log_type'), name='core_naslogcursor_unique_type')],
+            },
+        ),
+        migrations.CreateModel(
+            name='NASLogEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('log_type', models.CharField(default='system', max_length=32)),
+                ('logged_at', models.DateTimeField(db_index=True)),
+                ('user', models.CharField(blank=True, default='', max_length=150)),
+                ('level', models.CharField(default='info', max_length=16)),
+                ('message', models.TextField(blank=True, default='')),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('nas', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='log_entries', to='settings.nasconfig')),
+            ],
+            options={
+                'verbose_name': 'Log del NAS',
+                'verbose_name_plural': 'Logs del NAS',
+                'ordering': ['-logged_at', '-id'],
+                'indexes': [models.Index(fields=['nas', 'level', 'logged_at'], name='core_naslog_nas_level_idx')],
+                'constraints': [models.UniqueConstraint(fields=('nas', 'fingerprint'), name='core_naslogentry_unique_fingerprint')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from apps.core.services.trigram_index import TrigramIndex
+
+# Índice FTS5 trigram sobre los mensajes de log (IPs, rutas, usuarios; LIKE si no hay FTS5).
+FTS = TrigramIndex('core_naslogentry', 'message')
+
+
+def create_fts(apps, schema_editor):
+    FTS.create(schema_editor)
+
+
+def drop_fts(apps, schema_editor):
+    FTS.drop(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_naslog'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
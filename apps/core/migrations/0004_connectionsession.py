@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_naslogentry_fts'),
+        ('settings', '0002_nasconfig_fleet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConnectionSession',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user', models.CharField(max_length=150)),
+                ('ip', models.CharField(blank=True, default='', max_length=64)),
+                ('protocol', models.CharField(blank=True, default='', max_length=32)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('ended_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('nas', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='connection_sessions', to='settings.nasconfig')),
+            ],
+            options={
+                'verbose_name': 'Sesión de conexión',
+                'verbose_name_plural': 'Sesiones de conexión',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['nas', 'ended_at'], name='core_connsession_open_idx')],
+            },
+        ),
+    ]
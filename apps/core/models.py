@@ -1,3 +1,116 @@
 from django.db import models
 
-# Create your models here.
+
+class MetricRollup(models.Model):
+    """
+    Agregado de una serie de métricas del NAS en un intervalo de tiempo.
+    resolution: segundos del intervalo (60, 900, 3600); bucket: epoch de inicio.
+    Se guarda la suma (no la media) para poder fusionar muestras de varios procesos.
+    """
+    series = models.CharField(max_length=128, help_text="Nombre de la serie (ej. cpu, net_rx, volume:Volume 1)")
+    resolution = models.PositiveIntegerField()
+    bucket = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    min = models.FloatField()
+    max = models.FloatField()
+
+    class Meta:
+        verbose_name = "Agregado de métrica"
+        verbose_name_plural = "Agregados de métricas"
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'resolution', 'bucket'], name='core_metricrollup_unique_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket'], name='core_rollup_res_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.series}@{self.resolution}s:{self.bucket}"
+
+    @property
+    def avg(self):
+        return self.total / self.count if self.count else None
+
+
+class NASLogEntry(models.Model):
+    """
+    Entrada de log del NAS (SYNO.Core.SyslogClient.Log) ingerida localmente.
+    fingerprint identifica la entrada para deduplicar entre ingestas solapadas.
+    """
+    nas = models.ForeignKey('settings.NASConfig', on_delete=models.CASCADE, null=True, blank=True, related_name='log_entries')
+    log_type = models.CharField(max_length=32, default='system')
+    logged_at = models.DateTimeField(db_index=True)
+    user = models.CharField(max_length=150, blank=True, default='')
+    level = models.CharField(max_length=16, default='info')
+    message = models.TextField(blank=True, default='')
+    fingerprint = models.CharField(max_length=40)
+
+    class Meta:
+        verbose_name = "Log del NAS"
+        verbose_name_plural = "Logs del NAS"
+        ordering = ['-logged_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['nas', 'fingerprint'], name='core_naslogentry_unique_fingerprint'),
+        ]
+        indexes = [
+            models.Index(fields=['nas', 'level', 'logged_at'], name='core_naslog_nas_level_idx'),
+        ]
+
+    def __str__(self):
+        return f"[{self.level}] {self.logged_at:%Y-%m-%d %H:%M:%S} {self.message[:60]}"
+
+
+class NASLogCursor(models.Model):
+    """
+    Cursor de ingesta de logs por NAS y tipo de log.
+    newest_at: entrada más reciente ingerida (la cabeza se lee hasta llegar a ella).
+    backfill_offset: offset desde el que seguir trayendo historial antiguo; None si terminó.
+    """
+    nas = models.ForeignKey('settings.NASConfig', on_delete=models.CASCADE, null=True, blank=True, related_name='log_cursors')
+    log_type = models.CharField(max_length=32, default='system')
+    newest_at = models.DateTimeField(null=True, blank=True)
+    backfill_offset = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cursor de logs"
+        verbose_name_plural = "Cursores de logs"
+        constraints = [
+            models.UniqueConstraint(fields=['nas', 'log_type'], name='core_naslogcursor_unique_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.nas}:{self.log_type}"
+
+
+class ConnectionSession(models.Model):
+    """
+    Sesión activa en el NAS (SYNO.Core.CurrentConnection) identificada por
+    (usuario, IP, protocolo), tal como la ve el monitor de conexiones.
+    started_at es la entrada (join) y ended_at la salida (leave); mientras
+    ended_at es nulo la sesión forma parte del conjunto actual.
+    count: conexiones simultáneas con la misma clave.
+    """
+    nas = models.ForeignKey('settings.NASConfig', on_delete=models.CASCADE, null=True, blank=True, related_name='connection_sessions')
+    user = models.CharField(max_length=150)
+    ip = models.CharField(max_length=64, blank=True, default='')
+    protocol = models.CharField(max_length=32, blank=True, default='')
+    count = models.PositiveIntegerField(default=1)
+    started_at = models.DateTimeField(db_index=True)
+    ended_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Sesión de conexión"
+        verbose_name_plural = "Sesiones de conexión"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['nas', 'ended_at'], name='core_connsession_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user}@{self.ip} ({self.protocol})"
+
+    @property
+    def key(self):
+        return (self.user, self.ip, self.protocol)
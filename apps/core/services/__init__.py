@@ -1,4 +1,14 @@
 # Puedes importar los services desde aquí
 from .metrics_service import MetricsService
+from .background_service import BackgroundService
+from .cache_registry import CacheRegistry
+from .capacity_forecast import CapacityForecast
+from .connection_monitor import ConnectionMonitor
+from .fleet_service import FleetService
+from .log_service import LogService
+from .metrics_collector import MetricsCollector
+from .metrics_history import MetricsHistory
+from .metrics_stream import MetricsStream
+from .trigram_index import TrigramIndex
 
-__all__ = ['MetricsService']
+__all__ = ['MetricsService', 'BackgroundService', 'CacheRegistry', 'CapacityForecast', 'ConnectionMonitor', 'FleetService', 'LogService', 'MetricsCollector', 'MetricsHistory', 'MetricsStream', 'TrigramIndex']
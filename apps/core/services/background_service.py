@@ -0,0 +1,72 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundService:
+    """
+    Ejecutor de tareas en segundo plano dentro del proceso.
+    No hay Celery en el proyecto: usamos un ThreadPoolExecutor compartido
+    y deduplicamos por clave para que la misma tarea (ej. refrescar una
+    carpeta) no se ejecute dos veces en paralelo.
+
+    Carriles: 'default' para trabajo que alguien espera (revalidaciones,
+    crawls) y 'low' para trabajo especulativo (prefetch) con su propio pool
+    pequeño, así nunca le quita hilos al carril normal. 'fleet' consulta
+    los NAS de la flota en paralelo (un hilo por unidad).
+    """
+
+    MAX_WORKERS = 4
+    LANES = {'default': MAX_WORKERS, 'low': 1, 'fleet': 10}
+
+    _executors = {}
+    _lock = threading.Lock()
+    _running = {}
+
+    @classmethod
+    def _get_executor(cls, lane='default'):
+        with cls._lock:
+            if lane not in cls._executors:
+                cls._executors[lane] = ThreadPoolExecutor(
+                    max_workers=cls.LANES[lane], thread_name_prefix=f'nas-bg-{lane}'
+                )
+            return cls._executors[lane]
+
+    @classmethod
+    def submit(cls, key, fn, *args, lane='default', **kwargs):
+        """
+        Encola fn(*args, **kwargs) en el carril indicado si no hay otra tarea
+        activa con la misma clave. Retorna el Future (nuevo o el ya existente).
+        """
+        executor = cls._get_executor(lane)
+
+        def _run():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                logger.exception(f"Background task '{key}' failed")
+            finally:
+                # Los hilos del pool reutilizan conexiones a BD: cerrarlas al terminar
+                close_old_connections()
+                with cls._lock:
+                    if cls._running.get(key) is future_holder[0]:
+                        cls._running.pop(key, None)
+
+        future_holder = [None]
+        with cls._lock:
+            future = cls._running.get(key)
+            if future is not None and not future.done():
+                return future
+            future = executor.submit(_run)
+            future_holder[0] = future
+            cls._running[key] = future
+        return future
+
+    @classmethod
+    def is_running(cls, key):
+        with cls._lock:
+            future = cls._running.get(key)
+            return future is not None and not future.done()
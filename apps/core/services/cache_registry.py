@@ -0,0 +1,80 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRegistry:
+    """
+    Registro compartido (hilos y procesos) de elementos en curso, sobre la caché.
+
+    - Cada elemento vive en su propia clave; el índice de ids solo se modifica
+      bajo un candado tomado con cache.add (atómico en todos los backends), así
+      dos altas o bajas simultáneas no se pisan.
+    - remove() devuelve el valor solo a quien lo retira: varios barrenderos
+      concurrentes limpian cada elemento una única vez.
+    - El candado caduca a los LOCK_TIMEOUT segundos si su dueño murió.
+    """
+
+    LOCK_TIMEOUT = 5
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def _item_key(self, item_id):
+        return f"{self.prefix}:item:{item_id}"
+
+    @property
+    def _index_key(self):
+        return f"{self.prefix}:index"
+
+    @contextmanager
+    def _locked(self):
+        key, token = f"{self.prefix}:lock", uuid.uuid4().hex
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while not cache.add(key, token, timeout=self.LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                logger.warning(f"[REGISTRY] Lock {key} not released in {self.LOCK_TIMEOUT}s, proceeding")
+                break
+            time.sleep(0.005)
+        try:
+            yield
+        finally:
+            if cache.get(key) == token:
+                cache.delete(key)
+
+    def _index(self):
+        return cache.get(self._index_key) or set()
+
+    def add(self, item_id, value):
+        cache.set(self._item_key(item_id), value, timeout=None)
+        with self._locked():
+            index = self._index()
+            index.add(item_id)
+            cache.set(self._index_key, index, timeout=None)
+
+    def remove(self, item_id):
+        """Retira el elemento. Retorna su valor, o None si ya no estaba (otro lo retiró)."""
+        with self._locked():
+            index = self._index()
+            if item_id not in index:
+                return None
+            index.discard(item_id)
+            cache.set(self._index_key, index, timeout=None)
+            value = cache.get(self._item_key(item_id))
+            cache.delete(self._item_key(item_id))
+        return value
+
+    def items(self):
+        """{id: valor} de los elementos registrados."""
+        index = self._index()
+        if not index:
+            return {}
+        values = cache.get_many([self._item_key(i) for i in index])
+        return {i: values[self._item_key(i)] for i in index if self._item_key(i) in values}
+
+    def __bool__(self):
+        return bool(self._index())
@@ -0,0 +1,163 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Q, Sum, Value
+from django.utils import timezone
+
+from apps.core.models import MetricRollup
+
+logger = logging.getLogger(__name__)
+
+
+class CapacityForecast:
+    """
+    Previsión de capacidad por volumen y por carpeta compartida.
+
+    - Datos: los bytes usados que MetricsCollector ya muestrea con la familia
+      'storage' quedan en MetricsHistory como series volume_used:<nombre>,
+      volume_total:<nombre> y share_used:<nombre>. Se usan los agregados
+      horarios (MetricRollup), que se conservan años y ocupan una fila por
+      serie y hora.
+    - Tendencia lineal por mínimos cuadrados sobre los últimos
+      CAPACITY_FORECAST_DAYS días. Todas las series se ajustan a la vez con
+      una única consulta agregada (sumas de x, y, x², xy, y² por serie); con
+      ventanas de semanas completas el ciclo semanal no sesga la pendiente.
+    - Hacen falta al menos CAPACITY_MIN_POINTS horas de datos por serie.
+    - El resultado se cachea CAPACITY_FORECAST_TTL segundos.
+    """
+
+    KEY = 'core:capacity:forecast'
+    RESOLUTION = 3600
+    GIB = 1024 ** 3
+    PREFIXES = ('volume_used:', 'volume_total:', 'share_used:')
+
+    # --- Configuración ---
+    @staticmethod
+    def window_days():
+        return getattr(settings, 'CAPACITY_FORECAST_DAYS', 28)
+
+    @staticmethod
+    def min_points():
+        return getattr(settings, 'CAPACITY_MIN_POINTS', 24)
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'CAPACITY_FORECAST_TTL', 900)
+
+    # --- API pública ---
+    @classmethod
+    def forecast(cls, force=False):
+        """
+        {'volumes': [...], 'shares': [...], 'window_days', 'updated_at'}.
+        Volumen: {'name', 'used_bytes', 'total_bytes', 'growth_per_day',
+        'days_until_full', 'full_at', 'r2', 'points'}; carpeta: igual sin total
+        ni fechas de llenado. growth_per_day en bytes; None sin datos suficientes.
+        """
+        if not force:
+            cached = cache.get(cls.KEY)
+            if cached is not None:
+                return cached
+
+        now = time.time()
+        fits = cls._fit_all(now)
+        latest = cls._latest(now)
+        volumes, shares = [], []
+        for series, fit in sorted(fits.items()):
+            kind, name = series.split(':', 1)
+            used = latest.get(series)
+            if kind == 'volume_used':
+                volumes.append(cls._volume(name, used, latest.get(f'volume_total:{name}'), fit))
+            elif kind == 'share_used':
+                shares.append({'name': name, 'used_bytes': used, **cls._trend(fit)})
+
+        result = {'volumes': volumes, 'shares': shares, 'window_days': cls.window_days(), 'updated_at': now}
+        cache.set(cls.KEY, result, timeout=cls.ttl())
+        return result
+
+    @classmethod
+    def annotate_storage(cls, storage):
+        """Copia de la métrica 'storage' del dashboard con 'days_until_full' en cada volumen."""
+        if not storage or not storage.get('volumes'):
+            return storage
+        by_name = {v['name']: v for v in cls.forecast()['volumes']}
+        return {
+            **storage,
+            'volumes': [
+                {**vol, 'days_until_full': (by_name.get(vol.get('name')) or {}).get('days_until_full')}
+                for vol in storage['volumes']
+            ],
+        }
+
+    # --- Internos ---
+    @classmethod
+    def _fit_all(cls, now):
+        """Sumas de regresión por serie en una sola consulta (x en días desde ahora, y en GiB)."""
+        since = now - cls.window_days() * 86400
+        prefixes = Q()
+        for prefix in ('volume_used:', 'share_used:'):
+            prefixes |= Q(series__startswith=prefix)
+        x = ExpressionWrapper((F('bucket') - Value(int(now))) / Value(86400.0), output_field=FloatField())
+        y = ExpressionWrapper(F('total') / F('count') / Value(float(cls.GIB)), output_field=FloatField())
+        rows = (
+            MetricRollup.objects
+            .filter(prefixes, resolution=cls.RESOLUTION, bucket__gte=since, count__gt=0)
+            .annotate(x=x, y=y)
+            .values('series')
+            .annotate(
+                n=Count('id'), sx=Sum('x'), sy=Sum('y'),
+                sxx=Sum(F('x') * F('x'), output_field=FloatField()),
+                sxy=Sum(F('x') * F('y'), output_field=FloatField()),
+                syy=Sum(F('y') * F('y'), output_field=FloatField()),
+            )
+        )
+        return {row['series']: row for row in rows}
+
+    @classmethod
+    def _latest(cls, now):
+        """Último valor horario de cada serie de capacidad (bytes)."""
+        prefixes = Q()
+        for prefix in cls.PREFIXES:
+            prefixes |= Q(series__startswith=prefix)
+        recent = MetricRollup.objects.filter(
+            prefixes, resolution=cls.RESOLUTION, bucket__gte=now - 3 * cls.RESOLUTION, count__gt=0
+        )
+        last = dict(recent.values('series').annotate(last=Max('bucket')).values_list('series', 'last'))
+        latest = {}
+        for series, bucket, count, total in recent.values_list('series', 'bucket', 'count', 'total'):
+            if bucket == last[series]:
+                latest[series] = int(total / count)
+        return latest
+
+    @classmethod
+    def _trend(cls, fit):
+        """Pendiente (bytes/día) y R² de las sumas de regresión."""
+        n = fit['n']
+        denom = n * fit['sxx'] - fit['sx'] ** 2
+        if n < cls.min_points() or denom <= 0:
+            return {'growth_per_day': None, 'r2': None, 'points': n}
+        slope = (n * fit['sxy'] - fit['sx'] * fit['sy']) / denom
+        var_y = n * fit['syy'] - fit['sy'] ** 2
+        r2 = (n * fit['sxy'] - fit['sx'] * fit['sy']) ** 2 / (denom * var_y) if var_y > 0 else None
+        return {
+            'growth_per_day': int(slope * cls.GIB),
+            'r2': round(r2, 3) if r2 is not None else None,
+            'points': n,
+        }
+
+    @classmethod
+    def _volume(cls, name, used, total, fit):
+        trend = cls._trend(fit)
+        days = None
+        growth = trend['growth_per_day']
+        if growth and growth > 0 and used is not None and total:
+            days = round(max(total - used, 0) / growth, 1)
+        return {
+            'name': name,
+            'used_bytes': used,
+            'total_bytes': total,
+            **trend,
+            'days_until_full': days,
+            'full_at': (timezone.now() + timedelta(days=days)).date().isoformat() if days is not None else None,
+        }
@@ -0,0 +1,189 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.core.models import ConnectionSession
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionMonitor:
+    """
+    Monitor de conexiones activas del NAS (SYNO.Core.CurrentConnection).
+
+    - Cada muestreo (familia 'connections' de MetricsCollector) compara la
+      lista del NAS con el conjunto actual, agrupado por (usuario, IP,
+      protocolo), y solo escribe las diferencias: una fila nueva por cada
+      entrada (join) y ended_at en las que desaparecen (leave).
+    - El conjunto actual son las sesiones sin ended_at: sobrevive a reinicios
+      y lo comparten todos los procesos.
+    - Agregados por usuario y protocolo, top-N y rotación (entradas/salidas
+      por intervalo) salen de la tabla local, sin consultar al NAS.
+    - Las sesiones cerradas se conservan CONNECTION_HISTORY_DAYS días.
+    """
+
+    KEY_PREFIX = 'core:connections'
+    ITEMS = 5
+    TOP_FIELDS = ('user', 'ip', 'protocol')
+
+    def __init__(self, connection, config=None):
+        self.connection = connection
+        self.config = config
+
+    # --- Configuración ---
+    @staticmethod
+    def history_days():
+        return getattr(settings, 'CONNECTION_HISTORY_DAYS', 30)
+
+    # --- Muestreo ---
+    def sample(self):
+        """
+        Consulta el NAS, aplica las diferencias y retorna el resumen para el
+        dashboard: {'total', 'items', 'joined', 'left', 'by_protocol'}.
+        None si el NAS no respondió (el conjunto actual no se toca).
+        """
+        items = self._fetch()
+        if items is None:
+            return None
+
+        current = Counter(self._key(item) for item in items)
+        joined, left = self.apply(current)
+
+        if cache.add(f"{self.KEY_PREFIX}:prune", 1, timeout=3600):
+            self.prune()
+        by_protocol = Counter()
+        for (_, _, protocol), n in current.items():
+            by_protocol[protocol] += n
+        return {
+            'total': len(items),
+            'items': items[:self.ITEMS],
+            'joined': joined,
+            'left': left,
+            'by_protocol': dict(by_protocol),
+        }
+
+    def apply(self, current, now=None):
+        """Aplica el conjunto {(usuario, ip, protocolo): nº conexiones}. Retorna (entradas, salidas)."""
+        now = now or timezone.now()
+        with transaction.atomic():
+            open_sessions = {}
+            closed = []
+            for session in ConnectionSession.objects.select_for_update().filter(nas=self.config, ended_at__isnull=True):
+                if session.key in open_sessions:
+                    # Duplicado (dos muestreos solapados): se cierra el sobrante
+                    closed.append(session.pk)
+                else:
+                    open_sessions[session.key] = session
+
+            new = [
+                ConnectionSession(nas=self.config, user=user, ip=ip, protocol=protocol, count=n, started_at=now)
+                for (user, ip, protocol), n in current.items() if (user, ip, protocol) not in open_sessions
+            ]
+            gone = [s.pk for key, s in open_sessions.items() if key not in current]
+            changed = []
+            for key, session in open_sessions.items():
+                if key in current and session.count != current[key]:
+                    session.count = current[key]
+                    changed.append(session)
+
+            ConnectionSession.objects.bulk_create(new)
+            if gone or closed:
+                ConnectionSession.objects.filter(pk__in=gone + closed).update(ended_at=now)
+            if changed:
+                ConnectionSession.objects.bulk_update(changed, ['count'])
+
+        if new or gone:
+            logger.debug(f"[CONNECTIONS] {len(new)} joined, {len(gone)} left on {self.config}")
+        return len(new), len(gone)
+
+    def _fetch(self):
+        try:
+            response = self.connection.request('SYNO.Core.CurrentConnection', 'list', version=1)
+        except Exception as e:
+            logger.error(f"Error fetching active connections: {e}")
+            return None
+        if not response.get('success'):
+            return None
+        return response.get('data', {}).get('items', [])
+
+    @staticmethod
+    def _key(item):
+        return (
+            str(item.get('who', item.get('user', '')) or '')[:150],
+            str(item.get('from', item.get('ip', '')) or '')[:64],
+            str(item.get('type', item.get('protocol', '')) or '')[:32],
+        )
+
+    def prune(self):
+        cutoff = timezone.now() - timedelta(days=self.history_days())
+        deleted = ConnectionSession.objects.filter(ended_at__lt=cutoff).delete()[0]
+        if deleted:
+            logger.info(f"[CONNECTIONS] Pruned {deleted} expired sessions")
+        return deleted
+
+    # --- Consultas (locales) ---
+    @classmethod
+    def summary(cls, nas=None, window=3600, buckets=12):
+        """
+        Conjunto actual agregado y rotación en la última `window` (segundos):
+        {'total', 'users', 'by_user': [...], 'by_protocol': [...],
+         'churn': {'bucket', 'timestamps', 'joined', 'left'}}.
+        """
+        current = ConnectionSession.objects.filter(nas=nas, ended_at__isnull=True)
+        by_user = list(
+            current.values('user').annotate(sessions=Sum('count'), ips=Count('ip', distinct=True)).order_by('-sessions', 'user')
+        )
+        by_protocol = list(
+            current.values('protocol').annotate(sessions=Sum('count'), users=Count('user', distinct=True)).order_by('-sessions', 'protocol')
+        )
+        return {
+            'total': sum(u['sessions'] for u in by_user),
+            'users': len(by_user),
+            'by_user': by_user,
+            'by_protocol': by_protocol,
+            'churn': cls.churn(nas=nas, window=window, buckets=buckets),
+        }
+
+    @staticmethod
+    def churn(nas=None, window=3600, buckets=12):
+        """Entradas y salidas por intervalo en la última `window` (listas alineadas a timestamps)."""
+        now = timezone.now()
+        since = now - timedelta(seconds=window)
+        size = max(window // buckets, 1)
+        start = int(since.timestamp()) // size * size
+        count = int(now.timestamp()) // size * size - start + size
+        timestamps = list(range(start, start + count, size))
+        joined = [0] * len(timestamps)
+        left = [0] * len(timestamps)
+
+        sessions = ConnectionSession.objects.filter(nas=nas).filter(Q(started_at__gte=since) | Q(ended_at__gte=since))
+        for started_at, ended_at in sessions.values_list('started_at', 'ended_at'):
+            if started_at >= since:
+                joined[(int(started_at.timestamp()) - start) // size] += 1
+            if ended_at is not None and ended_at >= since:
+                left[(int(ended_at.timestamp()) - start) // size] += 1
+        return {'bucket': size, 'timestamps': timestamps, 'joined': joined, 'left': left}
+
+    @classmethod
+    def top(cls, by='user', limit=10, window=None, nas=None):
+        """
+        Top-N por usuario, IP o protocolo. Sin window: conexiones actuales.
+        Con window (segundos): sesiones iniciadas en ese periodo (rotación).
+        """
+        if by not in cls.TOP_FIELDS:
+            by = 'user'
+        sessions = ConnectionSession.objects.filter(nas=nas)
+        if window:
+            sessions = sessions.filter(started_at__gte=timezone.now() - timedelta(seconds=window))
+            ranked = sessions.values(by).annotate(sessions=Count('id'))
+        else:
+            ranked = sessions.filter(ended_at__isnull=True).values(by).annotate(sessions=Sum('count'))
+        return [
+            {'key': row[by], 'sessions': row['sessions']}
+            for row in ranked.order_by('-sessions', by)[:limit]
+        ]
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from concurrent.futures import wait
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.settings.models import NASConfig
+from .background_service import BackgroundService
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+
+class FleetService:
+    """
+    Métricas agregadas de todos los NAS activos (flota).
+
+    - Cada unidad se consulta en su propio hilo (carril 'fleet' de
+      BackgroundService): la latencia del dashboard es la de la unidad más
+      lenta, no la suma. Las consultas a una misma unidad se deduplican.
+    - Fallos aislados: una unidad caída o que supera FLEET_UNIT_TIMEOUT se
+      marca como 'error'/'timeout' y el resto se muestra igual. Su consulta
+      sigue en segundo plano y no se relanza mientras no termine.
+    - Una sesión (login) por unidad, reutilizada entre consultas; se renueva
+      si falla, si cambia la configuración o tras SESSION_MAX_AGE.
+    - El resultado se cachea FLEET_METRICS_TTL segundos para todos los lectores.
+    - Solo lectura: las vistas de gestión eligen la unidad con ?nas=<id>
+      (ver NASConfig.for_request).
+    """
+
+    KEY = 'core:fleet:snapshot'
+    SESSION_MAX_AGE = 15 * 60
+
+    _lock = threading.Lock()
+    _services = {}
+
+    # --- Configuración ---
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'FLEET_METRICS_TTL', 15)
+
+    @staticmethod
+    def unit_timeout():
+        return getattr(settings, 'FLEET_UNIT_TIMEOUT', 10)
+
+    # --- API pública ---
+    @classmethod
+    def get_fleet_metrics(cls, force=False):
+        """
+        Retorna {'units': [...], 'totals': {...}, 'updated_at'}.
+        Cada unidad: {'id', 'name', 'url', 'is_default', 'status', 'error',
+        'latency_ms', 'storage', 'system', 'health'}.
+        """
+        if not force:
+            cached = cache.get(cls.KEY)
+            if cached is not None:
+                return cached
+
+        configs = list(NASConfig.get_active_configs())
+        futures = {
+            config.pk: BackgroundService.submit(f"core:fleet:{config.pk}", cls._collect_unit, config, lane='fleet')
+            for config in configs
+        }
+        done, _ = wait(futures.values(), timeout=cls.unit_timeout())
+
+        units = []
+        for config in configs:
+            future = futures[config.pk]
+            if future not in done:
+                units.append(cls._unit(config, status='timeout', error='El NAS no respondió a tiempo'))
+            elif future.result() is None:
+                units.append(cls._unit(config, status='error', error='Error inesperado al consultar el NAS'))
+            else:
+                units.append(future.result())
+
+        result = {'units': units, 'totals': cls._aggregate(units), 'updated_at': time.time()}
+        cache.set(cls.KEY, result, timeout=cls.ttl())
+        return result
+
+    # --- Internos ---
+    @classmethod
+    def _collect_unit(cls, config):
+        started = time.monotonic()
+        try:
+            service = cls._get_service(config)
+            if getattr(settings, 'NAS_OFFLINE_MODE', False):
+                metrics = service.get_dashboard_metrics()
+                storage, system, health = metrics['storage'], metrics['system'], metrics['health']
+            elif not service.connected:
+                return cls._unit(config, status='error', error='No se pudo conectar al NAS')
+            else:
+                storage = service._get_storage_metrics()
+                system = service._get_system_metrics()
+                health = service._get_health_status()
+        except Exception as e:
+            logger.exception(f"[FLEET] Failed to collect metrics from {config}")
+            cls._drop_service(config)
+            return cls._unit(config, status='error', error=str(e))
+
+        unit = cls._unit(config, status='ok', storage=storage, system=system, health=health)
+        unit['latency_ms'] = int((time.monotonic() - started) * 1000)
+        return unit
+
+    @staticmethod
+    def _unit(config, status, error=None, storage=None, system=None, health=None):
+        return {
+            'id': config.pk,
+            'name': str(config),
+            'url': config.get_base_url(),
+            'is_default': config.is_default,
+            'status': status,
+            'error': error,
+            'latency_ms': None,
+            'storage': storage,
+            'system': system,
+            'health': health,
+        }
+
+    @classmethod
+    def _get_service(cls, config):
+        """MetricsService de la unidad; una nueva (login) si falló, caducó o cambió la config."""
+        with cls._lock:
+            cached = cls._services.get(config.pk)
+            if cached is not None:
+                service, updated_at, created_at = cached
+                if service.connected and updated_at == config.updated_at and time.time() - created_at <= cls.SESSION_MAX_AGE:
+                    return service
+        service = MetricsService(config=config)
+        with cls._lock:
+            cls._services[config.pk] = (service, config.updated_at, time.time())
+        return service
+
+    @classmethod
+    def _drop_service(cls, config):
+        with cls._lock:
+            cls._services.pop(config.pk, None)
+
+    @staticmethod
+    def _aggregate(units):
+        ok = [u for u in units if u['status'] == 'ok']
+        total_bytes = sum(int(u['storage'].get('total_bytes') or 0) for u in ok)
+        used_bytes = sum(int(u['storage'].get('used_bytes') or 0) for u in ok)
+
+        def average(key):
+            values = [u['system'].get(key) or 0 for u in ok]
+            return round(sum(values) / len(values), 1) if values else 0
+
+        return {
+            'units': len(units),
+            'online': len(ok),
+            'offline': len(units) - len(ok),
+            'healthy': sum(1 for u in ok if u['health'] and u['health'].get('is_ok')),
+            'total_bytes': total_bytes,
+            'used_bytes': used_bytes,
+            'total': MetricsService._format_bytes(total_bytes),
+            'used': MetricsService._format_bytes(used_bytes),
+            'available': MetricsService._format_bytes(total_bytes - used_bytes),
+            'percent_used': round(used_bytes / total_bytes * 100, 1) if total_bytes else 0,
+            'cpu_usage': average('cpu_usage'),
+            'memory_usage': average('memory_usage'),
+            'max_temperature': max((u['system'].get('temperature') or 0 for u in ok), default=0),
+        }
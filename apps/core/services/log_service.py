@@ -0,0 +1,244 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core.models import NASLogEntry, NASLogCursor
+from .trigram_index import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+
+class LogService:
+    """
+    Ingesta incremental de los logs del NAS (SYNO.Core.SyslogClient.Log) a una
+    tabla local indexada, para el card de actividad y el visor de logs.
+
+    - Cursor persistido por NAS y tipo de log (NASLogCursor):
+      * newest_at: la cabeza se lee de lo más nuevo hacia atrás solo hasta
+        llegar a esa fecha; en régimen normal es una única página.
+      * backfill_offset: el historial antiguo se trae por tramos (BACKFILL_PAGES
+        por ingesta). Como el NAS pagina de lo más nuevo a lo más viejo, el
+        offset se desplaza con cada entrada nueva ingerida en la cabeza.
+    - Deduplicación por huella (tipo + fecha + usuario + nivel + mensaje);
+      dos líneas idénticas en el mismo segundo cuentan como una.
+    - Búsqueda local por subcadena sobre el mensaje con FTS5 trigram (o LIKE
+      si no está disponible), sin tocar el NAS.
+    - Ingesta como mucho cada LOG_INGEST_INTERVAL segundos por NAS; retención
+      LOG_RETENTION_DAYS.
+    """
+
+    PAGE = 200
+    MAX_HEAD_PAGES = 10
+    BACKFILL_PAGES = 5
+    KEY_PREFIX = 'core:logs'
+    FTS = TrigramIndex('core_naslogentry', 'message')
+    TIME_FORMATS = ('%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M:%S')
+
+    def __init__(self, connection, config=None):
+        self.connection = connection
+        self.config = config
+
+    # --- Configuración ---
+    @staticmethod
+    def ingest_interval():
+        return getattr(settings, 'LOG_INGEST_INTERVAL', 30)
+
+    @staticmethod
+    def retention_days():
+        return getattr(settings, 'LOG_RETENTION_DAYS', 90)
+
+    @staticmethod
+    def backfill_max():
+        """Entradas antiguas como máximo que se traen en la primera ingesta."""
+        return getattr(settings, 'LOG_BACKFILL_MAX', 20000)
+
+    @staticmethod
+    def log_types():
+        return getattr(settings, 'LOG_TYPES', ['system'])
+
+    # --- Ingesta ---
+    @classmethod
+    def _due_key(cls, config):
+        return f"{cls.KEY_PREFIX}:due:{getattr(config, 'pk', None)}"
+
+    @classmethod
+    def is_due(cls, config):
+        """Toma el turno de ingesta del NAS si toca (atómico entre procesos)."""
+        return cache.add(cls._due_key(config), 1, timeout=cls.ingest_interval())
+
+    def ingest_if_due(self):
+        if not self.is_due(self.config):
+            return 0
+        return self.ingest()
+
+    @classmethod
+    def ingest_default(cls, config=None):
+        """Ingesta de un NAS (el predeterminado si no se indica) con su propia sesión (para el visor de logs)."""
+        from apps.settings.models import NASConfig
+        from apps.settings.services.connection_service import ConnectionService
+
+        if getattr(settings, 'NAS_OFFLINE_MODE', False):
+            return 0
+        config = config or NASConfig.get_active_config()
+        if config is None or not cls.is_due(config):
+            return 0
+        connection = ConnectionService(config)
+        if not connection.authenticate().get('success'):
+            logger.warning("[LOGS] Could not authenticate for log ingestion")
+            return 0
+        return cls(connection, config).ingest()
+
+    def ingest(self):
+        """Trae los logs nuevos (y un tramo de historial). Retorna las entradas añadidas."""
+        if getattr(settings, 'NAS_OFFLINE_MODE', False):
+            return 0
+        added = sum(self._ingest_type(log_type) for log_type in self.log_types())
+        if cache.add(f"{self.KEY_PREFIX}:prune", 1, timeout=3600):
+            self.prune()
+        return added
+
+    def _ingest_type(self, log_type):
+        cursor, _ = NASLogCursor.objects.get_or_create(nas=self.config, log_type=log_type)
+        first_run = cursor.newest_at is None
+
+        # Cabeza: de lo más nuevo hacia atrás hasta llegar a newest_at
+        added, offset, newest, reached = 0, 0, None, False
+        for _ in range(1 if first_run else self.MAX_HEAD_PAGES):
+            items = self._fetch(log_type, offset)
+            if items is None:
+                return added
+            entries = [self._to_entry(item, log_type) for item in items]
+            if newest is None and entries:
+                newest = entries[0].logged_at
+            fresh = [e for e in entries if first_run or e.logged_at >= cursor.newest_at]
+            added += self._store(fresh)
+            offset += len(items)
+            if len(fresh) < len(entries) or len(items) < self.PAGE:
+                reached = True
+                break
+        if not reached and not first_run:
+            logger.warning(f"[LOGS] More than {self.MAX_HEAD_PAGES * self.PAGE} new {log_type} logs since last ingestion; some were skipped")
+
+        if newest is not None:
+            cursor.newest_at = max(newest, cursor.newest_at) if cursor.newest_at else newest
+        if first_run:
+            cursor.backfill_offset = None if reached else offset
+        elif cursor.backfill_offset is not None:
+            # Las entradas nuevas desplazan hacia abajo las antiguas pendientes
+            cursor.backfill_offset += added
+
+        # Historial antiguo por tramos
+        cutoff = timezone.now() - timedelta(days=self.retention_days())
+        for _ in range(self.BACKFILL_PAGES):
+            if cursor.backfill_offset is None:
+                break
+            items = self._fetch(log_type, cursor.backfill_offset)
+            if items is None:
+                break
+            entries = [self._to_entry(item, log_type) for item in items]
+            added += self._store([e for e in entries if e.logged_at >= cutoff])
+            cursor.backfill_offset += len(items)
+            if len(items) < self.PAGE or (entries and entries[-1].logged_at < cutoff) or cursor.backfill_offset >= self.backfill_max():
+                cursor.backfill_offset = None
+
+        cursor.save()
+        if added:
+            logger.info(f"[LOGS] Ingested {added} {log_type} log entries from {self.config}")
+        return added
+
+    def _fetch(self, log_type, offset):
+        try:
+            response = self.connection.request(
+                api='SYNO.Core.SyslogClient.Log',
+                method='list',
+                version=1,
+                params={'limit': self.PAGE, 'offset': offset, 'log_type': log_type}
+            )
+        except Exception:
+            logger.exception(f"[LOGS] Error fetching {log_type} logs at offset {offset}")
+            return None
+        if not response.get('success'):
+            return None
+        return response.get('data', {}).get('items', [])
+
+    def _to_entry(self, item, log_type):
+        raw_time = str(item.get('time', ''))
+        user = item.get('user', 'system') or 'system'
+        level = (item.get('level', 'info') or 'info').lower()
+        message = item.get('ldata', item.get('msg', '')) or ''
+        fingerprint = hashlib.sha1(f"{log_type}|{raw_time}|{user}|{level}|{message}".encode('utf-8')).hexdigest()
+        return NASLogEntry(
+            nas=self.config,
+            log_type=log_type,
+            logged_at=self._parse_time(raw_time),
+            user=user[:150],
+            level=level[:16],
+            message=message,
+            fingerprint=fingerprint,
+        )
+
+    def _store(self, entries):
+        """Inserta las entradas que no existan. Retorna cuántas eran nuevas."""
+        if not entries:
+            return 0
+        unique = {e.fingerprint: e for e in entries}
+        existing = set(NASLogEntry.objects.filter(
+            nas=self.config, fingerprint__in=list(unique)
+        ).values_list('fingerprint', flat=True))
+        new = [e for fp, e in unique.items() if fp not in existing]
+        # ignore_conflicts: otro proceso pudo insertar la misma entrada entre tanto
+        NASLogEntry.objects.bulk_create(new, ignore_conflicts=True)
+        return len(new)
+
+    @classmethod
+    def _parse_time(cls, value):
+        if str(value).isdigit():
+            return datetime.fromtimestamp(int(value), tz=timezone.get_current_timezone())
+        for fmt in cls.TIME_FORMATS:
+            try:
+                return timezone.make_aware(datetime.strptime(value, fmt))
+            except ValueError:
+                continue
+        return timezone.now()
+
+    def prune(self):
+        cutoff = timezone.now() - timedelta(days=self.retention_days())
+        deleted = NASLogEntry.objects.filter(logged_at__lt=cutoff).delete()[0]
+        if deleted:
+            logger.info(f"[LOGS] Pruned {deleted} expired log entries")
+        return deleted
+
+    # --- Consultas (locales) ---
+    @classmethod
+    def fts_available(cls):
+        return cls.FTS.available()
+
+    @classmethod
+    def search(cls, query='', level=None, nas=None):
+        """QuerySet de logs del NAS, más nuevos primero, filtrado por texto y nivel."""
+        queryset = NASLogEntry.objects.filter(nas=nas)
+        if level:
+            queryset = queryset.filter(level=level)
+        q = (query or '').strip()
+        if q:
+            if len(q) >= 3 and cls.fts_available():
+                queryset = queryset.filter(pk__in=cls.FTS.match(q))
+            else:
+                queryset = queryset.filter(message__icontains=q)
+        return queryset
+
+    @classmethod
+    def recent(cls, limit=10, nas=None):
+        """Últimos logs con el formato del card de actividad."""
+        return [
+            {
+                'time': timezone.localtime(e.logged_at).strftime('%Y-%m-%d %H:%M:%S'),
+                'user': e.user,
+                'level': e.level,
+                'msg': e.message,
+            }
+            for e in NASLogEntry.objects.filter(nas=nas)[:limit]
+        ]
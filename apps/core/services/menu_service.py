@@ -30,6 +30,11 @@ class MenuService:
         except:
             users_url = '#'
 
+        try:
+            quotas_url = reverse('usuarios:quotas')
+        except:
+            quotas_url = '#'
+
         try:
             group_url = reverse('groups:list')
         except:
@@ -60,6 +65,20 @@ class MenuService:
             'active': current_path == dashboard_url
         })
         
+        # Flota: solo cuando hay más de un NAS activo
+        try:
+            from apps.settings.models import NASConfig
+            if NASConfig.get_active_configs().count() > 1:
+                fleet_url = reverse('core:fleet')
+                menu.append({
+                    'name': 'Flota NAS',
+                    'icon': 'server',
+                    'url': fleet_url,
+                    'active': current_path == fleet_url
+                })
+        except Exception:
+            pass
+        
         # Sección de Sistema
         menu.append({'separator': True, 'label': 'SISTEMA'})
         
@@ -77,7 +96,13 @@ class MenuService:
             'name': 'Usuarios',
             'icon': 'users', 
             'url': users_url,
-            'active': current_path.startswith('/usuarios/')
+            'active': current_path.startswith('/usuarios/') and not current_path.startswith(quotas_url)
+        })
+        menu.append({
+            'name': 'Cuotas',
+            'icon': 'chart-pie',
+            'url': quotas_url,
+            'active': current_path.startswith(quotas_url)
         })
         menu.append({
             'name': 'Grupos',
@@ -91,6 +116,16 @@ class MenuService:
             'url': audit_url,
             'active': current_path.startswith('/auditoria/')
         })
+        try:
+            nas_logs_url = reverse('core:nas_logs')
+        except Exception:
+            nas_logs_url = '#'
+        menu.append({
+            'name': 'Logs del NAS',
+            'icon': 'stream',
+            'url': nas_logs_url,
+            'active': current_path.startswith('/logs/')
+        })
         menu.append({
             'name': 'Carpetas Compartidas',
             'icon': 'folder',
@@ -0,0 +1,304 @@
+import logging
+import threading
+import time
+from concurrent.futures import wait
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .background_service import BackgroundService
+from .connection_monitor import ConnectionMonitor
+from .log_service import LogService
+from .metrics_history import MetricsHistory
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsCollector:
+    """
+    Recolector de métricas del dashboard en segundo plano.
+
+    Las vistas ya no consultan al NAS: leen una instantánea compartida en la
+    caché. Un hilo por proceso muestrea cada familia de métricas con su propio
+    intervalo (utilización cada pocos segundos, almacenamiento y salud cada
+    minuto, logs de forma incremental vía LogService y conexiones por
+    diferencias vía ConnectionMonitor).
+
+    - El coste para el NAS es constante: cada muestreo toma antes una marca
+      'due' con cache.add() que dura el intervalo de la familia. Con varios
+      workers sobre una caché compartida solo uno muestrea cada vez.
+    - Sin dashboards abiertos no se consulta al NAS: el hilo termina tras
+      IDLE_TIMEOUT segundos sin lecturas y se relanza en la siguiente.
+    - Una sola sesión (login) para todo el proceso; se renueva si falla el
+      login o tras SESSION_MAX_AGE segundos.
+    - Cada muestra numérica se registra además en MetricsHistory.
+    - El dashboard no espera al NAS: la página se pinta con peek() y cada
+      sección llega después por section(), que espera como mucho
+      DASHBOARD_SECTION_TIMEOUT y si no cae al último valor conocido.
+    """
+
+    KEY_PREFIX = 'core:metrics'
+    LAST_READ_KEY = f'{KEY_PREFIX}:last_read'
+    TICK = 1
+    SESSION_MAX_AGE = 15 * 60
+    ACTIVITY_LIMIT = 10
+
+    # Familia -> (método de MetricsService, grupo de intervalo)
+    FAMILIES = {
+        'utilization': ('_get_utilization', 'fast'),
+        'system_info': ('_get_system_info', 'slow'),
+        'storage': ('_get_storage_metrics', 'slow'),
+        'health': ('_get_health_status', 'slow'),
+        'recent_files': ('_get_recent_files', 'slow'),
+        'connections': (None, 'medium'),
+        'activity': (None, 'medium'),
+    }
+
+    # Secciones del dashboard que se renderizan en servidor -> familias que usan
+    SECTIONS = {
+        'storage': ('storage',),
+        'health': ('health',),
+        'recent_files': ('recent_files',),
+    }
+
+    _lock = threading.RLock()
+    _thread = None
+    # Propio de la sesión: el login puede tardar y _lock lo toman las vistas
+    _service_lock = threading.Lock()
+    _service = None
+    _service_created_at = 0
+
+    # --- Configuración ---
+    @staticmethod
+    def intervals():
+        return {
+            'fast': getattr(settings, 'METRICS_UTILIZATION_INTERVAL', 5),
+            'medium': getattr(settings, 'METRICS_ACTIVITY_INTERVAL', 15),
+            'slow': getattr(settings, 'METRICS_STATUS_INTERVAL', 60),
+        }
+
+    @staticmethod
+    def idle_timeout():
+        return getattr(settings, 'METRICS_IDLE_TIMEOUT', 120)
+
+    @staticmethod
+    def section_timeout():
+        return getattr(settings, 'DASHBOARD_SECTION_TIMEOUT', 3)
+
+    @classmethod
+    def interval(cls, family):
+        return cls.intervals()[cls.FAMILIES[family][1]]
+
+    # --- Claves ---
+    @classmethod
+    def _data_key(cls, family):
+        return f"{cls.KEY_PREFIX}:data:{family}"
+
+    @classmethod
+    def _due_key(cls, family):
+        return f"{cls.KEY_PREFIX}:due:{family}"
+
+    @classmethod
+    def _last_key(cls, family):
+        return f"{cls.KEY_PREFIX}:last:{family}"
+
+    # --- API pública ---
+    @classmethod
+    def snapshot(cls):
+        """
+        Métricas del dashboard con el formato de MetricsService.get_dashboard_metrics(),
+        más 'updated_at' (epoch del muestreo más viejo).
+        Las familias aún no muestreadas se obtienen en línea la primera vez.
+        """
+        if getattr(settings, 'NAS_OFFLINE_MODE', False):
+            return MetricsService().get_dashboard_metrics()
+
+        return cls._compose(cls.entries())
+
+    @classmethod
+    def peek(cls):
+        """
+        Como snapshot() pero sin muestrear en línea: lo que haya en la
+        instantánea y valores vacíos para el resto. Nunca espera al NAS.
+        Incluye 'pending_sections': secciones (SECTIONS) a las que aún les
+        faltan datos y que el dashboard pedirá aparte con section().
+        """
+        if getattr(settings, 'NAS_OFFLINE_MODE', False):
+            return {**MetricsService().get_dashboard_metrics(), 'pending_sections': []}
+
+        entries = cls.entries(sample_missing=False)
+        pending = [
+            name for name, families in cls.SECTIONS.items()
+            if any(entries[family] is None for family in families)
+        ]
+        return {**cls._compose(entries), 'pending_sections': pending}
+
+    @classmethod
+    def section(cls, name, timeout=None):
+        """
+        Datos de una sección del dashboard: ({familia: data}, stale).
+        Las familias sin datos se muestrean en segundo plano esperando como
+        mucho `timeout` segundos. Si no llegan a tiempo se usa el último valor
+        conocido (stale=True) o el vacío; el muestreo sigue y la próxima
+        petición ya lo encuentra en la instantánea.
+        """
+        families = cls.SECTIONS[name]
+        if getattr(settings, 'NAS_OFFLINE_MODE', False):
+            metrics = MetricsService().get_dashboard_metrics()
+            return {family: metrics[family] for family in families}, False
+
+        timeout = cls.section_timeout() if timeout is None else timeout
+        entries = cls.entries(sample_missing=False)
+        pending = {
+            family: BackgroundService.submit(f"{cls.KEY_PREFIX}:collect:{family}", cls.collect, family)
+            for family in families if entries[family] is None
+        }
+        if pending:
+            wait(pending.values(), timeout=timeout)
+
+        empty = MetricsService._get_empty_metrics()
+        data, stale = {}, False
+        for family in families:
+            entry = entries[family]
+            future = pending.get(family)
+            if future is not None and future.done():
+                entry = future.result()
+            if entry is None:
+                entry = cache.get(cls._last_key(family))
+                stale = True
+            data[family] = entry['data'] if entry is not None else empty[family]
+        return data, stale
+
+    @classmethod
+    def entries(cls, sample_missing=True):
+        """
+        Entradas {familia: {'data', 'updated_at'} | None} de la instantánea.
+        Cuenta como lectura (mantiene vivo el recolector). Con sample_missing,
+        las familias sin datos se muestrean en línea.
+        """
+        cache.set(cls.LAST_READ_KEY, time.time(), timeout=None)
+        cls.ensure_collector()
+
+        entries = {}
+        for family in cls.FAMILIES:
+            entry = cache.get(cls._data_key(family))
+            if entry is None and sample_missing:
+                entry = cls.collect(family)
+            entries[family] = entry
+        return entries
+
+    @classmethod
+    def collect(cls, family, force=False):
+        """
+        Muestrea una familia si le toca (o con force) y guarda el resultado.
+        Retorna la entrada {'data', 'updated_at'} vigente, o None si otro
+        worker la está muestreando y aún no hay datos.
+        """
+        interval = cls.interval(family)
+        if not cache.add(cls._due_key(family), 1, timeout=interval) and not force:
+            return cache.get(cls._data_key(family))
+
+        service = cls._get_service()
+        if service is None or not service.connected:
+            return cache.get(cls._data_key(family))
+
+        method, _ = cls.FAMILIES[family]
+        try:
+            if family == 'activity':
+                data = cls._sample_activity(service)
+            elif family == 'connections':
+                data = ConnectionMonitor(service.connection, service.config).sample()
+            else:
+                data = getattr(service, method)()
+        except Exception:
+            logger.exception(f"[METRICS] Sampling of {family} failed")
+            return cache.get(cls._data_key(family))
+        if data is None:
+            return cache.get(cls._data_key(family))
+
+        entry = {'data': data, 'updated_at': time.time()}
+        # La instantánea sobrevive a algunos ciclos perdidos, pero no indefinidamente
+        cache.set(cls._data_key(family), entry, timeout=max(interval * 5, 60))
+        # Último valor conocido, sin caducidad: respaldo de section() si el NAS tarda
+        cache.set(cls._last_key(family), entry, timeout=None)
+        MetricsHistory.record(MetricsHistory.values_from(family, data), ts=entry['updated_at'])
+        return entry
+
+    # --- Hilo recolector ---
+    @classmethod
+    def ensure_collector(cls):
+        """Arranca el hilo recolector si no está corriendo (uno por proceso)."""
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._thread = threading.Thread(target=cls._run, name='nas-metrics-collector', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        try:
+            while True:
+                last_read = cache.get(cls.LAST_READ_KEY) or 0
+                with cls._lock:
+                    if time.time() - last_read > cls.idle_timeout():
+                        # Nadie mira el dashboard: el hilo termina hasta la próxima lectura
+                        cls._thread = None
+                        return
+                for family in cls.FAMILIES:
+                    cls.collect(family)
+                time.sleep(cls.TICK)
+        except Exception:
+            logger.exception("Metrics collector crashed")
+            with cls._lock:
+                cls._thread = None
+        finally:
+            close_old_connections()
+
+    # --- Internos ---
+    @classmethod
+    def _get_service(cls):
+        """
+        MetricsService compartido; se vuelve a autenticar si falló o caducó.
+        El login ocurre bajo _service_lock (solo lo esperan los muestreos),
+        nunca bajo _lock, que toman peek()/section()/snapshot().
+        """
+        with cls._service_lock:
+            expired = time.time() - cls._service_created_at > cls.SESSION_MAX_AGE
+            if cls._service is None or not cls._service.connected or expired:
+                cls._service = MetricsService()
+                cls._service_created_at = time.time()
+                if not cls._service.connected:
+                    logger.warning("[METRICS] Collector could not connect to NAS")
+            return cls._service
+
+    @classmethod
+    def _sample_activity(cls, service):
+        """
+        Ingiere los logs nuevos del NAS (cursor incremental de LogService) y
+        devuelve los últimos desde la tabla local.
+        """
+        LogService(service.connection, service.config).ingest_if_due()
+        return LogService.recent(limit=cls.ACTIVITY_LIMIT, nas=service.config)
+
+    @classmethod
+    def _compose(cls, entries):
+        empty = MetricsService._get_empty_metrics()
+
+        def data(family, default):
+            entry = entries.get(family)
+            return entry['data'] if entry is not None else default
+
+        system = {**empty['system']}
+        system.update(data('utilization', {}))
+        system.update(data('system_info', {}))
+        updated = [e['updated_at'] for e in entries.values() if e is not None]
+        return {
+            'storage': data('storage', empty['storage']),
+            'system': system,
+            'health': data('health', empty['health']),
+            'connections': data('connections', empty['connections']),
+            'recent_files': data('recent_files', empty['recent_files']),
+            'activity': data('activity', empty['activity']),
+            'updated_at': min(updated) if updated else None,
+        }
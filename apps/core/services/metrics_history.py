@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+
+from apps.core.models import MetricRollup
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsHistory:
+    """
+    Historial de métricas de utilización del NAS (CPU, RAM, red, temperatura,
+    uso por volumen).
+
+    - Última hora a resolución completa en buffers circulares en memoria
+      (uno por serie, recortados por tiempo).
+    - Agregados en SQLite (MetricRollup) a 1 min, 15 min y 1 h, con retención
+      propia. Se guarda count/suma/mín/máx: un punto por serie y minuto, así
+      meses de datos ocupan poco.
+    - El minuto en curso se acumula en memoria y se escribe al cerrarse; en
+      ese momento se recalculan los buckets de 15 min y 1 h que lo contienen
+      a partir del nivel inferior (pocas filas por consulta).
+    - Los buffers son por proceso: un worker que no muestrea responde la
+      última hora desde los agregados de 1 min.
+
+    Lo alimenta MetricsCollector; query() devuelve arrays columnares para gráficos.
+    """
+
+    RAW_WINDOW = 3600
+    RESOLUTIONS = (60, 900, 3600)
+    MAX_POINTS = 500
+    PRUNE_EVERY = 3600
+
+    _lock = threading.RLock()
+    _rings = {}
+    _pending = {}
+    _last_prune = 0
+
+    # --- Configuración ---
+    @staticmethod
+    def retention(resolution):
+        """Segundos que se conservan los agregados de cada resolución."""
+        days = {
+            60: getattr(settings, 'METRICS_HISTORY_RETENTION_1M', 2),
+            900: getattr(settings, 'METRICS_HISTORY_RETENTION_15M', 60),
+            3600: getattr(settings, 'METRICS_HISTORY_RETENTION_1H', 730),
+        }[resolution]
+        return days * 86400
+
+    # --- Escritura ---
+    @classmethod
+    def record(cls, values, ts=None):
+        """Registra una muestra {serie: valor} tomada en ts (epoch, por defecto ahora)."""
+        ts = ts or time.time()
+        minute = int(ts // 60 * 60)
+        closed = {}
+        with cls._lock:
+            for series, value in values.items():
+                if value is None:
+                    continue
+                value = float(value)
+                ring = cls._rings.setdefault(series, deque())
+                ring.append((ts, value))
+                while ring and ring[0][0] < ts - cls.RAW_WINDOW:
+                    ring.popleft()
+
+                pending = cls._pending.get(series)
+                if pending is not None and pending['bucket'] != minute:
+                    closed[series] = cls._pending.pop(series)
+                    pending = None
+                if pending is None:
+                    pending = cls._pending[series] = {'bucket': minute, 'count': 0, 'total': 0.0, 'min': value, 'max': value}
+                pending['count'] += 1
+                pending['total'] += value
+                pending['min'] = min(pending['min'], value)
+                pending['max'] = max(pending['max'], value)
+
+        if closed:
+            cls._flush(closed)
+        if time.time() - cls._last_prune > cls.PRUNE_EVERY:
+            cls.prune()
+
+    @classmethod
+    def flush(cls):
+        """Escribe también los minutos aún abiertos (ej. al apagar)."""
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+        if pending:
+            cls._flush(pending)
+
+    @classmethod
+    def _flush(cls, buckets):
+        try:
+            with transaction.atomic():
+                for series, b in buckets.items():
+                    cls._merge(series, b)
+                    # Recalcular los niveles superiores que contienen este minuto
+                    source = 60
+                    for resolution in cls.RESOLUTIONS[1:]:
+                        cls._rollup(series, source, resolution, b['bucket'] // resolution * resolution)
+                        source = resolution
+        except Exception:
+            logger.exception("[METRICS] Failed to persist metric rollups")
+
+    @staticmethod
+    def _merge(series, b):
+        """Suma el minuto a la fila existente (otro proceso pudo muestrear en el mismo minuto)."""
+        row, created = MetricRollup.objects.select_for_update().get_or_create(
+            series=series, resolution=60, bucket=b['bucket'],
+            defaults={'count': b['count'], 'total': b['total'], 'min': b['min'], 'max': b['max']}
+        )
+        if not created:
+            row.count += b['count']
+            row.total += b['total']
+            row.min = min(row.min, b['min'])
+            row.max = max(row.max, b['max'])
+            row.save(update_fields=['count', 'total', 'min', 'max'])
+
+    @staticmethod
+    def _rollup(series, source, resolution, bucket):
+        agg = MetricRollup.objects.filter(
+            series=series, resolution=source, bucket__gte=bucket, bucket__lt=bucket + resolution
+        ).aggregate(count=Sum('count'), total=Sum('total'), min=Min('min'), max=Max('max'))
+        if not agg['count']:
+            return
+        MetricRollup.objects.update_or_create(series=series, resolution=resolution, bucket=bucket, defaults=agg)
+
+    @classmethod
+    def prune(cls, now=None):
+        """Elimina agregados fuera de su retención."""
+        now = now or time.time()
+        cls._last_prune = now
+        deleted = 0
+        for resolution in cls.RESOLUTIONS:
+            deleted += MetricRollup.objects.filter(
+                resolution=resolution, bucket__lt=now - cls.retention(resolution)
+            ).delete()[0]
+        if deleted:
+            logger.info(f"[METRICS] Pruned {deleted} expired rollups")
+        return deleted
+
+    # --- Lectura ---
+    @classmethod
+    def series_names(cls):
+        with cls._lock:
+            names = set(cls._rings)
+        names.update(MetricRollup.objects.filter(resolution=3600).values_list('series', flat=True).distinct())
+        return sorted(names)
+
+    @classmethod
+    def query(cls, series, start, end=None, resolution=None):
+        """
+        Datos de las series entre start y end (epoch).
+        resolution: 0 (crudo), 60, 900 o 3600; por defecto la más fina que
+        quepa en MAX_POINTS y siga retenida en start.
+        Retorna {'resolution', 'timestamps': [...], 'series': {nombre: {'avg', 'min', 'max'}}}
+        con listas alineadas a timestamps (None donde falta el dato). En crudo
+        min y max coinciden con avg y se omiten.
+        """
+        end = end or time.time()
+        if resolution is None:
+            resolution = cls._pick_resolution(start, end)
+
+        if resolution == 0:
+            data = cls._query_raw(series, start, end)
+            if data['timestamps'] or start < end - cls.RAW_WINDOW:
+                return data
+            # Este proceso no muestrea: la última hora sale de los agregados
+            resolution = 60
+        return cls._query_rollups(series, start, end, resolution)
+
+    @classmethod
+    def _pick_resolution(cls, start, end):
+        now = time.time()
+        if start >= now - cls.RAW_WINDOW:
+            return 0
+        for resolution in cls.RESOLUTIONS:
+            if (end - start) / resolution <= cls.MAX_POINTS and start >= now - cls.retention(resolution):
+                return resolution
+        return cls.RESOLUTIONS[-1]
+
+    @classmethod
+    def _query_raw(cls, series, start, end):
+        with cls._lock:
+            points = {name: [(ts, v) for ts, v in cls._rings.get(name, ()) if start <= ts <= end] for name in series}
+        timestamps = sorted({ts for pts in points.values() for ts, _ in pts})
+        index = {ts: i for i, ts in enumerate(timestamps)}
+        columns = {}
+        for name, pts in points.items():
+            avg = [None] * len(timestamps)
+            for ts, v in pts:
+                avg[index[ts]] = v
+            columns[name] = {'avg': avg}
+        return {'resolution': 0, 'timestamps': [round(ts, 3) for ts in timestamps], 'series': columns}
+
+    @classmethod
+    def _query_rollups(cls, series, start, end, resolution):
+        rows = MetricRollup.objects.filter(
+            series__in=series, resolution=resolution,
+            bucket__gte=start // resolution * resolution, bucket__lte=end
+        ).order_by('bucket').values_list('series', 'bucket', 'count', 'total', 'min', 'max')
+        rows = list(rows)
+        timestamps = sorted({r[1] for r in rows})
+        index = {b: i for i, b in enumerate(timestamps)}
+        columns = {name: {k: [None] * len(timestamps) for k in ('avg', 'min', 'max')} for name in series}
+        for name, bucket, count, total, lo, hi in rows:
+            i = index[bucket]
+            col = columns[name]
+            col['avg'][i] = round(total / count, 3) if count else None
+            col['min'][i] = lo
+            col['max'][i] = hi
+        return {'resolution': resolution, 'timestamps': timestamps, 'series': columns}
+
+    # --- Extracción desde las familias del recolector ---
+    @staticmethod
+    def values_from(family, data):
+        """Series numéricas de una muestra de MetricsCollector ({} si la familia no aporta)."""
+        if family == 'utilization':
+            network = data.get('network', {})
+            return {
+                'cpu': data.get('cpu_usage'),
+                'memory': data.get('memory_usage'),
+                'net_tx': network.get('up_raw'),
+                'net_rx': network.get('down_raw'),
+            }
+        if family == 'system_info':
+            return {'temperature': data.get('temperature')}
+        if family == 'connections':
+            return {'connections': data.get('total')}
+        if family == 'storage' and 'volumes' in data:
+            values = {'storage': data.get('percent_used')}
+            for vol in data.get('volumes', []):
+                values[f"volume:{vol.get('name')}"] = vol.get('percent')
+                # Bytes para la previsión de capacidad (CapacityForecast)
+                values[f"volume_used:{vol.get('name')}"] = vol.get('used_bytes')
+                values[f"volume_total:{vol.get('name')}"] = vol.get('total_bytes')
+            for share in data.get('shares', []):
+                values[f"share_used:{share.get('name')}"] = share.get('used_bytes')
+            return values
+        return {}
@@ -1,6 +1,10 @@
+import heapq
 import logging
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.conf import settings
+from django.core.cache import cache
 from apps.settings.services.connection_service import ConnectionService
 from apps.settings.models import NASConfig
 
@@ -10,9 +14,14 @@ class MetricsService:
     """
     Servicio para obtener métricas REALES del sistema NAS.
     """
+
+    # Archivos recientes: listados concurrentes por share (ver _get_recent_files)
+    RECENT_CONCURRENCY = 4
+    RECENT_MAX_SHARES = 20
+    RECENT_DIRS_PER_LEVEL = 5
     
-    def __init__(self):
-        self.config = NASConfig.get_active_config()
+    def __init__(self, config=None):
+        self.config = config or NASConfig.get_active_config()
         # En modo offline, no necesitamos autenticar
         if getattr(settings, 'NAS_OFFLINE_MODE', False):
             self.connected = True
@@ -21,8 +30,10 @@ class MetricsService:
         # Intentamos conectar, si falla, métodos devolverán estado vacío/error graceful
         try:
             self.connection = ConnectionService(self.config)
-            self.connection.authenticate()
-            self.connected = True
+            auth = self.connection.authenticate()
+            self.connected = bool(auth.get('success'))
+            if not self.connected:
+                logger.warning(f"MetricsService login failed: {auth.get('message')}")
         except Exception as e:
             logger.error(f"MetricsService failed to connect: {e}")
             self.connected = False
@@ -85,7 +96,8 @@ class MetricsService:
             ]
         }
 
-    def _get_empty_metrics(self, msg=""):
+    @staticmethod
+    def _get_empty_metrics(msg=""):
         return {
             'storage': {'total': 'N/A', 'used': 'N/A', 'percent_used': 0, 'volumes': []},
             'system': {
@@ -132,6 +144,8 @@ class MetricsService:
                             'name': vol.get('name', 'Volume'),
                             'total': self._format_bytes(t),
                             'used': self._format_bytes(u),
+                            'total_bytes': t,
+                            'used_bytes': u,
                             'percent': pct
                         })
                     except:
@@ -140,11 +154,14 @@ class MetricsService:
                 global_pct = round((used_bytes / total_bytes * 100), 1) if total_bytes > 0 else 0
                 
                 return {
+                    'total_bytes': total_bytes,
+                    'used_bytes': used_bytes,
                     'total': self._format_bytes(total_bytes),
                     'used': self._format_bytes(used_bytes),
                     'available': self._format_bytes(total_bytes - used_bytes),
                     'percent_used': global_pct,
-                    'volumes': volumes_data
+                    'volumes': volumes_data,
+                    'shares': self._get_share_usage()
                 }
                 
             return {'total': '0', 'used': '0', 'percent_used': 0}
@@ -157,16 +174,21 @@ class MetricsService:
         """
         Obtiene métricas vía SYNO.Core.System o Utilization
         """
+        metrics = self._get_utilization()
+        metrics.update(self._get_system_info())
+        return metrics
+
+    def _get_utilization(self):
+        """
+        CPU, RAM y red vía SYNO.Core.System.Utilization (cambia cada pocos segundos).
+        """
         metrics = {
             'cpu_usage': 0,
             'memory_usage': 0,
-            'uptime_days': 0,
-            'temperature': 0,
             'network': {'upload': '0 KB/s', 'download': '0 KB/s', 'up_raw': 0, 'down_raw': 0}
         }
-        
+
         try:
-            # 1. Utilización (CPU, RAM, Network)
             util_resp = self.connection.request('SYNO.Core.System.Utilization', 'get', version=1)
             if util_resp.get('success'):
                 data = util_resp.get('data', {})
@@ -188,8 +210,17 @@ class MetricsService:
                     metrics['network']['down_raw'] = rx_total
                     metrics['network']['upload'] = self._format_speed(tx_total)
                     metrics['network']['download'] = self._format_speed(rx_total)
+        except Exception as e:
+            logger.error(f"Error fetching utilization metrics: {e}")
+
+        return metrics
 
-            # 2. System Status (Uptime, Temp)
+    def _get_system_info(self):
+        """
+        Uptime y temperatura vía SYNO.Core.System info (cambia lentamente).
+        """
+        metrics = {'uptime_days': 0, 'temperature': 0}
+        try:
             info_resp = self.connection.request('SYNO.Core.System', 'info', version=1)
             if info_resp.get('success'):
                 d = info_resp.get('data', {})
@@ -201,7 +232,7 @@ class MetricsService:
                     metrics['temperature'] = d['thermal'][0].get('temperature', 0)
             
         except Exception as e:
-            logger.error(f"Error fetching system metrics: {e}")
+            logger.error(f"Error fetching system info: {e}")
             
         return metrics
 
@@ -228,6 +259,28 @@ class MetricsService:
             logger.error(f"Error fetching health status: {e}")
         return {'status': 'Error', 'is_ok': False}
 
+    def _get_share_usage(self):
+        """
+        Espacio usado por carpeta compartida (share_quota_used, en MB) vía
+        SYNO.Core.Share. Lista de {'name', 'used_bytes'}; vacía si el NAS no lo informa.
+        """
+        try:
+            resp = self.connection.request(
+                api='SYNO.Core.Share',
+                method='list',
+                version=1,
+                params={'additional': json.dumps(['share_quota_used'])}
+            )
+            if resp.get('success'):
+                return [
+                    {'name': s.get('name'), 'used_bytes': int(float(s['share_quota_used']) * 1024 * 1024)}
+                    for s in resp.get('data', {}).get('shares', [])
+                    if s.get('name') and s.get('share_quota_used') is not None
+                ]
+        except Exception as e:
+            logger.error(f"Error fetching share usage: {e}")
+        return []
+
     def _get_active_connections(self):
         """
         Obtiene número de conexiones activas vía SYNO.Core.CurrentConnection
@@ -283,63 +336,115 @@ class MetricsService:
 
     def _get_recent_files(self, limit=5):
         """
-        Obtiene archivos recientes vía SYNO.FileStation.List
-        Nota: Esta API requiere un folder_path. Para el dashboard global, 
-        podríamos iterar sobre shares principales o usar SYNO.FileStation.Search (más lento).
-        Estrategia: Listar el contenido de '/' (shares) y traer los más recientes.
+        Archivos modificados más recientemente en todas las shares (o en
+        DASHBOARD_RECENT_SHARES).
+
+        - Cada share se lista en paralelo con sort_by=mtime y un límite pequeño
+          (cada hilo con su propia conexión vía fork()).
+        - Opcionalmente se baja DASHBOARD_RECENT_DEPTH niveles, solo por las
+          RECENT_DIRS_PER_LEVEL subcarpetas más recientes de cada nivel, y sin
+          pasar de DASHBOARD_RECENT_BUDGET segundos en total.
+        - Los resultados se combinan con un top-k (heapq) y se cachean
+          DASHBOARD_RECENT_TTL segundos.
+        Llamadas al NAS acotadas: 1 + shares + profundidad * RECENT_DIRS_PER_LEVEL.
         """
+        key = f"core:recent_files:{getattr(self.config, 'pk', None)}:{limit}"
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            # Primero listamos los shares
             resp = self.connection.request(
                 api='SYNO.FileStation.List',
                 method='list_share',
                 version=2,
-                params={'additional': json.dumps(['time', 'size'])}
+                params={'additional': json.dumps(['time'])}
             )
-            
-            if resp.get('success'):
-                shares = resp.get('data', {}).get('shares', [])
-                # Para simplificar y no hacer N peticiones, mostramos los shares como "directorios recientes"
-                # o si quisiéramos archivos reales, tendríamos que entrar en cada uno.
-                # Como compromiso: mostramos los últimos 5 archivos de la carpeta compartida principal o home.
-                
-                # Intentamos listar el primer share disponible como ejemplo de "Archivos recientes"
-                if shares:
-                    main_share = shares[0].get('path')
-                    f_resp = self.connection.request(
-                        api='SYNO.FileStation.List',
-                        method='list',
-                        version=2,
-                        params={
-                            'folder_path': main_share,
-                            'limit': limit,
-                            'sort_by': 'mtime',
-                            'sort_direction': 'desc',
-                            'additional': json.dumps(['time', 'size'])
-                        }
-                    )
-                    
-                    if f_resp.get('success'):
-                        files = f_resp.get('data', {}).get('files', [])
-                        formatted_files = []
-                        for f in files:
-                            name = f.get('name')
-                            ext = name.split('.')[-1].lower() if '.' in name else 'folder'
-                            formatted_files.append({
-                                'name': name,
-                                'path': f.get('path'),
-                                'size': self._format_bytes(f.get('additional', {}).get('size', 0)),
-                                'time': f.get('additional', {}).get('time', {}).get('mtime', 'N/A'),
-                                'ext': ext
-                            })
-                        return formatted_files
-                        
+            if not resp.get('success'):
+                return []
+
+            shares = [s.get('path') for s in resp.get('data', {}).get('shares', [])]
+            subset = getattr(settings, 'DASHBOARD_RECENT_SHARES', [])
+            if subset:
+                wanted = {'/' + p.strip('/') for p in subset}
+                shares = [p for p in shares if p in wanted]
+            files = self._collect_recent(shares[:self.RECENT_MAX_SHARES], limit)
         except Exception as e:
             logger.error(f"Error fetching recent files: {e}")
-            
-        return []
+            return []
+
+        formatted_files = []
+        for f in heapq.nlargest(limit, files, key=self._mtime):
+            name = f.get('name')
+            ext = name.split('.')[-1].lower() if '.' in name else 'file'
+            formatted_files.append({
+                'name': name,
+                'path': f.get('path'),
+                'size': self._format_bytes(f.get('additional', {}).get('size', 0)),
+                'time': f.get('additional', {}).get('time', {}).get('mtime', 'N/A'),
+                'ext': ext
+            })
+        cache.set(key, formatted_files, timeout=getattr(settings, 'DASHBOARD_RECENT_TTL', 60))
+        return formatted_files
+
+    def _collect_recent(self, folders, limit):
+        """Archivos candidatos de folders y, por niveles, de sus subcarpetas más recientes."""
+        deadline = time.monotonic() + getattr(settings, 'DASHBOARD_RECENT_BUDGET', 5)
+        max_depth = getattr(settings, 'DASHBOARD_RECENT_DEPTH', 1)
+        # Hasta limit archivos además de las carpetas candidatas a recorrer
+        page = limit + self.RECENT_DIRS_PER_LEVEL
+
+        files = []
+        pool = ThreadPoolExecutor(max_workers=self.RECENT_CONCURRENCY)
+        try:
+            depth = 0
+            while folders:
+                futures = [pool.submit(self._list_recent, self.connection.fork(), path, page) for path in folders]
+                done, pending = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+                for future in pending:
+                    future.cancel()
+
+                subdirs = []
+                for future in done:
+                    entries = future.result()
+                    files.extend(e for e in entries if not e.get('isdir'))
+                    subdirs.extend(e for e in entries if e.get('isdir'))
+
+                depth += 1
+                if depth > max_depth or pending or time.monotonic() >= deadline:
+                    break
+                folders = [d.get('path') for d in heapq.nlargest(self.RECENT_DIRS_PER_LEVEL, subdirs, key=self._mtime)]
+        finally:
+            # Lo que quede en curso (fuera de presupuesto) termina solo
+            pool.shutdown(wait=False, cancel_futures=True)
+        return files
+
+    @staticmethod
+    def _list_recent(connection, folder_path, limit):
+        try:
+            resp = connection.request(
+                api='SYNO.FileStation.List',
+                method='list',
+                version=2,
+                params={
+                    'folder_path': folder_path,
+                    'limit': limit,
+                    'sort_by': 'mtime',
+                    'sort_direction': 'desc',
+                    'additional': json.dumps(['time', 'size'])
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error listing {folder_path} for recent files: {e}")
+            return []
+        return resp.get('data', {}).get('files', []) if resp.get('success') else []
+
+    @staticmethod
+    def _mtime(entry):
+        return entry.get('additional', {}).get('time', {}).get('mtime') or 0
 
-    def _format_bytes(self, size):
+    @staticmethod
+    def _format_bytes(size):
         # Helper simple
         if not isinstance(size, (int, float)):
             try:
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .metrics_collector import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class MetricsStream:
+    """
+    Envío de métricas en vivo por Server-Sent Events (requiere servir con ASGI).
+
+    Todos los clientes leen la instantánea de MetricsCollector: cientos de
+    dashboards abiertos siguen costando un único bucle de muestreo al NAS.
+
+    - Solo se envían los campos que cambiaron respecto a lo último que recibió
+      ese cliente, como {ruta.con.puntos: valor} sobre la estructura de
+      get_dashboard_metrics(); las listas se envían completas.
+    - Cada cliente recibe como mucho un evento cada `interval` segundos
+      (nunca menos de METRICS_STREAM_MIN_INTERVAL).
+    - El id del evento es el vector de versiones (updated_at) de cada familia.
+      Al reconectar, EventSource lo reenvía en Last-Event-ID y solo se
+      reenvían las familias que cambiaron entre tanto.
+    - Las conexiones se cierran tras METRICS_STREAM_MAX_DURATION; el navegador
+      reconecta solo y retoma desde su último id.
+    """
+
+    HEARTBEAT = 15
+    RETRY_MS = 3000
+
+    # Familia -> rama de get_dashboard_metrics() que alimenta
+    PREFIXES = {
+        'utilization': 'system',
+        'system_info': 'system',
+        'storage': 'storage',
+        'health': 'health',
+        'connections': 'connections',
+        'recent_files': 'recent_files',
+        'activity': 'activity',
+    }
+
+    # --- Configuración ---
+    @staticmethod
+    def min_interval():
+        return getattr(settings, 'METRICS_STREAM_MIN_INTERVAL', 2)
+
+    @staticmethod
+    def max_duration():
+        return getattr(settings, 'METRICS_STREAM_MAX_DURATION', 600)
+
+    @classmethod
+    def clamp_interval(cls, value):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = MetricsCollector.interval('utilization')
+        return min(max(value, cls.min_interval()), 60)
+
+    # --- Versiones ---
+    @staticmethod
+    def version(entries):
+        """Vector de versiones: updated_at (ms) de cada familia, en orden fijo."""
+        return '-'.join(
+            str(int(entries[f]['updated_at'] * 1000)) if entries.get(f) else '0'
+            for f in MetricsCollector.FAMILIES
+        )
+
+    @staticmethod
+    def parse_version(value):
+        """{familia: versión} de un Last-Event-ID; {} si no es válido."""
+        parts = (value or '').split('-')
+        if len(parts) != len(MetricsCollector.FAMILIES):
+            return {}
+        return dict(zip(MetricsCollector.FAMILIES, parts))
+
+    # --- Deltas ---
+    @classmethod
+    def flatten(cls, family, data):
+        prefix = cls.PREFIXES[family]
+        if not isinstance(data, dict):
+            return {prefix: data}
+        flat = {}
+
+        def walk(path, value):
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    walk(f"{path}.{k}", v)
+            else:
+                flat[path] = value
+
+        walk(prefix, data)
+        return flat
+
+    @classmethod
+    def resume_state(cls, entries, last_event_id):
+        """
+        Lo que el cliente ya tiene según su Last-Event-ID: las familias cuya
+        versión coincide con la actual. El resto se enviará completo.
+        """
+        known = cls.parse_version(last_event_id)
+        current = cls.parse_version(cls.version(entries))
+        return {
+            family: cls.flatten(family, entries[family]['data'])
+            for family, v in known.items()
+            if v != '0' and v == current[family] and entries.get(family)
+        }
+
+    @classmethod
+    def diff(cls, entries, sent):
+        """
+        Campos que cambiaron respecto a sent ({familia: campos planos}).
+        Retorna (delta, sent actualizado).
+        """
+        delta = {}
+        sent = dict(sent)
+        for family, entry in entries.items():
+            if entry is None:
+                continue
+            flat = cls.flatten(family, entry['data'])
+            previous = sent.get(family, {})
+            delta.update({path: value for path, value in flat.items() if previous.get(path, _MISSING) != value})
+            sent[family] = flat
+        return delta, sent
+
+    # --- Flujo SSE ---
+    @classmethod
+    async def events(cls, last_event_id=None, interval=None):
+        """Generador asíncrono de eventos SSE ya formateados."""
+        interval = cls.clamp_interval(interval)
+        read = sync_to_async(MetricsCollector.entries, thread_sensitive=False)
+
+        yield f"retry: {cls.RETRY_MS}\n\n"
+        entries = await read(sample_missing=False)
+        sent = cls.resume_state(entries, last_event_id) if last_event_id else {}
+        started = last_event = time.monotonic()
+
+        while time.monotonic() - started < cls.max_duration():
+            delta, sent = cls.diff(entries, sent)
+            if delta:
+                payload = json.dumps(delta, separators=(',', ':'), default=str)
+                yield f"id: {cls.version(entries)}\nevent: delta\ndata: {payload}\n\n"
+                last_event = time.monotonic()
+            elif time.monotonic() - last_event >= cls.HEARTBEAT:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                last_event = time.monotonic()
+
+            await asyncio.sleep(interval)
+            entries = await read(sample_missing=False)
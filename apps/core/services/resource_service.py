@@ -17,8 +17,8 @@ class ResourceService:
     Patrón: Service + API (Online) | JSON Mock (Offline)
     """
     
-    def __init__(self):
-        self.config = NASConfig.get_active_config()
+    def __init__(self, config=None):
+        self.config = config or NASConfig.get_active_config()
         self.connection = ConnectionService(self.config)
         # Autenticar automáticamente para tener SID disponible en todas las llamadas
         if not getattr(settings, 'NAS_OFFLINE_MODE', False):
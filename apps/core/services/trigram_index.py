@@ -0,0 +1,85 @@
+import logging
+from django.db import connection as db_connection
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+
+class TrigramIndex:
+    """
+    Índice FTS5 con tokenizador trigram sobre una columna de texto de una tabla.
+
+    - Tabla externa (content=) mantenida por triggers de alta, baja y cambio:
+      búsqueda por subcadena en milisegundos sin duplicar el texto.
+    - Solo SQLite >= 3.34; en otros motores o versiones create() no hace nada,
+      available() retorna False y los servicios caen a LIKE.
+    - Las migraciones llaman a create()/drop(); los servicios a available()/match().
+    """
+
+    def __init__(self, table, column):
+        self.table = table
+        self.column = column
+        self.fts_table = f"{table}_fts"
+        self._available = None
+
+    # --- Esquema (migraciones) ---
+    def create_sql(self):
+        t, c, fts = self.table, self.column, self.fts_table
+        return [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {c}, content='{t}', content_rowid='id', tokenize='trigram'
+            )""",
+            f"""CREATE TRIGGER IF NOT EXISTS {t}_ai AFTER INSERT ON {t} BEGIN
+                INSERT INTO {fts}(rowid, {c}) VALUES (new.id, new.{c});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {t}_ad AFTER DELETE ON {t} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {c}) VALUES ('delete', old.id, old.{c});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {t}_au AFTER UPDATE ON {t} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {c}) VALUES ('delete', old.id, old.{c});
+                INSERT INTO {fts}(rowid, {c}) VALUES (new.id, new.{c});
+            END""",
+        ]
+
+    def drop_sql(self):
+        return [
+            f"DROP TRIGGER IF EXISTS {self.table}_au",
+            f"DROP TRIGGER IF EXISTS {self.table}_ad",
+            f"DROP TRIGGER IF EXISTS {self.table}_ai",
+            f"DROP TABLE IF EXISTS {self.fts_table}",
+        ]
+
+    def create(self, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        try:
+            with schema_editor.connection.cursor() as cursor:
+                for sql in self.create_sql():
+                    cursor.execute(sql)
+        except Exception:
+            # SQLite sin FTS5/trigram: la búsqueda usará LIKE
+            logger.warning(f"[FTS] trigram index {self.fts_table} not available, falling back to LIKE")
+
+    def drop(self, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for sql in self.drop_sql():
+                cursor.execute(sql)
+
+    # --- Consultas ---
+    def available(self):
+        """True si la tabla FTS existe (se comprueba una vez por proceso)."""
+        if self._available is None:
+            self._available = False
+            if db_connection.vendor == 'sqlite':
+                with db_connection.cursor() as cursor:
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=%s", [self.fts_table])
+                    self._available = cursor.fetchone() is not None
+        return self._available
+
+    def match(self, query):
+        """Subconsulta de ids cuyo texto contiene query (mínimo 3 caracteres)."""
+        # Frase entre comillas: el trigram tokenizer hace match por subcadena
+        phrase = '"' + query.replace('"', '""') + '"'
+        return RawSQL(f"SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s", [phrase])
@@ -1,3 +1,555 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from unittest.mock import patch, MagicMock
+from apps.core.models import ConnectionSession, MetricRollup, NASLogEntry, NASLogCursor
+from apps.settings.models import NASConfig
+from apps.core.services.background_service import BackgroundService
+from apps.core.services.capacity_forecast import CapacityForecast
+from apps.core.services.connection_monitor import ConnectionMonitor
+from apps.core.services.fleet_service import FleetService
+from apps.core.services.log_service import LogService
+from apps.core.services.metrics_collector import MetricsCollector
+from apps.core.services.metrics_history import MetricsHistory
+from apps.core.services.metrics_service import MetricsService
+from apps.core.services.metrics_stream import MetricsStream
 
-# Create your tests here.
+
+@override_settings(NAS_OFFLINE_MODE=False, LOG_RETENTION_DAYS=36500)
+@patch.object(MetricsCollector, 'ensure_collector')
+@patch.object(MetricsCollector, '_get_service')
+class MetricsCollectorTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _service(self, mock_get_service):
+        service = MagicMock(connected=True, config=None)
+        service._get_utilization.return_value = {'cpu_usage': 7, 'memory_usage': 30}
+        service._get_system_info.return_value = {'uptime_days': 3, 'temperature': 40}
+        service._get_storage_metrics.return_value = {'total': '1.0 TB', 'used': '0.5 TB', 'percent_used': 50.0, 'volumes': []}
+        service._get_health_status.return_value = {'status': 'health-ok', 'is_ok': True}
+        service.connection.request.return_value = {'success': True, 'data': {'items': []}}
+        service._get_recent_files.return_value = []
+        service._get_recent_activity.return_value = []
+        mock_get_service.return_value = service
+        return service
+
+    def test_snapshot_cost_is_independent_of_readers(self, mock_get_service, mock_ensure):
+        service = self._service(mock_get_service)
+
+        for _ in range(20):
+            metrics = MetricsCollector.snapshot()
+
+        self.assertEqual(metrics['system']['cpu_usage'], 7)
+        self.assertEqual(metrics['system']['uptime_days'], 3)
+        self.assertTrue(metrics['health']['is_ok'])
+        self.assertEqual(service._get_utilization.call_count, 1)
+        self.assertEqual(service._get_storage_metrics.call_count, 1)
+
+    def test_family_sampled_once_per_interval(self, mock_get_service, mock_ensure):
+        service = self._service(mock_get_service)
+
+        MetricsCollector.collect('utilization')
+        MetricsCollector.collect('utilization')
+        self.assertEqual(service._get_utilization.call_count, 1)
+
+        cache.delete(MetricsCollector._due_key('utilization'))
+        MetricsCollector.collect('utilization')
+        self.assertEqual(service._get_utilization.call_count, 2)
+
+    def test_activity_reads_local_log_table(self, mock_get_service, mock_ensure):
+        service = self._service(mock_get_service)
+        service.connection.request.return_value = {'success': True, 'data': {'items': [
+            {'time': '2026/01/01 10:00:00', 'user': 'admin', 'level': 'info', 'ldata': 'login ok'},
+        ]}}
+
+        entry = MetricsCollector.collect('activity')
+
+        self.assertEqual(entry['data'][0]['msg'], 'login ok')
+        service._get_recent_activity.assert_not_called()
+
+
+    def test_peek_never_samples(self, mock_get_service, mock_ensure):
+        service = self._service(mock_get_service)
+
+        metrics = MetricsCollector.peek()
+
+        service._get_storage_metrics.assert_not_called()
+        service._get_utilization.assert_not_called()
+        self.assertEqual(sorted(metrics['pending_sections']), sorted(MetricsCollector.SECTIONS))
+        self.assertEqual(metrics['storage']['volumes'], [])
+
+    def test_section_samples_missing_family(self, mock_get_service, mock_ensure):
+        self._service(mock_get_service)
+
+        def run_now(key, fn, *args, **kwargs):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        with patch.object(BackgroundService, 'submit', side_effect=run_now):
+            data, stale = MetricsCollector.section('storage')
+
+        self.assertFalse(stale)
+        self.assertEqual(data['storage']['percent_used'], 50.0)
+        self.assertNotIn('storage', MetricsCollector.peek()['pending_sections'])
+
+    def test_section_falls_back_to_last_known_value(self, mock_get_service, mock_ensure):
+        self._service(mock_get_service)
+        cache.set(MetricsCollector._last_key('health'), {'data': {'status': 'health-ok', 'is_ok': True}, 'updated_at': 1})
+
+        # El NAS no responde: la tarea de muestreo nunca termina
+        with patch.object(BackgroundService, 'submit', return_value=Future()):
+            data, stale = MetricsCollector.section('health', timeout=0.01)
+            self.assertTrue(stale)
+            self.assertTrue(data['health']['is_ok'])
+
+            cache.clear()
+            data, stale = MetricsCollector.section('health', timeout=0.01)
+            self.assertTrue(stale)
+            self.assertEqual(data['health'], MetricsService._get_empty_metrics()['health'])
+
+
+@override_settings(NAS_OFFLINE_MODE=False)
+@patch('apps.core.services.metrics_service.ConnectionService')
+class MetricsSessionTest(TestCase):
+
+    def setUp(self):
+        MetricsCollector._service = None
+
+    def tearDown(self):
+        MetricsCollector._service = None
+
+    def test_failed_login_is_retried(self, mock_connection):
+        auth = mock_connection.return_value.authenticate
+        auth.return_value = {'success': False, 'message': 'El NAS no responde'}
+        self.assertFalse(MetricsCollector._get_service().connected)
+
+        auth.return_value = {'success': True}
+        self.assertTrue(MetricsCollector._get_service().connected)
+        self.assertEqual(auth.call_count, 2)
+
+    def test_login_does_not_hold_reader_lock(self, mock_connection):
+        acquired = []
+
+        def reader():
+            # peek()/snapshot() toman _lock: no debe estar ocupado durante el login
+            if MetricsCollector._lock.acquire(timeout=1):
+                acquired.append(True)
+                MetricsCollector._lock.release()
+
+        def authenticate():
+            thread = threading.Thread(target=reader)
+            thread.start()
+            thread.join()
+            return {'success': True}
+
+        mock_connection.return_value.authenticate.side_effect = authenticate
+        self.assertTrue(MetricsCollector._get_service().connected)
+        self.assertEqual(acquired, [True])
+
+
+class MetricsHistoryTest(TestCase):
+
+    def setUp(self):
+        MetricsHistory._rings.clear()
+        MetricsHistory._pending.clear()
+        MetricsHistory._last_prune = time.time()
+
+    def test_minutes_are_rolled_up(self):
+        base = 1_800_000_000  # múltiplo de 3600
+        for minute in range(3):
+            for second in (0, 30):
+                MetricsHistory.record({'cpu': minute * 10 + second / 30}, ts=base + minute * 60 + second)
+        MetricsHistory.flush()
+
+        minutes = MetricRollup.objects.filter(series='cpu', resolution=60).order_by('bucket')
+        self.assertEqual([r.avg for r in minutes], [0.5, 10.5, 20.5])
+        quarter = MetricRollup.objects.get(series='cpu', resolution=900)
+        hour = MetricRollup.objects.get(series='cpu', resolution=3600)
+        self.assertEqual((quarter.count, quarter.min, quarter.max), (6, 0, 21))
+        self.assertEqual(hour.total, quarter.total)
+
+    def test_query_returns_aligned_columns(self):
+        now = time.time()
+        MetricsHistory.record({'cpu': 5, 'memory': 40}, ts=now - 10)
+        MetricsHistory.record({'cpu': 7}, ts=now - 5)
+
+        data = MetricsHistory.query(['cpu', 'memory'], now - 60, now)
+
+        self.assertEqual(data['resolution'], 0)
+        self.assertEqual(data['series']['cpu']['avg'], [5.0, 7.0])
+        self.assertEqual(data['series']['memory']['avg'], [40.0, None])
+
+    def test_prune_respects_retention(self):
+        now = 1_800_000_000
+        for resolution in MetricsHistory.RESOLUTIONS:
+            MetricRollup.objects.create(series='cpu', resolution=resolution, bucket=now - 90 * 86400, count=1, total=1, min=1, max=1)
+
+        MetricsHistory.prune(now=now)
+
+        self.assertEqual(list(MetricRollup.objects.values_list('resolution', flat=True)), [3600])
+
+
+class MetricsStreamTest(TestCase):
+
+    def _entries(self, cpu=5, updated_at=100.0):
+        entries = {family: None for family in MetricsCollector.FAMILIES}
+        entries['utilization'] = {'data': {'cpu_usage': cpu, 'network': {'upload': '1 KB/s'}}, 'updated_at': updated_at}
+        entries['health'] = {'data': {'status': 'health-ok', 'is_ok': True}, 'updated_at': 50.0}
+        return entries
+
+    def test_only_changed_fields_are_sent(self):
+        delta, sent = MetricsStream.diff(self._entries(), {})
+        self.assertEqual(delta['system.cpu_usage'], 5)
+        self.assertEqual(delta['system.network.upload'], '1 KB/s')
+        self.assertTrue(delta['health.is_ok'])
+
+        delta, sent = MetricsStream.diff(self._entries(cpu=9, updated_at=105.0), sent)
+        self.assertEqual(delta, {'system.cpu_usage': 9})
+
+    def test_resume_skips_families_the_client_has(self):
+        last_id = MetricsStream.version(self._entries())
+        current = self._entries(cpu=9, updated_at=105.0)
+
+        sent = MetricsStream.resume_state(current, last_id)
+        delta, _ = MetricsStream.diff(current, sent)
+
+        self.assertEqual(set(sent), {'health'})
+        self.assertNotIn('health.status', delta)
+        self.assertEqual(delta['system.cpu_usage'], 9)
+
+    @override_settings(METRICS_STREAM_MIN_INTERVAL=0, METRICS_STREAM_MAX_DURATION=0.05)
+    def test_stream_emits_sse_events(self):
+        async def consume():
+            return [event async for event in MetricsStream.events(interval=0.01)]
+
+        with patch.object(MetricsCollector, 'entries', return_value=self._entries()):
+            events = asyncio.run(consume())
+
+        self.assertTrue(events[0].startswith('retry:'))
+        deltas = [e for e in events if 'event: delta' in e]
+        self.assertEqual(len(deltas), 1)
+        self.assertIn(f"id: {MetricsStream.version(self._entries())}", deltas[0])
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_stream_view_declines_under_wsgi(self):
+        # Cliente síncrono = WSGIRequest: 204 para que EventSource no reconecte
+        self.assertEqual(self.client.get('/metrics/stream/').status_code, 204)
+        response = asyncio.run(AsyncClient().get('/metrics/stream/'))
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(NAS_OFFLINE_MODE=False, FLEET_UNIT_TIMEOUT=0.5)
+class FleetServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        FleetService._services.clear()
+        self.configs = [
+            NASConfig.objects.create(name=f'nas{i}', host=f'10.0.0.{i}', admin_username='admin', admin_password='x')
+            for i in range(3)
+        ]
+
+    def _metrics(self, config):
+        service = MagicMock(connected=True)
+        delay = {'nas0': 0.3, 'nas1': 0.3, 'nas2': 0}[config.name]
+
+        def storage():
+            time.sleep(delay)
+            if config.name == 'nas2':
+                raise ConnectionError('unreachable')
+            return {'total_bytes': 1000, 'used_bytes': 250, 'used': '250 B', 'total': '1000 B', 'percent_used': 25.0}
+
+        service._get_storage_metrics.side_effect = storage
+        service._get_system_metrics.return_value = {'cpu_usage': 10, 'memory_usage': 20, 'temperature': 40}
+        service._get_health_status.return_value = {'status': 'health-ok', 'is_ok': True}
+        return service
+
+    def test_units_are_polled_concurrently_and_isolated(self):
+        with patch.object(FleetService, '_get_service', side_effect=self._metrics):
+            started = time.monotonic()
+            result = FleetService.get_fleet_metrics()
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.55)  # la más lenta, no la suma (0.6)
+        status = {u['name']: u['status'] for u in result['units']}
+        self.assertEqual(status, {'nas0': 'ok', 'nas1': 'ok', 'nas2': 'error'})
+        self.assertEqual(result['totals']['online'], 2)
+        self.assertEqual(result['totals']['total_bytes'], 2000)
+        self.assertEqual(result['totals']['percent_used'], 25.0)
+
+    def test_only_one_default_config(self):
+        self.assertTrue(self.configs[0].is_default)
+        self.configs[2].is_default = True
+        self.configs[2].save()
+
+        self.assertEqual(list(NASConfig.objects.filter(is_default=True)), [self.configs[2]])
+        self.assertEqual(NASConfig.get_active_config(), self.configs[2])
+        self.assertEqual(NASConfig.get_active_configs().count(), 3)
+
+    @override_settings(NAS_OFFLINE_MODE=True)
+    def test_services_accept_an_explicit_unit(self):
+        from apps.core.services.resource_service import ResourceService
+        from apps.groups.services.group_service import GroupService
+        self.assertEqual(ResourceService(config=self.configs[2]).connection.config, self.configs[2])
+        self.assertEqual(GroupService(config=self.configs[1]).connection.config, self.configs[1])
+
+
+@override_settings(NAS_OFFLINE_MODE=False, DASHBOARD_RECENT_DEPTH=1, DASHBOARD_RECENT_SHARES=[])
+@patch('apps.core.services.metrics_service.ConnectionService')
+class RecentFilesTest(TestCase):
+
+    TREE = {
+        '/a': [('a.txt', 100, False), ('sub', 500, True)],
+        '/b': [('b.txt', 300, False), ('old', 10, True)],
+        '/c': [('c.txt', 200, False)],
+        '/a/sub': [('deep.txt', 400, False)],
+        '/b/old': [('ancient.txt', 5, False)],
+    }
+
+    def setUp(self):
+        cache.clear()
+
+    def _request(self, api, method, version=1, params=None):
+        if method == 'list_share':
+            return {'success': True, 'data': {'shares': [{'path': p} for p in ('/a', '/b', '/c')]}}
+        folder = params['folder_path']
+        files = [
+            {'name': name, 'path': f"{folder}/{name}", 'isdir': is_dir, 'additional': {'time': {'mtime': mtime}, 'size': 1}}
+            for name, mtime, is_dir in self.TREE[folder]
+        ]
+        return {'success': True, 'data': {'files': files}}
+
+    def test_top_k_across_shares_and_subfolders(self, MockConn):
+        conn = MockConn.return_value
+        conn.fork.return_value = conn
+        conn.request.side_effect = self._request
+
+        recent = MetricsService()._get_recent_files(limit=3)
+
+        self.assertEqual([f['name'] for f in recent], ['deep.txt', 'b.txt', 'c.txt'])
+        # 1 list_share + 3 shares + 2 subcarpetas
+        self.assertEqual(conn.request.call_count, 6)
+
+        MetricsService()._get_recent_files(limit=3)
+        self.assertEqual(conn.request.call_count, 6)
+
+    @override_settings(DASHBOARD_RECENT_SHARES=['c'], DASHBOARD_RECENT_DEPTH=0)
+    def test_configured_subset(self, MockConn):
+        conn = MockConn.return_value
+        conn.fork.return_value = conn
+        conn.request.side_effect = self._request
+
+        recent = MetricsService()._get_recent_files(limit=3)
+
+        self.assertEqual([f['name'] for f in recent], ['c.txt'])
+
+
+# Fechas fijas en los datos de prueba: retención amplia para que no se poden
+@override_settings(NAS_OFFLINE_MODE=False, LOG_TYPES=['system'], LOG_RETENTION_DAYS=36500)
+class LogServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.connection = MagicMock()
+
+    def _item(self, minute, msg, user='admin', level='info'):
+        return {'time': f'2026/01/01 10:{minute:02d}:00', 'user': user, 'level': level, 'ldata': msg}
+
+    def _serve(self, items):
+        """El NAS pagina de lo más nuevo a lo más viejo."""
+        def request(api, method, version, params):
+            offset, limit = params['offset'], params['limit']
+            return {'success': True, 'data': {'items': items[offset:offset + limit]}}
+        self.connection.request.side_effect = request
+
+    def test_incremental_ingestion_moves_cursor(self):
+        items = [self._item(m, f'msg {m}') for m in range(50, 0, -1)]
+        self._serve(items)
+        service = LogService(self.connection)
+
+        self.assertEqual(service.ingest(), 50)
+        cursor = NASLogCursor.objects.get(log_type='system')
+        self.assertEqual(cursor.newest_at.minute, 50)
+        self.assertIsNone(cursor.backfill_offset)
+
+        self._serve([self._item(51, 'msg 51')] + items)
+        self.connection.request.reset_mock()
+        self.assertEqual(service.ingest(), 1)
+        self.assertEqual(self.connection.request.call_count, 1)
+        self.assertEqual(NASLogEntry.objects.count(), 51)
+
+    def test_backfill_offset_shifts_with_new_entries(self):
+        items = [self._item(m, f'msg {m}') for m in range(59, 9, -1)]
+        self._serve(items)
+        service = LogService(self.connection)
+
+        with patch.object(LogService, 'PAGE', 10), patch.object(LogService, 'BACKFILL_PAGES', 1):
+            service.ingest()
+            cursor = NASLogCursor.objects.get(log_type='system')
+            self.assertEqual(cursor.backfill_offset, 20)
+
+            # Dos entradas nuevas desplazan el historial pendiente dos posiciones
+            self._serve([self._item(59, 'new', user='bob'), self._item(59, 'late')] + items)
+            service.ingest()
+
+        cursor.refresh_from_db()
+        self.assertEqual(cursor.backfill_offset, 32)
+        self.assertEqual(NASLogEntry.objects.count(), 32)
+
+    def test_duplicates_are_ignored(self):
+        item = self._item(5, 'same')
+        self._serve([item, item])
+        service = LogService(self.connection)
+
+        self.assertEqual(service.ingest(), 1)
+        cache.clear()
+        self.assertEqual(service.ingest(), 0)
+        self.assertEqual(NASLogEntry.objects.count(), 1)
+
+    def test_search_and_recent(self):
+        self._serve([
+            self._item(3, 'Disk 2 temperature warning', level='warn'),
+            self._item(2, 'User admin logged in'),
+            self._item(1, 'Backup task finished'),
+        ])
+        LogService(self.connection).ingest()
+
+        # La migración crea el índice trigram con el helper compartido
+        self.assertTrue(LogService.fts_available())
+        self.assertEqual([e.message for e in LogService.search('mperat')], ['Disk 2 temperature warning'])
+        self.assertEqual([e.message for e in LogService.search('in', level='info')], ['User admin logged in', 'Backup task finished'])
+        self.assertEqual(LogService.search('').count(), 3)
+
+        recent = LogService.recent(limit=2)
+        self.assertEqual(len(recent), 2)
+        self.assertEqual(recent[0], {'time': '2026-01-01 10:03:00', 'user': 'admin', 'level': 'warn', 'msg': 'Disk 2 temperature warning'})
+
+    def test_ingest_if_due_is_throttled(self):
+        self._serve([self._item(1, 'a')])
+        service = LogService(self.connection)
+
+        service.ingest_if_due()
+        service.ingest_if_due()
+
+        self.assertEqual(self.connection.request.call_count, 1)
+
+
+class ConnectionMonitorTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.connection = MagicMock()
+
+    def _serve(self, *items):
+        self.connection.request.return_value = {'success': True, 'data': {'items': [
+            {'who': who, 'from': ip, 'type': protocol} for who, ip, protocol in items
+        ]}}
+
+    def test_only_joins_and_leaves_are_written(self):
+        monitor = ConnectionMonitor(self.connection)
+        self._serve(('ana', '10.0.0.1', 'SMB'), ('ana', '10.0.0.1', 'SMB'), ('bob', '10.0.0.2', 'AFP'))
+
+        result = monitor.sample()
+        self.assertEqual((result['total'], result['joined'], result['left']), (3, 2, 0))
+        self.assertEqual(ConnectionSession.objects.get(user='ana').count, 2)
+
+        # Sin cambios: nada que escribir
+        self.assertEqual(monitor.sample()['joined'], 0)
+        self.assertEqual(ConnectionSession.objects.count(), 2)
+
+        self._serve(('ana', '10.0.0.1', 'SMB'), ('carl', '10.0.0.3', 'HTTP/HTTPS'))
+        result = monitor.sample()
+        self.assertEqual((result['joined'], result['left']), (1, 1))
+        self.assertEqual(ConnectionSession.objects.count(), 3)
+        self.assertIsNotNone(ConnectionSession.objects.get(user='bob').ended_at)
+        self.assertEqual(ConnectionSession.objects.get(user='ana').count, 1)
+
+    def test_failed_fetch_keeps_current_set(self):
+        monitor = ConnectionMonitor(self.connection)
+        self._serve(('ana', '10.0.0.1', 'SMB'))
+        monitor.sample()
+
+        self.connection.request.return_value = {'success': False}
+        self.assertIsNone(monitor.sample())
+        self.assertEqual(ConnectionSession.objects.filter(ended_at__isnull=True).count(), 1)
+
+    def test_aggregates_and_top(self):
+        monitor = ConnectionMonitor(self.connection)
+        self._serve(('ana', '10.0.0.1', 'SMB'), ('ana', '10.0.0.4', 'SMB'), ('bob', '10.0.0.2', 'AFP'))
+        monitor.sample()
+        self._serve(('ana', '10.0.0.1', 'SMB'), ('ana', '10.0.0.4', 'SMB'))
+        monitor.sample()
+
+        summary = ConnectionMonitor.summary(window=3600, buckets=6)
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(summary['by_user'], [{'user': 'ana', 'sessions': 2, 'ips': 2}])
+        self.assertEqual(summary['by_protocol'], [{'protocol': 'SMB', 'sessions': 2, 'users': 1}])
+        self.assertEqual(sum(summary['churn']['joined']), 3)
+        self.assertEqual(sum(summary['churn']['left']), 1)
+
+        self.assertEqual(ConnectionMonitor.top(by='user'), [{'key': 'ana', 'sessions': 2}])
+        self.assertEqual(ConnectionMonitor.top(by='protocol', window=3600), [
+            {'key': 'SMB', 'sessions': 2}, {'key': 'AFP', 'sessions': 1},
+        ])
+
+
+class CapacityForecastTest(TestCase):
+
+    GIB = 1024 ** 3
+
+    def setUp(self):
+        cache.clear()
+
+    def _series(self, name, values, now):
+        """Una muestra por hora terminando en la hora actual; values en GiB."""
+        start = int(now) // 3600 * 3600 - (len(values) - 1) * 3600
+        MetricRollup.objects.bulk_create([
+            MetricRollup(series=name, resolution=3600, bucket=start + i * 3600, count=2,
+                         total=2 * v * self.GIB, min=v * self.GIB, max=v * self.GIB)
+            for i, v in enumerate(values)
+        ])
+
+    def test_linear_growth_gives_days_until_full(self):
+        now = time.time()
+        hours = 7 * 24
+        # 1 GiB/día sobre 100 GiB de 200: ~100 días
+        self._series('volume_used:Volume 1', [100 - (hours - 1 - i) / 24 for i in range(hours)], now)
+        self._series('volume_total:Volume 1', [200] * hours, now)
+        self._series('share_used:docs', [10 + i / 48 for i in range(hours)], now)
+
+        result = CapacityForecast.forecast()
+        volume = result['volumes'][0]
+        self.assertEqual(volume['name'], 'Volume 1')
+        self.assertAlmostEqual(volume['growth_per_day'] / self.GIB, 1.0, places=3)
+        self.assertAlmostEqual(volume['days_until_full'], 100, delta=0.5)
+        self.assertEqual(volume['total_bytes'], 200 * self.GIB)
+        self.assertAlmostEqual(volume['r2'], 1.0, places=3)
+        self.assertIsNotNone(volume['full_at'])
+        self.assertAlmostEqual(result['shares'][0]['growth_per_day'] / self.GIB, 0.5, places=3)
+
+    def test_flat_or_short_series_has_no_forecast(self):
+        now = time.time()
+        self._series('volume_used:Flat', [50] * 48, now)
+        self._series('volume_total:Flat', [100] * 48, now)
+        self._series('volume_used:New', [1, 2, 3], now)
+
+        volumes = {v['name']: v for v in CapacityForecast.forecast()['volumes']}
+        self.assertIsNone(volumes['Flat']['days_until_full'])
+        self.assertIsNone(volumes['New']['growth_per_day'])
+        self.assertEqual(volumes['New']['points'], 3)
+
+    def test_storage_history_records_bytes(self):
+        values = MetricsHistory.values_from('storage', {
+            'percent_used': 50,
+            'volumes': [{'name': 'Volume 1', 'percent': 50, 'used_bytes': 5, 'total_bytes': 10}],
+            'shares': [{'name': 'docs', 'used_bytes': 3}],
+        })
+        self.assertEqual(values['volume_used:Volume 1'], 5)
+        self.assertEqual(values['volume_total:Volume 1'], 10)
+        self.assertEqual(values['share_used:docs'], 3)
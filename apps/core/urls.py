@@ -10,6 +10,15 @@ app_name = 'core'
 urlpatterns = [
     path('', views.DashboardView.as_view(), name='dashboard'),
     path('metrics/', views.DashboardMetricsView.as_view(), name='dashboard_metrics'),
+    path('sections/<str:name>/', views.DashboardSectionView.as_view(), name='dashboard_section'),
+    path('metrics/history/', views.DashboardMetricsHistoryView.as_view(), name='dashboard_metrics_history'),
+    path('metrics/capacity/', views.CapacityForecastView.as_view(), name='dashboard_capacity'),
+    path('connections/', views.ConnectionSummaryView.as_view(), name='connections'),
+    path('connections/top/', views.ConnectionTopView.as_view(), name='connections_top'),
+    path('logs/', views.NASLogListView.as_view(), name='nas_logs'),
+    path('fleet/', views.FleetDashboardView.as_view(), name='fleet'),
+    path('fleet/metrics/', views.FleetMetricsView.as_view(), name='fleet_metrics'),
+    path('metrics/stream/', views.DashboardMetricsStreamView.as_view(), name='dashboard_metrics_stream'),
     
     # PWA Support
     path('manifest.json', TemplateView.as_view(template_name='manifest.json', content_type='application/json'), name='manifest'),
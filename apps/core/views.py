@@ -6,10 +6,17 @@ Siguiendo arquitectura de views delgadas:
 - Lógica de negocio en services
 - Contexto claro y bien estructurado
 """
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse
-from .services.metrics_service import MetricsService
+from .services.background_service import BackgroundService
+from .services.capacity_forecast import CapacityForecast
+from .services.connection_monitor import ConnectionMonitor
+from .services.fleet_service import FleetService
+from .services.log_service import LogService
+from .services.metrics_collector import MetricsCollector
+from .services.metrics_history import MetricsHistory
+from .services.metrics_stream import MetricsStream
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -24,9 +31,11 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Obtener métricas del service
-        metrics_service = MetricsService()
-        context['metrics'] = metrics_service.get_dashboard_metrics()
+        # Lo que ya haya en la instantánea: la página nunca espera al NAS.
+        # Las secciones sin datos las pide el navegador a DashboardSectionView.
+        metrics = MetricsCollector.peek()
+        metrics['storage'] = CapacityForecast.annotate_storage(metrics.get('storage'))
+        context['metrics'] = metrics
         
         # Menu items para el sidebar (Usando Service)
         from apps.core.services.menu_service import MenuService
@@ -43,15 +52,209 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
 
 
-from django.http import JsonResponse
+import time
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.views import View
 
+
+class DashboardSectionView(LoginRequiredMixin, View):
+    """
+    Fragmento HTML de una sección del dashboard (core/sections/<nombre>.html).
+    Espera al NAS como mucho DASHBOARD_SECTION_TIMEOUT; si no responde se
+    devuelve el último valor conocido marcado como desactualizado.
+    """
+    def get(self, request, name, *args, **kwargs):
+        if name not in MetricsCollector.SECTIONS:
+            raise Http404
+        data, stale = MetricsCollector.section(name)
+        if name == 'storage':
+            data = {**data, 'storage': CapacityForecast.annotate_storage(data.get('storage'))}
+        html = render_to_string(f'core/sections/{name}.html', {'metrics': data, 'stale': stale}, request=request)
+        response = HttpResponse(html)
+        # El navegador vuelve a pedir las secciones desactualizadas
+        response['X-Section-Stale'] = '1' if stale else '0'
+        return response
+
+
+class NASLogListView(LoginRequiredMixin, ListView):
+    """
+    Visor de logs de un NAS (?nas=<id>, por defecto el predeterminado) sobre la
+    tabla local (búsqueda sin tocar el NAS). Cada visita encola una ingesta
+    incremental en segundo plano si toca.
+    """
+    template_name = 'core/nas_logs.html'
+    context_object_name = 'logs'
+    paginate_by = 50
+    LEVELS = ['info', 'warn', 'err']
+
+    def get_queryset(self):
+        from apps.settings.models import NASConfig
+        nas = NASConfig.for_request(self.request)
+        BackgroundService.submit(f"core:logs:ingest:{getattr(nas, 'pk', None)}", LogService.ingest_default, nas)
+        return LogService.search(
+            self.request.GET.get('q'),
+            level=self.request.GET.get('level') or None,
+            nas=nas,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['q'] = self.request.GET.get('q', '')
+        context['level'] = self.request.GET.get('level', '')
+        context['nas'] = self.request.GET.get('nas', '')
+        context['levels'] = self.LEVELS
+        context['breadcrumbs'] = [
+            {'name': 'Dashboard', 'url': 'core:dashboard'},
+            {'name': 'Logs del NAS'}
+        ]
+        context['page_title'] = 'Logs del NAS'
+        return context
+
+
+class FleetDashboardView(LoginRequiredMixin, TemplateView):
+    """
+    Dashboard de la flota: capacidad, salud y utilización de todos los NAS activos.
+    Los datos llegan por FleetMetricsView; la página solo renderiza el esqueleto.
+    """
+    template_name = 'core/fleet.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        from apps.core.services.menu_service import MenuService
+        context['menu_items'] = MenuService.get_menu_items(self.request.path)
+        context['breadcrumbs'] = [
+            {'name': 'Dashboard', 'url': 'core:dashboard'},
+            {'name': 'Flota NAS'}
+        ]
+        context['page_title'] = 'Flota NAS'
+        return context
+
+
+class FleetMetricsView(LoginRequiredMixin, View):
+    """
+    API endpoint con las métricas agregadas de la flota (consulta concurrente por unidad).
+    GET [refresh=1] ignora la caché.
+    """
+    def get(self, request, *args, **kwargs):
+        metrics = FleetService.get_fleet_metrics(force=request.GET.get('refresh') == '1')
+        return JsonResponse({'success': True, **metrics})
+
 class DashboardMetricsView(LoginRequiredMixin, View):
     """
     API endpoint para obtener métricas del dashboard en JSON.
     Permite actualizaciones asíncronas sin recargar la página.
+    Lee la instantánea del recolector: N dashboards abiertos no cuestan más al NAS.
     """
     def get(self, request, *args, **kwargs):
-        metrics_service = MetricsService()
-        metrics = metrics_service.get_dashboard_metrics()
-        return JsonResponse(metrics)
+        return JsonResponse(MetricsCollector.snapshot())
+
+
+class DashboardMetricsHistoryView(LoginRequiredMixin, View):
+    """
+    API endpoint del historial de métricas en arrays columnares para gráficos.
+    GET series=cpu&series=memory&range=3600 (o start/end en epoch) [&resolution=0|60|900|3600]
+    Sin series devuelve los nombres disponibles.
+    """
+    MAX_RANGE = 2 * 365 * 86400
+
+    def get(self, request, *args, **kwargs):
+        series = request.GET.getlist('series')
+        if not series:
+            return JsonResponse({'success': True, 'series': MetricsHistory.series_names()})
+
+        try:
+            end = float(request.GET.get('end') or time.time())
+            start = float(request.GET['start']) if request.GET.get('start') else end - int(request.GET.get('range', 3600))
+            resolution = request.GET.get('resolution')
+            resolution = int(resolution) if resolution not in (None, '') else None
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': {'code': 'invalid_params', 'msg': 'Parámetros de rango inválidos'}}, status=400)
+
+        if resolution not in (None, 0, *MetricsHistory.RESOLUTIONS) or start >= end or end - start > self.MAX_RANGE:
+            return JsonResponse({'success': False, 'error': {'code': 'invalid_params', 'msg': 'Rango o resolución no soportados'}}, status=400)
+
+        return JsonResponse({'success': True, **MetricsHistory.query(series, start, end, resolution)})
+
+
+class CapacityForecastView(LoginRequiredMixin, View):
+    """
+    API endpoint de previsión de capacidad (ver CapacityForecast): crecimiento
+    diario y días hasta llenarse por volumen, y crecimiento por carpeta compartida.
+    GET [refresh=1] ignora la caché.
+    """
+    def get(self, request, *args, **kwargs):
+        forecast = CapacityForecast.forecast(force=request.GET.get('refresh') == '1')
+        return JsonResponse({'success': True, **forecast})
+
+
+class ConnectionSummaryView(LoginRequiredMixin, View):
+    """
+    API endpoint de conexiones activas del NAS predeterminado desde la tabla local
+    (ver ConnectionMonitor): agregados por usuario y protocolo y rotación.
+    GET [window=segundos (3600)] [buckets=12]
+    """
+    MAX_WINDOW = 30 * 86400
+
+    def get(self, request, *args, **kwargs):
+        from apps.settings.models import NASConfig
+        try:
+            window = int(request.GET.get('window', 3600))
+            buckets = int(request.GET.get('buckets', 12))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': {'code': 'invalid_params', 'msg': 'Parámetros inválidos'}}, status=400)
+        if not 0 < window <= self.MAX_WINDOW or not 0 < buckets <= 500:
+            return JsonResponse({'success': False, 'error': {'code': 'invalid_params', 'msg': 'Ventana o intervalos no soportados'}}, status=400)
+
+        summary = ConnectionMonitor.summary(nas=NASConfig.get_active_config(), window=window, buckets=buckets)
+        return JsonResponse({'success': True, **summary})
+
+
+class ConnectionTopView(LoginRequiredMixin, View):
+    """
+    API endpoint top-N de conexiones. GET by=user|ip|protocol [limit=10]
+    [window=segundos]: sin window, conexiones actuales; con window, sesiones
+    iniciadas en ese periodo.
+    """
+    def get(self, request, *args, **kwargs):
+        from apps.settings.models import NASConfig
+        by = request.GET.get('by', 'user')
+        try:
+            limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+            window = int(request.GET['window']) if request.GET.get('window') else None
+        except ValueError:
+            return JsonResponse({'success': False, 'error': {'code': 'invalid_params', 'msg': 'Parámetros inválidos'}}, status=400)
+        if by not in ConnectionMonitor.TOP_FIELDS:
+            return JsonResponse({'success': False, 'error': {'code': 'invalid_params', 'msg': 'Agrupación no soportada'}}, status=400)
+
+        top = ConnectionMonitor.top(by=by, limit=limit, window=window, nas=NASConfig.get_active_config())
+        return JsonResponse({'success': True, 'by': by, 'items': top})
+
+
+class DashboardMetricsStreamView(View):
+    """
+    Stream SSE con los cambios de métricas del dashboard (ver MetricsStream).
+    GET [interval=segundos]. Vista asíncrona: servir con ASGI (config/asgi.py).
+    Bajo WSGI Django consumiría el generador entero antes de enviar nada y
+    ocuparía un worker METRICS_STREAM_MAX_DURATION segundos: se responde 204,
+    EventSource se cierra sin reconectar y el dashboard vuelve a consultar.
+    """
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=204)
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'success': False, 'error': {'code': 'unauthorized', 'msg': 'Sesión requerida'}}, status=401)
+
+        response = StreamingHttpResponse(
+            MetricsStream.events(
+                last_event_id=request.headers.get('Last-Event-ID'),
+                interval=request.GET.get('interval'),
+            ),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Evita que nginx acumule el stream en su buffer
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -14,8 +14,8 @@ class GroupService:
     con opción de modo offline para pruebas usando archivos JSON locales
     """
     
-    def __init__(self, session='FileStation'):
-        self.config = NASConfig.get_active_config()
+    def __init__(self, session='FileStation', config=None):
+        self.config = config or NASConfig.get_active_config()
         self.connection = ConnectionService(self.config)
         # Autenticar automáticamente para tener SID disponible en todas las llamadas
         if not getattr(settings, 'NAS_OFFLINE_MODE', False):
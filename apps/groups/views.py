@@ -20,6 +20,7 @@ import logging
 
 from .services.group_service import GroupService
 from apps.core.services.resource_service import ResourceService
+from apps.settings.models import NASConfig
 from apps.archivos.services.file_service import FileService # Reuse logic if needed or use ResourceService
 
 logger = logging.getLogger(__name__)
@@ -36,8 +37,9 @@ class GroupListView(LoginRequiredMixin, TemplateView):
         """Override get() to support JSON responses"""
         # Check if JSON format is requested
         if request.GET.get('format') == 'json':
+            config = NASConfig.for_request(request)
             try:
-                service = GroupService()
+                service = GroupService(config=config)
                 groups = service.list_groups()
                 
                 # Apply search filter if provided
@@ -60,7 +62,7 @@ class GroupListView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         
         # Servicio
-        service = GroupService()
+        service = GroupService(config=NASConfig.for_request(self.request))
         all_groups = service.list_groups()
         
         # Búsqueda local en la lista devuelta
@@ -89,7 +91,7 @@ class GroupDeleteView(LoginRequiredMixin, View):
     """
     def get(self, request):
         """Listar grupos"""
-        service = GroupService()
+        service = GroupService(config=NASConfig.for_request(request))
         if request.GET.get('format') == 'json':
             try:
                 groups = service.list_groups()
@@ -112,7 +114,7 @@ class GroupDeleteView(LoginRequiredMixin, View):
             messages.error(request, error_msg)
             return redirect('groups:list')
 
-        service = GroupService()
+        service = GroupService(config=NASConfig.for_request(request))
         result = service.delete_group(group_name)
         
         if is_ajax:
@@ -132,9 +134,10 @@ class CreateGroupWizardView(LoginRequiredMixin, View):
     API endpoint para el wizard de creación.
     """
     def post(self, request, *args, **kwargs):
+        config = NASConfig.for_request(request)
         try:
             data = json.loads(request.body)
-            service = GroupService()
+            service = GroupService(config=config)
             result = service.create_group(data)
             
             if result['success']:
@@ -150,16 +153,17 @@ class CreateGroupWizardView(LoginRequiredMixin, View):
 
 class GroupWizardOptionsView(View):
     def get(self, request):
-        service = GroupService()
+        service = GroupService(config=NASConfig.for_request(request))
         options = service.get_wizard_options()
         return JsonResponse(options)
 
 class GroupWizardAPIView(View):
     def post(self, request):
+        config = NASConfig.for_request(request)
         try:
             print(f"DEBUG: GroupWizardAPIView RECEIVED BODY: {request.body.decode('utf-8')}")
             data = json.loads(request.body)
-            service = GroupService()
+            service = GroupService(config=config)
             
             # Identify mode (create/edit)
             mode = data.get('mode', 'create')
@@ -179,7 +183,7 @@ class GroupWizardAPIView(View):
 
 class GroupDetailView(View):
     def get(self, request, name):
-        service = GroupService()
+        service = GroupService(config=NASConfig.for_request(request))
         group = service.get_group_details(name)
         if group:
              return JsonResponse({'success': True, 'data': group})
@@ -193,8 +197,9 @@ def get_available_users(request):
     """API: Retorna usuarios via UserService"""
     from apps.usuarios.services.user_service import UserService
     
+    config = NASConfig.for_request(request)
     try:
-        service = UserService()
+        service = UserService(config=config)
         users = service.list_users()
         
         # Formato para el wizard
@@ -220,25 +225,25 @@ def get_available_users(request):
 @require_http_methods(["GET"])
 def get_shared_folders(request):
     """API: Retorna shared folders"""
-    service = ResourceService()
+    service = ResourceService(config=NASConfig.for_request(request))
     return JsonResponse(service.get_shared_folders(), safe=False)
 
 @require_http_methods(["GET"])
 def get_volumes(request):
     """API: Retorna volúmenes"""
-    service = ResourceService()
+    service = ResourceService(config=NASConfig.for_request(request))
     return JsonResponse(service.get_volumes(), safe=False)
 
 @require_http_methods(["GET"])
 def get_applications(request):
     """API: Retorna applications"""
-    service = ResourceService()
+    service = ResourceService(config=NASConfig.for_request(request))
     return JsonResponse(service.get_applications(), safe=False)
 
 @require_http_methods(["GET"])
 def get_group_detail(request, name):
     """API: Retorna detalles de un grupo específico para edición"""
-    service = GroupService()
+    service = GroupService(config=NASConfig.for_request(request))
     group = service.get_group(name)
     if group:
         return JsonResponse({'success': True, 'data': group})
@@ -250,7 +255,7 @@ class GroupExportView(LoginRequiredMixin, View):
     """
     def get(self, request, *args, **kwargs):
         format_type = request.GET.get('format', 'csv').lower()
-        service = GroupService()
+        service = GroupService(config=NASConfig.for_request(request))
         groups = service.list_groups()
         
         if format_type == 'json':
@@ -10,21 +10,21 @@ class NASConfigAdmin(admin.ModelAdmin):
     """
     Admin para NASConfig.
     """
-    list_display = ['host', 'port', 'protocol', 'admin_username', 'is_active', 'updated_at']
+    list_display = ['name', 'host', 'port', 'protocol', 'admin_username', 'is_active', 'is_default', 'updated_at']
     list_filter = ['protocol', 'is_active', 'created_at']
-    search_fields = ['host', 'admin_username']
+    search_fields = ['name', 'host', 'admin_username']
     readonly_fields = ['created_at', 'updated_at']
     
     fieldsets = (
         ('Información de Conexión', {
-            'fields': ('host', 'port', 'protocol')
+            'fields': ('name', 'host', 'port', 'protocol')
         }),
         ('Credenciales', {
             'fields': ('admin_username', 'admin_password'),
             'description': 'Credenciales del administrador del NAS'
         }),
         ('Estado', {
-            'fields': ('is_active',)
+            'fields': ('is_active', 'is_default')
         }),
         ('Metadatos', {
             'fields': ('created_at', 'updated_at'),
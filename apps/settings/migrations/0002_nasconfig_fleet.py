@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+def mark_default(apps, schema_editor):
+    """La configuración activa existente pasa a ser el NAS predeterminado."""
+    NASConfig = apps.get_model('settings', 'NASConfig')
+    active = NASConfig.objects.filter(is_active=True).order_by('-created_at').first()
+    if active is not None:
+        NASConfig.objects.filter(pk=active.pk).update(is_default=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='nasconfig',
+            options={'ordering': ['-is_default', '-is_active', '-created_at'], 'verbose_name': 'Configuración NAS', 'verbose_name_plural': 'Configuraciones NAS'},
+        ),
+        migrations.AddField(
+            model_name='nasconfig',
+            name='is_default',
+            field=models.BooleanField(default=False, help_text='NAS usado por defecto; solo puede haber uno', verbose_name='NAS Predeterminado'),
+        ),
+        migrations.AddField(
+            model_name='nasconfig',
+            name='name',
+            field=models.CharField(blank=True, default='', help_text='Nombre para identificar el NAS en la flota (ej: NAS Oficina)', max_length=100, verbose_name='Nombre'),
+        ),
+        migrations.AlterField(
+            model_name='nasconfig',
+            name='is_active',
+            field=models.BooleanField(default=True, help_text='Los NAS activos forman parte de la flota', verbose_name='Configuración Activa'),
+        ),
+        migrations.RunPython(mark_default, migrations.RunPython.noop),
+    ]
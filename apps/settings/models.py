@@ -4,6 +4,7 @@ Models para la app Settings.
 NASConfig: Configuración del NAS Synology (IP, puerto, credenciales)
 """
 from django.db import models
+from django.http import Http404
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -11,7 +12,14 @@ class NASConfig(models.Model):
     """
     Configuración del NAS Synology.
     
-    Singleton: solo puede existir una configuración activa a la vez.
+    Puede haber varias configuraciones activas (flota de NAS); una de ellas es
+    la predeterminada (singleton) y es la que usan los services sin NAS explícito.
+    MetricsService, UserService, GroupService, ShareService, ResourceService y
+    FileServicesService aceptan config= para actuar sobre otra unidad; sus
+    vistas y el visor de logs la eligen con ?nas=<id> (for_request).
+    FileService (cachés, índice y tareas por usuario, no por NAS), el monitor de
+    conexiones (solo muestrea la predeterminada) y el informe de cuotas siguen
+    ligados a la predeterminada.
     Almacena los datos de conexión al NAS (IP, puerto, protocolo, credenciales).
     """
     PROTOCOL_CHOICES = [
@@ -19,6 +27,14 @@ class NASConfig(models.Model):
         ('https', 'HTTPS (Seguro)'),
     ]
     
+    name = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name='Nombre',
+        help_text='Nombre para identificar el NAS en la flota (ej: NAS Oficina)'
+    )
+    
     host = models.CharField(
         max_length=255,
         verbose_name='Host',
@@ -57,7 +73,13 @@ class NASConfig(models.Model):
     is_active = models.BooleanField(
         default=True,
         verbose_name='Configuración Activa',
-        help_text='Solo puede haber una configuración activa'
+        help_text='Los NAS activos forman parte de la flota'
+    )
+    
+    is_default = models.BooleanField(
+        default=False,
+        verbose_name='NAS Predeterminado',
+        help_text='NAS usado por defecto; solo puede haber uno'
     )
     
     created_at = models.DateTimeField(
@@ -73,10 +95,10 @@ class NASConfig(models.Model):
     class Meta:
         verbose_name = 'Configuración NAS'
         verbose_name_plural = 'Configuraciones NAS'
-        ordering = ['-is_active', '-created_at']
+        ordering = ['-is_default', '-is_active', '-created_at']
     
     def __str__(self):
-        return f"{self.protocol}://{self.host}:{self.port}"
+        return self.name or f"{self.protocol}://{self.host}:{self.port}"
     
     def get_base_url(self):
         """
@@ -92,23 +114,51 @@ class NASConfig(models.Model):
     
     def save(self, *args, **kwargs):
         """
-        Override save para implementar patrón Singleton.
+        Override save para implementar patrón Singleton del NAS predeterminado.
         
-        Si esta configuración se marca como activa, 
-        desactiva todas las demás.
+        Si esta configuración se marca como predeterminada,
+        desmarca todas las demás. La primera activa pasa a ser la predeterminada.
         """
-        if self.is_active:
-            # Desactivar todas las demás configuraciones
-            NASConfig.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+        if self.is_active and not self.is_default:
+            self.is_default = not NASConfig.objects.filter(is_default=True, is_active=True).exclude(pk=self.pk).exists()
+        if self.is_default:
+            NASConfig.objects.filter(is_default=True).exclude(pk=self.pk).update(is_default=False)
         
         super().save(*args, **kwargs)
     
     @classmethod
     def get_active_config(cls):
         """
-        Obtiene la configuración activa actual.
+        Obtiene la configuración activa predeterminada.
         
         Returns:
-            NASConfig or None: La configuración activa o None si no existe
+            NASConfig or None: La configuración predeterminada (o la primera activa) o None si no existe
         """
         return cls.objects.filter(is_active=True).first()
+    
+    @classmethod
+    def get_active_configs(cls):
+        """
+        Obtiene todas las configuraciones activas (la flota de NAS).
+        
+        Returns:
+            QuerySet: Configuraciones activas, la predeterminada primero
+        """
+        return cls.objects.filter(is_active=True)
+
+    @classmethod
+    def for_request(cls, request):
+        """
+        NAS sobre el que actúa una vista: ?nas=<id> o, sin parámetro, el predeterminado.
+
+        Raises:
+            Http404: Si el id no corresponde a una configuración activa (nunca
+            se cae a otro NAS en silencio)
+        """
+        nas_id = request.GET.get('nas')
+        if not nas_id:
+            return cls.get_active_config()
+        config = cls.get_active_configs().filter(pk=nas_id).first() if nas_id.isdigit() else None
+        if config is None:
+            raise Http404('NAS no encontrado')
+        return config
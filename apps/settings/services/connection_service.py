@@ -46,6 +46,20 @@ class ConnectionService:
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+    def fork(self):
+        """
+        Crea un ConnectionService independiente (nueva requests.Session) que
+        reutiliza la sesión ya autenticada (SID/SynoToken) y las rutas descubiertas.
+        Útil para trabajo en hilos de fondo sin repetir el login.
+        """
+        clone = ConnectionService(self.config)
+        clone.api_paths = dict(self.api_paths)
+        if hasattr(self, '_sid'):
+            clone._sid = self._sid
+        if hasattr(self, '_synotoken'):
+            clone._synotoken = self._synotoken
+        return clone
+
     def get_sid(self):
         """Devuelve el SID actual si existe"""
         return getattr(self, '_sid', None)
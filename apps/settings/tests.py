@@ -1,3 +1,33 @@
-from django.test import TestCase
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from unittest.mock import patch
 
-# Create your tests here.
+from apps.settings.models import NASConfig
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class NASSelectionTest(TestCase):
+
+    def setUp(self):
+        self.default = NASConfig.objects.create(name='nas0', host='10.0.0.1', admin_username='admin', admin_password='x', is_default=True)
+        self.other = NASConfig.objects.create(name='nas1', host='10.0.0.2', admin_username='admin', admin_password='x')
+        self.factory = RequestFactory()
+
+    def test_for_request_resolves_default_selected_and_unknown(self):
+        self.assertEqual(NASConfig.for_request(self.factory.get('/')), self.default)
+        self.assertEqual(NASConfig.for_request(self.factory.get('/', {'nas': self.other.pk})), self.other)
+        # Un id inválido o inactivo nunca cae en silencio al predeterminado
+        NASConfig.objects.filter(pk=self.other.pk).update(is_active=False)
+        for nas in (self.other.pk, 999, 'abc'):
+            with self.assertRaises(Http404):
+                NASConfig.for_request(self.factory.get('/', {'nas': nas}))
+
+    @patch('apps.groups.views.GroupService')
+    def test_view_passes_selected_nas_to_service(self, MockService):
+        MockService.return_value.get_group_details.return_value = {'name': 'admins'}
+
+        response = self.client.get(f'/grupos/api/detail/admins/?nas={self.other.pk}')
+
+        self.assertEqual(response.status_code, 200)
+        MockService.assert_called_once_with(config=self.other)
+        self.assertEqual(self.client.get('/grupos/api/detail/admins/?nas=999').status_code, 404)
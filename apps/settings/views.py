@@ -29,18 +29,18 @@ class NASConfigView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('settings:config')
     
     def get_object(self, queryset=None):
-        """Obtiene o crea la configuración activa."""
-        obj, created = NASConfig.objects.get_or_create(
-            is_active=True,
-            defaults={
-                'host': '192.168.1.100',
-                'port': 5000,
-                'protocol': 'https',
-                'admin_username': 'admin',
-                'admin_password': ''
-            }
-        )
-        if created:
+        """Obtiene o crea la configuración del NAS predeterminado (el resto de la flota se gestiona en el admin)."""
+        obj = NASConfig.get_active_config()
+        if obj is None:
+            obj = NASConfig.objects.create(
+                is_active=True,
+                is_default=True,
+                host='192.168.1.100',
+                port=5000,
+                protocol='https',
+                admin_username='admin',
+                admin_password=''
+            )
             logger.info("Creada nueva configuración NAS")
         return obj
     
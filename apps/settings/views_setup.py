@@ -54,6 +54,7 @@ class InitialSetupView(CreateView):
 
         # 3. Si la conexión fue exitosa, guardar y activar
         temp_config.is_active = True
+        temp_config.is_default = True
         temp_config.save()
         
         logger.info(f"Configuración inicial NAS creada y verificada: {temp_config.host}")
@@ -0,0 +1,255 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.services.background_service import BackgroundService
+from apps.settings.models import NASConfig
+from apps.settings.services.connection_service import ConnectionService
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Espaciado mínimo entre peticiones compartido por varios hilos (N por segundo)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class QuotaReportService:
+    """
+    Informe de uso de cuotas (SYNO.Core.Quota) de todos los usuarios y grupos
+    en todos los volúmenes.
+
+    - Se lista por páginas de PAGE sujetos por (volumen, tipo), no sujeto a
+      sujeto: 5.000 usuarios × 3 volúmenes son ~30 llamadas. Las páginas se
+      piden en paralelo (QUOTA_CONCURRENCY hilos, cada uno con su conexión vía
+      fork()) y todas pasan por un limitador común de QUOTA_RATE_LIMIT
+      peticiones por segundo para no disparar los límites del NAS.
+    - El informe agregado se cachea sin caducidad; si tiene más de
+      QUOTA_REPORT_TTL segundos se recalcula en segundo plano (una sola vez
+      aunque haya varios lectores) y mientras tanto se sirve el anterior.
+    - Si falla el login, el listado de volúmenes o alguna página, no se
+      pisa el informe anterior: se conserva marcando 'error' (o, si no había
+      ninguno, se guarda el parcial con 'incomplete') y se reintenta en la
+      siguiente lectura.
+    - Cuotas y uso vienen del NAS en MB.
+    """
+
+    KEY = 'usuarios:quota_report'
+    TASK_KEY = 'usuarios:quota_report:refresh'
+    PAGE = 500
+    TYPES = ('user', 'group')
+    SORT_FIELDS = ('name', 'type', 'volume', 'quota_mb', 'used_mb', 'percent')
+
+    def __init__(self, connection=None):
+        # Consultas fallidas del último recálculo (list.append es seguro entre hilos)
+        self.errors = []
+        if connection is None:
+            connection = ConnectionService(NASConfig.get_active_config())
+            if not getattr(settings, 'NAS_OFFLINE_MODE', False):
+                auth = connection.authenticate()
+                if not auth.get('success'):
+                    self.errors.append(f"login: {auth.get('message')}")
+        self.connection = connection
+        self.limiter = RateLimiter(self.rate_limit())
+
+    # --- Configuración ---
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'QUOTA_REPORT_TTL', 900)
+
+    @staticmethod
+    def concurrency():
+        return getattr(settings, 'QUOTA_CONCURRENCY', 4)
+
+    @staticmethod
+    def rate_limit():
+        return getattr(settings, 'QUOTA_RATE_LIMIT', 10)
+
+    @staticmethod
+    def warn_percent():
+        return getattr(settings, 'QUOTA_WARN_PERCENT', 90)
+
+    # --- API pública ---
+    @classmethod
+    def get_report(cls, refresh=False):
+        """
+        Informe cacheado {'rows', 'volumes', 'updated_at', 'incomplete', 'error', 'refreshing'}.
+        Lanza el recálculo en segundo plano si no hay informe, si caducó, si el
+        último recálculo falló o con refresh.
+        """
+        report = cache.get(cls.KEY)
+        stale = (
+            report is None or report.get('error') is not None
+            or time.time() - report['updated_at'] > cls.ttl()
+        )
+        if stale or refresh:
+            BackgroundService.submit(cls.TASK_KEY, cls.refresh)
+        if report is None:
+            return {'rows': [], 'volumes': [], 'updated_at': None, 'incomplete': False, 'error': None, 'refreshing': True}
+        return {**report, 'refreshing': BackgroundService.is_running(cls.TASK_KEY)}
+
+    @classmethod
+    def refresh(cls):
+        """Recalcula el informe completo y lo guarda en la caché (sin pisar uno completo con uno parcial)."""
+        started = time.monotonic()
+        service = cls()
+        volumes = service._list_volumes() if not service.errors else []
+        rows = service.collect(volumes) if not service.errors else []
+
+        if not service.errors:
+            report = {'rows': rows, 'volumes': volumes, 'updated_at': time.time(), 'incomplete': False, 'error': None}
+            logger.info(f"[QUOTA] Report refreshed: {len(rows)} entries on {len(volumes)} volumes in {time.monotonic() - started:.1f}s")
+        else:
+            error = f"{len(service.errors)} consulta(s) al NAS fallaron"
+            logger.warning(f"[QUOTA] Report refresh failed ({len(service.errors)} errors, first: {service.errors[0]})")
+            previous = cache.get(cls.KEY)
+            if previous is not None and not previous.get('incomplete'):
+                # Se sigue sirviendo el último informe completo, marcado
+                report = {**previous, 'error': error}
+            else:
+                report = {'rows': rows, 'volumes': volumes, 'updated_at': time.time(), 'incomplete': True, 'error': error}
+        cache.set(cls.KEY, report, timeout=None)
+        return report
+
+    @classmethod
+    def filter_rows(cls, rows, query='', subject_type=None, sort='percent', descending=True):
+        """Filtra por nombre/tipo y ordena; los valores vacíos (sin cuota) van siempre al final."""
+        q = (query or '').strip().lower()
+        if q:
+            rows = [r for r in rows if q in r['name'].lower()]
+        if subject_type in cls.TYPES:
+            rows = [r for r in rows if r['type'] == subject_type]
+        if sort not in cls.SORT_FIELDS:
+            sort = 'percent'
+        present = [r for r in rows if r[sort] is not None]
+        missing = [r for r in rows if r[sort] is None]
+        present.sort(key=lambda r: (r[sort], r['name']), reverse=descending)
+        return present + missing
+
+    # --- Recolección ---
+    def collect(self, volumes):
+        """Filas {type, name, volume, quota_mb, used_mb, percent} de todos los volúmenes y tipos."""
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.concurrency(), thread_name_prefix='nas-quota') as pool:
+            # Primera página de cada (volumen, tipo): trae además el total
+            first = {
+                (volume, kind): pool.submit(self._fetch_page, self.connection.fork(), volume, kind, 0)
+                for volume in volumes for kind in self.TYPES
+            }
+            rest = []
+            for (volume, kind), future in first.items():
+                items, total = future.result()
+                rows.extend(self._to_row(item, volume, kind) for item in items)
+                if total is None and len(items) == self.PAGE:
+                    # Sin total: se sigue página a página hasta una incompleta
+                    rest.append(pool.submit(self._fetch_remaining, volume, kind, self.PAGE))
+                for offset in range(self.PAGE, total or 0, self.PAGE):
+                    rest.append(pool.submit(self._fetch_items, volume, kind, offset))
+            for future in rest:
+                for volume, kind, item in future.result():
+                    rows.append(self._to_row(item, volume, kind))
+        return [r for r in rows if r['name']]
+
+    def _fetch_items(self, volume, kind, offset):
+        items, _ = self._fetch_page(self.connection.fork(), volume, kind, offset)
+        return [(volume, kind, item) for item in items]
+
+    def _fetch_remaining(self, volume, kind, offset):
+        connection = self.connection.fork()
+        result = []
+        while True:
+            items, _ = self._fetch_page(connection, volume, kind, offset)
+            result.extend((volume, kind, item) for item in items)
+            if len(items) < self.PAGE:
+                return result
+            offset += self.PAGE
+
+    def _fetch_page(self, connection, volume, kind, offset):
+        """(items, total) de una página de cuotas; total es None si el NAS no lo informa."""
+        self.limiter.wait()
+        try:
+            response = connection.request(
+                api='SYNO.Core.Quota',
+                method='list',
+                version=1,
+                params={'type': kind, 'volume_path': volume, 'offset': offset, 'limit': self.PAGE}
+            )
+        except Exception as e:
+            logger.exception(f"[QUOTA] Error listing {kind} quotas on {volume} at offset {offset}")
+            self.errors.append(f"{kind}@{volume}:{offset}: {e}")
+            return [], None
+        if not response.get('success'):
+            logger.warning(f"[QUOTA] {kind} quotas on {volume} failed: {response.get('error')}")
+            self.errors.append(f"{kind}@{volume}:{offset}: {response.get('error')}")
+            return [], None
+
+        data = response.get('data', {})
+        if isinstance(data, list):
+            return data, None
+        items = data.get('items') or data.get(f'{kind}_quota') or data.get('quotas') or []
+        total = data.get('total')
+        return items, int(total) if total is not None else None
+
+    @staticmethod
+    def _to_row(item, volume, kind):
+        quota_mb = float(item.get('quota', item.get('quota_limit', item.get('size_limit', 0))) or 0)
+        used_mb = float(item.get('used', item.get('usage', 0)) or 0)
+        return {
+            'type': kind,
+            'name': item.get('name') or item.get(kind) or '',
+            'volume': item.get('volume_path') or volume,
+            'quota_mb': quota_mb or None,
+            'used_mb': used_mb,
+            # Sin cuota (0 = ilimitada) no hay porcentaje
+            'percent': round(used_mb / quota_mb * 100, 1) if quota_mb else None,
+        }
+
+    def _list_volumes(self):
+        try:
+            response = self.connection.request(
+                'SYNO.Core.Storage.Volume', 'list', version=1, params={'offset': 0, 'limit': 100}
+            )
+        except Exception as e:
+            logger.exception("[QUOTA] Error listing volumes")
+            response = {'success': False, 'error': str(e)}
+        if not response.get('success'):
+            self.errors.append(f"volumes: {response.get('error')}")
+            return []
+        data = response.get('data', {})
+        volumes = data if isinstance(data, list) else data.get('volumes') or data.get('items') or []
+        paths = [v.get('volume_path') for v in volumes if v.get('volume_path')]
+        return paths or ['/volume1']
+
+    # --- Exportación ---
+    EXPORT_HEADER = ['Tipo', 'Nombre', 'Volumen', 'Cuota (MB)', 'Usado (MB)', '% usado']
+
+    @classmethod
+    def export_values(cls, rows):
+        """Filas planas para CSV/XLSX (la cabecera primero)."""
+        yield cls.EXPORT_HEADER
+        for r in rows:
+            yield [
+                'Usuario' if r['type'] == 'user' else 'Grupo',
+                r['name'],
+                r['volume'],
+                r['quota_mb'] if r['quota_mb'] is not None else '',
+                r['used_mb'],
+                r['percent'] if r['percent'] is not None else '',
+            ]
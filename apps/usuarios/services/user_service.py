@@ -13,8 +13,8 @@ class UserService:
     Interactúa directamente con SYNO.Core.*
     """
     
-    def __init__(self, session='FileStation'):
-        self.config = NASConfig.get_active_config()
+    def __init__(self, session='FileStation', config=None):
+        self.config = config or NASConfig.get_active_config()
         self.connection = ConnectionService(self.config)
         # En modo offline, no necesitamos autenticar
         if not getattr(settings, 'NAS_OFFLINE_MODE', False):
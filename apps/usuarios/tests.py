@@ -2,7 +2,11 @@ import time
 import logging
 import json
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from unittest.mock import patch, MagicMock
+from apps.core.services.background_service import BackgroundService
+from apps.usuarios.services.quota_service import QuotaReportService
 from apps.usuarios.services.user_service import UserService
 
 logger = logging.getLogger(__name__)
@@ -161,3 +165,123 @@ class UserServicePerformanceTest(TestCase):
 
     def tearDown(self):
         print("="*50 + "\n")
+
+
+@override_settings(NAS_OFFLINE_MODE=False, QUOTA_RATE_LIMIT=0, QUOTA_CONCURRENCY=4)
+class QuotaReportServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _connection(self, users, groups=0, with_total=True):
+        """NAS simulado: `users` usuarios y `groups` grupos con cuota en cada volumen."""
+        connection = MagicMock()
+        connection.fork.return_value = connection
+
+        def request(api, method, version=1, params=None):
+            count = users if params['type'] == 'user' else groups
+            start, end = params['offset'], min(params['offset'] + params['limit'], count)
+            items = [{'name': f"{params['type']}{i}", 'quota': 1000, 'used': i % 1000} for i in range(start, end)]
+            data = {'items': items, 'total': count} if with_total else {'items': items}
+            return {'success': True, 'data': data}
+
+        connection.request.side_effect = request
+        return connection
+
+    def test_collect_pages_all_volumes_and_types(self):
+        connection = self._connection(users=1200, groups=10)
+        service = QuotaReportService(connection)
+
+        rows = service.collect(['/volume1', '/volume2', '/volume3'])
+
+        self.assertEqual(len(rows), 3 * 1210)
+        # Por volumen: 3 páginas de usuarios (500) + 1 de grupos
+        self.assertEqual(connection.request.call_count, 3 * 4)
+        row = next(r for r in rows if r['name'] == 'user999' and r['volume'] == '/volume2')
+        self.assertEqual(row['percent'], 99.9)
+
+    def test_collect_without_total_follows_pages(self):
+        connection = self._connection(users=1000, with_total=False)
+        service = QuotaReportService(connection)
+
+        rows = service.collect(['/volume1'])
+
+        self.assertEqual(len([r for r in rows if r['type'] == 'user']), 1000)
+        self.assertEqual(len({r['name'] for r in rows}), 1000)
+
+    def test_filter_and_sort(self):
+        rows = [
+            {'type': 'user', 'name': 'ana', 'volume': '/volume1', 'quota_mb': 100.0, 'used_mb': 95.0, 'percent': 95.0},
+            {'type': 'user', 'name': 'bob', 'volume': '/volume1', 'quota_mb': None, 'used_mb': 500.0, 'percent': None},
+            {'type': 'group', 'name': 'admins', 'volume': '/volume1', 'quota_mb': 100.0, 'used_mb': 10.0, 'percent': 10.0},
+        ]
+
+        by_percent = QuotaReportService.filter_rows(rows)
+        self.assertEqual([r['name'] for r in by_percent], ['ana', 'admins', 'bob'])
+        ascending = QuotaReportService.filter_rows(rows, sort='percent', descending=False)
+        self.assertEqual([r['name'] for r in ascending], ['admins', 'ana', 'bob'])
+        self.assertEqual([r['name'] for r in QuotaReportService.filter_rows(rows, subject_type='group')], ['admins'])
+        self.assertEqual([r['name'] for r in QuotaReportService.filter_rows(rows, query='BO')], ['bob'])
+
+    @patch.object(BackgroundService, 'submit')
+    def test_report_is_served_stale_while_refreshing(self, mock_submit):
+        report = QuotaReportService.get_report()
+        self.assertTrue(report['refreshing'])
+        self.assertIsNone(report['updated_at'])
+        self.assertEqual(mock_submit.call_count, 1)
+
+        cache.set(QuotaReportService.KEY, {'rows': [{'name': 'ana'}], 'volumes': ['/volume1'], 'updated_at': time.time()})
+        report = QuotaReportService.get_report()
+        self.assertEqual(report['rows'], [{'name': 'ana'}])
+        self.assertEqual(mock_submit.call_count, 1)
+
+        with override_settings(QUOTA_REPORT_TTL=0):
+            time.sleep(0.01)
+            report = QuotaReportService.get_report()
+        self.assertEqual(report['rows'], [{'name': 'ana'}])
+        self.assertEqual(mock_submit.call_count, 2)
+
+    @override_settings(NAS_OFFLINE_MODE=False)
+    @patch('apps.usuarios.services.quota_service.ConnectionService')
+    def test_failed_refresh_does_not_overwrite_report(self, mock_connection_service):
+        connection = self._connection(users=10)
+        quotas = connection.request.side_effect
+
+        def request(api, method, version=1, params=None):
+            if api == 'SYNO.Core.Storage.Volume':
+                return {'success': True, 'data': {'volumes': [{'volume_path': '/volume1'}]}}
+            if params['type'] == 'group':
+                return {'success': False, 'error': {'code': 105}}
+            return quotas(api, method, version, params)
+
+        connection.request.side_effect = request
+        connection.authenticate.return_value = {'success': True}
+        mock_connection_service.return_value = connection
+
+        previous = {'rows': [{'name': 'ana'}], 'volumes': ['/volume1'], 'updated_at': 1.0, 'incomplete': False, 'error': None}
+        cache.set(QuotaReportService.KEY, previous)
+        report = QuotaReportService.refresh()
+        self.assertEqual((report['rows'], report['updated_at']), (previous['rows'], 1.0))
+        self.assertIsNotNone(report['error'])
+
+        # Sin informe previo se guarda el parcial, marcado como incompleto
+        cache.clear()
+        report = QuotaReportService.refresh()
+        self.assertTrue(report['incomplete'])
+        self.assertEqual(len(report['rows']), 10)
+
+        # Login fallido: no se consulta nada
+        connection.request.reset_mock()
+        connection.authenticate.return_value = {'success': False, 'message': 'Error de conexión'}
+        report = QuotaReportService.refresh()
+        self.assertEqual(connection.request.call_count, 0)
+        self.assertTrue(report['incomplete'])
+
+    def test_export_values(self):
+        rows = [{'type': 'group', 'name': 'admins', 'volume': '/volume1', 'quota_mb': None, 'used_mb': 5.0, 'percent': None}]
+
+        values = list(QuotaReportService.export_values(rows))
+
+        self.assertEqual(values[0], QuotaReportService.EXPORT_HEADER)
+        self.assertEqual(values[1], ['Grupo', 'admins', '/volume1', '', 5.0, ''])
+
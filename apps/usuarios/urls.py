@@ -1,11 +1,13 @@
 from django.urls import path
-from .views import UserListView, UserWizardDataView, UserDeleteView
+from .views import UserListView, UserWizardDataView, UserDeleteView, QuotaReportView, QuotaReportExportView
 
 app_name = 'usuarios'
 
 urlpatterns = [
     # Vista UI Principal
     path('', UserListView.as_view(), name='list'),
+    path('cuotas/', QuotaReportView.as_view(), name='quotas'),
+    path('cuotas/export/', QuotaReportExportView.as_view(), name='quotas_export'),
     
     # APIs para Wizard y Acciones
     path('api/wizard/', UserWizardDataView.as_view(), name='wizard_api'),
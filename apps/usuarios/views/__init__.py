@@ -1 +1,2 @@
 from .user_views import UserListView, UserWizardDataView, UserDeleteView
+from .quota_views import QuotaReportView, QuotaReportExportView
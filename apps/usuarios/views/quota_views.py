@@ -0,0 +1,96 @@
+import csv
+import io
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.generic import ListView, View
+
+from ..services.quota_service import QuotaReportService
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, value):
+        return value
+
+
+def _report_params(request):
+    return {
+        'query': request.GET.get('q', ''),
+        'subject_type': request.GET.get('type') or None,
+        'sort': request.GET.get('sort', 'percent'),
+        'descending': request.GET.get('dir', 'desc') != 'asc',
+    }
+
+
+class QuotaReportView(LoginRequiredMixin, ListView):
+    """
+    Informe de uso de cuotas por usuario y grupo (tabla ordenable).
+    Lee el informe cacheado; si caducó se recalcula en segundo plano.
+    """
+    template_name = 'usuarios/quota_report.html'
+    context_object_name = 'rows'
+    paginate_by = 50
+
+    def get_queryset(self):
+        self.report = QuotaReportService.get_report(refresh=self.request.GET.get('refresh') == '1')
+        return QuotaReportService.filter_rows(self.report['rows'], **_report_params(self.request))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = _report_params(self.request)
+        context.update({
+            'q': params['query'],
+            'type': params['subject_type'] or '',
+            'sort': params['sort'],
+            'dir': 'desc' if params['descending'] else 'asc',
+            'report': self.report,
+            'warn_percent': QuotaReportService.warn_percent(),
+            'columns': [
+                ('name', 'Nombre'), ('type', 'Tipo'), ('volume', 'Volumen'),
+                ('quota_mb', 'Cuota'), ('used_mb', 'Usado'), ('percent', '% usado'),
+            ],
+        })
+        context['breadcrumbs'] = [
+            {'name': 'Dashboard', 'url': 'core:dashboard'},
+            {'name': 'Usuarios', 'url': 'usuarios:list'},
+            {'name': 'Cuotas'}
+        ]
+        context['page_title'] = 'Uso de Cuotas'
+        return context
+
+
+class QuotaReportExportView(LoginRequiredMixin, View):
+    """
+    Exporta el informe de cuotas (con los filtros y orden de la tabla).
+    CSV se envía en streaming fila a fila; XLSX se genera con openpyxl en modo
+    write_only (memoria constante) porque el formato zip necesita el archivo completo.
+    """
+    def get(self, request, *args, **kwargs):
+        report = QuotaReportService.get_report()
+        if report['updated_at'] is None:
+            return JsonResponse({'success': False, 'error': {
+                'code': 'report_not_ready', 'msg': 'El informe de cuotas aún se está calculando'
+            }}, status=409)
+
+        rows = QuotaReportService.filter_rows(report['rows'], **_report_params(request))
+        values = QuotaReportService.export_values(rows)
+
+        if request.GET.get('format', 'csv').lower() == 'xlsx':
+            from openpyxl import Workbook
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet('Cuotas')
+            for row in values:
+                sheet.append(row)
+            buffer = io.BytesIO()
+            workbook.save(buffer)
+            response = HttpResponse(
+                buffer.getvalue(),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response['Content-Disposition'] = 'attachment; filename="cuotas.xlsx"'
+            return response
+
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse((writer.writerow(row) for row in values), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="cuotas.csv"'
+        return response
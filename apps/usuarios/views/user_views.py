@@ -6,6 +6,7 @@ import json
 import logging
 
 from ..services.user_service import UserService
+from apps.settings.models import NASConfig
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,7 @@ class UserListView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        service = UserService()
+        service = UserService(config=NASConfig.for_request(self.request))
         
         # 1. Breadcrumbs
         context['breadcrumbs'] = [
@@ -61,7 +62,7 @@ class UserWizardDataView(LoginRequiredMixin, View):
     
     def get(self, request):
         """Retorna JSON con opciones para poblar selects o datos de un usuario específico"""
-        service = UserService()
+        service = UserService(config=NASConfig.for_request(request))
         
         # Si viene 'name', es para cargar datos de edición
         username = request.GET.get('name')
@@ -76,10 +77,11 @@ class UserWizardDataView(LoginRequiredMixin, View):
 
     def post(self, request):
         """Recibe el payload JSON completo del Wizard y crea/actualiza el usuario"""
+        config = NASConfig.for_request(request)
         try:
             data = json.loads(request.body)
             mode = data.get('mode', 'create')
-            service = UserService()
+            service = UserService(config=config)
             
             if mode == 'edit':
                 result = service.update_user_wizard(data)
@@ -114,7 +116,7 @@ class UserDeleteView(LoginRequiredMixin, View):
     API Interna: Elimina usuario
     """
     def post(self, request, username):
-        service = UserService()
+        service = UserService(config=NASConfig.for_request(request))
         
         # Si username es 'batch', buscar en el body
         if username == 'batch':
@@ -5,6 +5,16 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+Las métricas en vivo del dashboard (/metrics/stream/, SSE) solo funcionan
+servidas por ASGI, por ejemplo:
+
+    pip install uvicorn
+    uvicorn config.asgi:application --workers 2
+
+Tras nginx, desactivar el buffer en esa ruta (proxy_buffering off; la vista
+ya envía X-Accel-Buffering: no). Con WSGI (runserver, gunicorn sync) la ruta
+responde 204 y el dashboard consulta /metrics/ periódicamente.
 """
 
 import os
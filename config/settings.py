@@ -168,6 +168,113 @@ AUTHENTICATION_BACKENDS = [
 # Permite trabajar en la UI sin tener conexión al NAS, simulando respuestas positivas.
 NAS_OFFLINE_MODE = env.bool('NAS_OFFLINE_MODE', default=False)
 
+# =============================================================================
+# EXPLORADOR DE ARCHIVOS
+# =============================================================================
+
+# Caché de listados de carpetas (segundos). Dentro de TTL se sirve sin consultar
+# al NAS; luego se sirve y se revalida por mtime en segundo plano hasta MAX_AGE.
+FILE_LISTING_CACHE_TTL = env.int('FILE_LISTING_CACHE_TTL', default=15)
+FILE_LISTING_CACHE_MAX_AGE = env.int('FILE_LISTING_CACHE_MAX_AGE', default=600)
+
+# Búsqueda (SYNO.FileStation.Search): timeout de la tarea en el NAS,
+# reutilización de resultados idénticos y tope de resultados guardados.
+FILE_SEARCH_TIMEOUT = env.int('FILE_SEARCH_TIMEOUT', default=120)
+FILE_SEARCH_RESULT_TTL = env.int('FILE_SEARCH_RESULT_TTL', default=120)
+FILE_SEARCH_MAX_RESULTS = env.int('FILE_SEARCH_MAX_RESULTS', default=5000)
+
+# Centro de tareas (CopyMove/Delete/Compress/Extract): un poller por proceso
+# sondea el NAS cada N segundos para todas las tareas activas.
+FILE_TASK_POLL_INTERVAL = env.int('FILE_TASK_POLL_INTERVAL', default=2)
+FILE_TASK_RETENTION = env.int('FILE_TASK_RETENTION', default=3600)
+
+# Subidas deduplicadas: vigencia de los MD5 conocidos (clave ruta + mtime) y
+# tiempo máximo de espera de una tarea SYNO.FileStation.MD5.
+FILE_UPLOAD_HASH_TTL = env.int('FILE_UPLOAD_HASH_TTL', default=7 * 24 * 3600)
+FILE_UPLOAD_MD5_TIMEOUT = env.int('FILE_UPLOAD_MD5_TIMEOUT', default=300)
+
+# Tamaño de carpetas (SYNO.FileStation.DirSize): vigencia del resultado (además
+# de invalidarse por mtime) y tiempo máximo de una tarea en el NAS.
+FILE_DIRSIZE_TTL = env.int('FILE_DIRSIZE_TTL', default=3600)
+FILE_DIRSIZE_TIMEOUT = env.int('FILE_DIRSIZE_TIMEOUT', default=600)
+
+# Prefetch: tras listar una carpeta se precargan sus primeras N subcarpetas y el
+# padre en un carril de baja prioridad, con un tope de listados por usuario y minuto.
+FILE_PREFETCH_COUNT = env.int('FILE_PREFETCH_COUNT', default=5)
+FILE_PREFETCH_PER_MINUTE = env.int('FILE_PREFETCH_PER_MINUTE', default=30)
+
+# Vista previa parcial: bytes por página, tope por petición y vigencia del
+# fragmento cacheado (clave ruta + mtime).
+FILE_PREVIEW_BYTES = env.int('FILE_PREVIEW_BYTES', default=64 * 1024)
+FILE_PREVIEW_MAX_BYTES = env.int('FILE_PREVIEW_MAX_BYTES', default=1024 * 1024)
+FILE_PREVIEW_CACHE_TTL = env.int('FILE_PREVIEW_CACHE_TTL', default=600)
+
+# =============================================================================
+# DASHBOARD
+# =============================================================================
+
+# Recolector de métricas en segundo plano: intervalo de muestreo (segundos) de
+# la utilización (CPU/RAM/red), de conexiones y logs, y de almacenamiento/salud.
+# Sin lecturas durante METRICS_IDLE_TIMEOUT el recolector se detiene.
+METRICS_UTILIZATION_INTERVAL = env.int('METRICS_UTILIZATION_INTERVAL', default=5)
+METRICS_ACTIVITY_INTERVAL = env.int('METRICS_ACTIVITY_INTERVAL', default=15)
+METRICS_STATUS_INTERVAL = env.int('METRICS_STATUS_INTERVAL', default=60)
+METRICS_IDLE_TIMEOUT = env.int('METRICS_IDLE_TIMEOUT', default=120)
+
+# Métricas en vivo (SSE, requiere ASGI, ver config/asgi.py; con WSGI el dashboard
+# consulta periódicamente): intervalo mínimo entre eventos por cliente y
+# duración máxima de una conexión (el navegador reconecta y retoma).
+METRICS_STREAM_MIN_INTERVAL = env.int('METRICS_STREAM_MIN_INTERVAL', default=2)
+METRICS_STREAM_MAX_DURATION = env.int('METRICS_STREAM_MAX_DURATION', default=600)
+
+# Archivos recientes del dashboard: shares consultadas (vacío = todas), niveles
+# de subcarpetas a recorrer, presupuesto de tiempo (s) y vigencia del resultado.
+DASHBOARD_RECENT_SHARES = env.list('DASHBOARD_RECENT_SHARES', default=[])
+DASHBOARD_RECENT_DEPTH = env.int('DASHBOARD_RECENT_DEPTH', default=1)
+DASHBOARD_RECENT_BUDGET = env.int('DASHBOARD_RECENT_BUDGET', default=5)
+DASHBOARD_RECENT_TTL = env.int('DASHBOARD_RECENT_TTL', default=60)
+
+# El dashboard se pinta sin esperar al NAS; cada sección (almacenamiento, salud,
+# recientes) se pide aparte y espera como mucho DASHBOARD_SECTION_TIMEOUT segundos
+# antes de mostrar el último valor conocido.
+DASHBOARD_SECTION_TIMEOUT = env.int('DASHBOARD_SECTION_TIMEOUT', default=3)
+
+# Logs del NAS: ingesta incremental a la tabla local como mucho cada N segundos,
+# tipos de log (SYNO.Core.SyslogClient.Log), retención y tope de historial inicial.
+LOG_INGEST_INTERVAL = env.int('LOG_INGEST_INTERVAL', default=30)
+LOG_TYPES = env.list('LOG_TYPES', default=['system'])
+LOG_RETENTION_DAYS = env.int('LOG_RETENTION_DAYS', default=90)
+LOG_BACKFILL_MAX = env.int('LOG_BACKFILL_MAX', default=20000)
+
+# Informe de cuotas (SYNO.Core.Quota): vigencia del informe agregado (después se
+# recalcula en segundo plano), hilos en paralelo, peticiones por segundo al NAS
+# como máximo y % de uso a partir del cual se resalta un sujeto.
+QUOTA_REPORT_TTL = env.int('QUOTA_REPORT_TTL', default=900)
+QUOTA_CONCURRENCY = env.int('QUOTA_CONCURRENCY', default=4)
+QUOTA_RATE_LIMIT = env.int('QUOTA_RATE_LIMIT', default=10)
+QUOTA_WARN_PERCENT = env.int('QUOTA_WARN_PERCENT', default=90)
+
+# Monitor de conexiones: días que se conservan las sesiones cerradas (entradas
+# y salidas) para ver la rotación.
+CONNECTION_HISTORY_DAYS = env.int('CONNECTION_HISTORY_DAYS', default=30)
+
+# Previsión de capacidad: días de historial horario para la tendencia (mejor en
+# semanas completas), horas mínimas de datos por serie y vigencia de la previsión.
+CAPACITY_FORECAST_DAYS = env.int('CAPACITY_FORECAST_DAYS', default=28)
+CAPACITY_MIN_POINTS = env.int('CAPACITY_MIN_POINTS', default=24)
+CAPACITY_FORECAST_TTL = env.int('CAPACITY_FORECAST_TTL', default=900)
+
+# Flota de NAS: vigencia de las métricas agregadas y tiempo máximo de espera
+# por unidad (las unidades lentas se marcan 'timeout' sin bloquear al resto).
+FLEET_METRICS_TTL = env.int('FLEET_METRICS_TTL', default=15)
+FLEET_UNIT_TIMEOUT = env.int('FLEET_UNIT_TIMEOUT', default=10)
+
+# Historial de métricas: la última hora queda en memoria a resolución completa;
+# los agregados de 1 min, 15 min y 1 h se conservan N días en la base de datos.
+METRICS_HISTORY_RETENTION_1M = env.int('METRICS_HISTORY_RETENTION_1M', default=2)
+METRICS_HISTORY_RETENTION_15M = env.int('METRICS_HISTORY_RETENTION_15M', default=60)
+METRICS_HISTORY_RETENTION_1H = env.int('METRICS_HISTORY_RETENTION_1H', default=730)
+
 
 # Internacionalización
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -17,9 +17,15 @@ class DashboardManager {
         this.refreshInterval = null;
     }
 
-    init() {
+    async init() {
         this.setupCharts();
-        this.startPolling();
+        this.loadSections();
+        await this.loadHistory();
+        if (window.EventSource) {
+            this.startStreaming();
+        } else {
+            this.startPolling();
+        }
 
         // Listener para el botón de actualización manual
         const refreshBtn = document.getElementById('btn-refresh-metrics');
@@ -114,6 +120,35 @@ class DashboardManager {
         }
     }
 
+    // Rellena los gráficos con el historial del servidor en vez de empezar en cero
+    async loadHistory() {
+        const seconds = this.historyLimit * 5;
+        const params = new URLSearchParams({ range: seconds });
+        ['cpu', 'memory', 'net_tx', 'net_rx'].forEach(s => params.append('series', s));
+        try {
+            const response = await fetch(`/metrics/history/?${params}`);
+            if (!response.ok) return;
+            const data = await response.json();
+            if (!data.success || !data.timestamps.length) return;
+
+            const take = arr => arr.slice(-this.historyLimit);
+            const fill = (target, values) => {
+                const last = take(values).map(v => v ?? 0);
+                target.splice(0, target.length, ...Array(this.historyLimit - last.length).fill(0), ...last);
+            };
+            fill(this.dataHistory.cpu, data.series.cpu.avg);
+            fill(this.dataHistory.ram, data.series.memory.avg);
+            fill(this.dataHistory.up, data.series.net_tx.avg);
+            fill(this.dataHistory.down, data.series.net_rx.avg);
+            const labels = take(data.timestamps).map(ts => new Date(ts * 1000).toLocaleTimeString());
+            this.dataHistory.labels.splice(0, this.dataHistory.labels.length,
+                ...Array(this.historyLimit - labels.length).fill(''), ...labels);
+            Object.values(this.charts).forEach(chart => chart.update('none'));
+        } catch (error) {
+            console.error('Error fetching metrics history:', error);
+        }
+    }
+
     async fetchMetrics() {
         const btn = document.getElementById('btn-refresh-metrics');
         if (btn) btn.classList.add('animate-spin-once');
@@ -177,6 +212,63 @@ class DashboardManager {
         if (arr.length > this.historyLimit) arr.shift();
     }
 
+    // Secciones que la página no trajo (el NAS aún no respondió): se piden
+    // en paralelo y cada una se pinta en cuanto llega. Si el servidor devolvió
+    // el último valor conocido (X-Section-Stale) se reintenta más tarde.
+    loadSections() {
+        document.querySelectorAll('[data-section][data-pending]').forEach(el => this.loadSection(el));
+    }
+
+    async loadSection(el, attempt = 0) {
+        try {
+            const response = await fetch(el.dataset.sectionUrl);
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            el.innerHTML = await response.text();
+            if (response.headers.get('X-Section-Stale') !== '1') {
+                delete el.dataset.pending;
+                return;
+            }
+        } catch (error) {
+            console.error(`Error loading dashboard section ${el.dataset.section}:`, error);
+        }
+        if (attempt < 5) {
+            setTimeout(() => this.loadSection(el, attempt + 1), 5000 * (attempt + 1));
+        }
+    }
+
+    // Métricas en vivo por SSE: el servidor envía solo los campos que cambiaron
+    startStreaming() {
+        this.state = null;
+        this.stream = new EventSource('/metrics/stream/');
+        // Sin 'open' en unos segundos el servidor no está emitiendo (ej. WSGI tras
+        // un proxy que acumula la respuesta): se cierra el stream y se consulta
+        const openTimeout = setTimeout(() => this.fallbackToPolling(), 5000);
+        this.stream.addEventListener('open', () => clearTimeout(openTimeout));
+        this.stream.addEventListener('delta', (event) => {
+            const delta = JSON.parse(event.data);
+            if (!this.state) this.state = { system: { network: {} }, storage: {} };
+            for (const [path, value] of Object.entries(delta)) {
+                const keys = path.split('.');
+                let node = this.state;
+                keys.slice(0, -1).forEach(k => { node = node[k] = node[k] || {}; });
+                node[keys[keys.length - 1]] = value;
+            }
+            this.updateUI(this.state);
+        });
+        this.stream.addEventListener('error', () => {
+            // CLOSED: el servidor no admite streaming (204 bajo WSGI): volver a consultar
+            if (this.stream.readyState === EventSource.CLOSED) {
+                clearTimeout(openTimeout);
+                this.fallbackToPolling();
+            }
+        });
+    }
+
+    fallbackToPolling() {
+        this.stream.close();
+        if (!this.refreshInterval) this.startPolling();
+    }
+
     startPolling(ms = 5000) {
         this.fetchMetrics();
         this.refreshInterval = setInterval(() => this.fetchMetrics(), ms);